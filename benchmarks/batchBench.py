@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of gz_osm --batch
+#             Runs the same jobs on an osm file once as separate gz_osm.py
+#             processes and once as a single batch, which imports the
+#             package once per worker and parses the file once per group
+##############################################################################
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+#Flags of the jobs, repeated to make up --count jobs
+FLAGS = [[], ['--mergeRoads'], ['--merge', 'class'], ['-r', '--clip'],
+         ['--imageFile', 'map.png'], ['--buildingCollision', 'obb']]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(here, '..', 'testFiles',
+                                             'umaine.osm'))
+    parser.add_argument('--count', type=int, default=12,
+                        help='Number of jobs')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Processes of both runs (default: all cpus)')
+    args = parser.parse_args()
+    script = os.path.abspath(os.path.join(here, '..', 'gz_osm.py'))
+    osmFile = os.path.abspath(args.osmFile)
+    jobs = [dict(name='job%d' % k, inputOsmFile=osmFile,
+                 flags=FLAGS[k % len(FLAGS)]) for k in range(args.count)]
+    processes = args.jobs or os.cpu_count() or 1
+
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        running = []
+        for job in jobs:
+            command = [sys.executable, script, '-j', '1', '-O', osmFile,
+                       '-d', os.path.join(directory, 'separate',
+                                          job['name'], '')] + job['flags']
+            running.append(subprocess.Popen(command,
+                                            stdout=subprocess.DEVNULL))
+            if len(running) == processes:
+                running.pop(0).wait()
+        for process in running:
+            process.wait()
+        separate = time.perf_counter() - start
+
+        manifest = os.path.join(directory, 'batch', 'manifest.json')
+        os.makedirs(os.path.dirname(manifest))
+        with open(manifest, 'w') as f:
+            json.dump(jobs, f)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script, '--batch', manifest,
+                        '-j', str(processes)], stdout=subprocess.DEVNULL,
+                       check=True)
+        batch = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory)
+
+    print("%d jobs on %d processes" % (len(jobs), processes))
+    print("separate processes: %8.2f s" % separate)
+    print("batch:              %8.2f s (x%.1f)" % (batch, separate / batch))
+
+
+if __name__ == '__main__':
+    main()
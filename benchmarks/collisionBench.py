@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the GetSDF collision geometry modes
+#             A headless, Gazebo free physics step: spheres fall through the
+#             world and are tested against every collision shape with an
+#             AABB broadphase and a per shape narrowphase whose cost grows
+#             with the shape complexity, as in a real engine
+##############################################################################
+
+import argparse
+import itertools
+import os
+import time
+
+import numpy as np
+
+from mergeBench import loadFeatures, buildWorld
+from gazebo_osm.dict2sdf import BUILDINGCOLLISIONS, ROADCOLLISIONS
+
+GRAVITY = -9.81
+RADIUS = 0.5
+
+
+def numbers(text):
+    return np.array(text.split(), dtype=float)
+
+
+def collisionShapes(world):
+    '''Collision shapes of the world as (kind, data, aabb) tuples.
+       Polylines are extruded polygons, boxes are oriented boxes'''
+    shapes = []
+    for model in world.iter('model'):
+        modelPose = numbers(model.findtext('pose', '0 0 0 0 0 0'))
+        for collision in model.iter('collision'):
+            pose = numbers(collision.findtext('pose', '0 0 0 0 0 0'))
+            pose[:3] += modelPose[:3]
+            polyline = collision.find('geometry/polyline')
+            box = collision.find('geometry/box')
+            if polyline is not None:
+                ring = np.array([numbers(p.text)
+                                 for p in polyline.findall('point')])
+                height = float(polyline.findtext('height'))
+                ring = ring + pose[:2]
+                aabb = np.concatenate((ring.min(axis=0), [pose[2]],
+                                       ring.max(axis=0), [pose[2] + height]))
+                shapes.append(('polyline', ring, aabb))
+            elif box is not None:
+                size = numbers(box.findtext('size'))
+                yaw = pose[5]
+                half = np.abs([[np.cos(yaw), -np.sin(yaw)],
+                               [np.sin(yaw), np.cos(yaw)]]) @ size[:2] / 2
+                aabb = np.concatenate((pose[:2] - half,
+                                       [pose[2] - size[2] / 2],
+                                       pose[:2] + half,
+                                       [pose[2] + size[2] / 2]))
+                shapes.append(('box', (pose, size), aabb))
+    return shapes
+
+
+def polylineContact(ring, centers):
+    '''Sphere centers touching the extruded polygon side walls or inside it'''
+    start = ring[:, None, :]
+    edge = (np.roll(ring, -1, axis=0) - ring)[:, None, :]
+    rel = centers[None, :, :2] - start
+    t = np.clip(np.sum(rel * edge, axis=2) /
+                np.maximum(np.sum(edge * edge, axis=2), 1e-12), 0, 1)
+    dist = np.linalg.norm(rel - t[..., None] * edge, axis=2)
+    return np.min(dist, axis=0) <= RADIUS
+
+
+def boxContact(pose, size, centers):
+    '''Sphere centers touching the oriented box'''
+    c, s = np.cos(pose[5]), np.sin(pose[5])
+    rel = centers - pose[:3]
+    local = np.stack((c * rel[:, 0] + s * rel[:, 1],
+                      -s * rel[:, 0] + c * rel[:, 1], rel[:, 2]), axis=1)
+    closest = np.clip(local, -size / 2, size / 2)
+    return np.linalg.norm(local - closest, axis=1) <= RADIUS
+
+
+def simulate(shapes, bbox, spheres, steps, dt=0.01, seed=0):
+    '''Runs the fall and returns the mean step time and narrowphase tests'''
+    rng = np.random.default_rng(seed)
+    pos = np.column_stack((rng.uniform(bbox[0], bbox[2], spheres),
+                           rng.uniform(bbox[1], bbox[3], spheres),
+                           rng.uniform(0.5, 20, spheres)))
+    vel = np.zeros_like(pos)
+    aabbs = np.array([s[2] for s in shapes]).reshape(-1, 6)
+    tests = 0
+    start = time.perf_counter()
+    for step in range(steps):
+        vel[:, 2] += GRAVITY * dt
+        pos += vel * dt
+        resting = pos[:, 2] <= RADIUS   # ground plane
+        lo, hi = pos - RADIUS, pos + RADIUS
+        overlap = np.all((lo[:, None, :] <= aabbs[None, :, 3:]) &
+                         (hi[:, None, :] >= aabbs[None, :, :3]), axis=2)
+        for shapeIdx in np.flatnonzero(np.any(overlap, axis=0)):
+            sel = np.flatnonzero(overlap[:, shapeIdx])
+            kind, data, aabb = shapes[shapeIdx]
+            if kind == 'polyline':
+                hit = polylineContact(data, pos[sel])
+                tests += len(sel) * len(data)
+            else:
+                hit = boxContact(data[0], data[1], pos[sel])
+                tests += len(sel)
+            resting[sel[hit]] = True
+        vel[resting] = 0
+        pos[resting, 2] = np.maximum(pos[resting, 2], RADIUS)
+    return (time.perf_counter() - start) / steps, tests / steps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), '..',
+                                             'testFiles', 'umaine.osm'))
+    parser.add_argument('--spheres', type=int, default=2000)
+    parser.add_argument('--steps', type=int, default=200)
+    args = parser.parse_args()
+    osmRoads, box, features = loadFeatures(args.osmFile)
+    bbox = osmRoads.getPointBBox(box)
+    print("%-9s %-6s %7s %9s %11s %13s" % (
+        'building', 'road', 'shapes', 'vertices', 'step [ms]',
+        'tests/step'))
+    for buildingCollision, roadCollision in itertools.product(
+            BUILDINGCOLLISIONS, ROADCOLLISIONS):
+        world = buildWorld(osmRoads, box, features,
+                           buildingCollision=buildingCollision,
+                           roadCollision=roadCollision).world
+        shapes = collisionShapes(world)
+        vertices = sum(len(s[1]) if s[0] == 'polyline' else 8
+                       for s in shapes)
+        stepTime, tests = simulate(shapes, bbox, args.spheres, args.steps)
+        print("%-9s %-6s %7d %9d %11.3f %13.0f" % (
+            buildingCollision, roadCollision, len(shapes), vertices,
+            stepTime * 1000, tests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the compact feature format
+#             Extracts the features of a synthetic city and compares their
+#             float64 points, pickle (as sent to worker processes) and
+#             packFeatures() bytes: size, encoding and decoding time, the
+#             largest rounding error, and the shards of the parallel sdf
+#             path with and without compactShards
+##############################################################################
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from gazebo_osm.compactFeatures import (packFeatures, unpackFeatures,
+                                        isPoints)
+from gazebo_osm.dict2sdf import SHARD_FIELDS
+from gazebo_osm.getOsmFile import parseOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.synthetic import SyntheticCity
+
+
+def best(function, repeat):
+    '''Smallest wall time of repeat calls of function and its result'''
+    elapsed = float('inf')
+    for k in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed, result
+
+
+def pointArrays(featureMaps):
+    for features in featureMaps:
+        for feature in features.values():
+            for value in feature.values():
+                for array in (value if isinstance(value, list) else [value]):
+                    if isPoints(array):
+                        yield array
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--area', type=float, default=25.0,
+                        help='Area of the city in km^2')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs of each measure, the best is kept')
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.osm') as f:
+        city = SyntheticCity(args.area)
+        city.write(f)
+        f.flush()
+        features = Osm2Dict(city.origin[0], city.origin[1],
+                            parseOsmFile(f.name), ['a']).getMapDetails()
+
+    points = sum(array.shape[1] for array in pointArrays(features))
+    pickleTime, pickled = best(lambda: pickle.dumps(features), args.repeat)
+    unpickleTime, _ = best(lambda: pickle.loads(pickled), args.repeat)
+    packTime, packed = best(lambda: packFeatures(features), args.repeat)
+    unpackTime, (_, unpacked) = best(lambda: unpackFeatures(packed),
+                                     args.repeat)
+    error = max(np.abs(a - b).max() for a, b in zip(
+        pointArrays(features), pointArrays(unpacked)) if a.size)
+
+    shards = [(kind, {name: {key: data[key] for key in SHARD_FIELDS[kind]}
+                      for name, data in maps.items()})
+              for kind, maps in (('road', features[0]),
+                                 ('building', features[2]))]
+    shardPickle = sum(len(pickle.dumps(list(shard.items())))
+                      for kind, shard in shards)
+    shardCompact = sum(len(pickle.dumps(packFeatures([shard])))
+                       for kind, shard in shards)
+
+    print("%g km^2 synthetic city, %d points" % (args.area, points))
+    print("%-22s %10s %9s %9s" % ('representation', 'bytes', 'encode',
+                                  'decode'))
+    print("%-22s %10d %9s %9s" % ('float64 points', points * 24, '', ''))
+    print("%-22s %10d %9s %9s" % ('int32 points', points * 8, '', ''))
+    print("%-22s %10d %8.3fs %8.3fs" % ('pickled features', len(pickled),
+                                        pickleTime, unpickleTime))
+    print("%-22s %10d %8.3fs %8.3fs" % ('packFeatures', len(packed),
+                                        packTime, unpackTime))
+    print("%-22s %10d" % ('worker shards pickled', shardPickle))
+    print("%-22s %10d" % ('worker shards compact', shardCompact))
+    print("largest rounding error %.4f m, compact file x%.2f smaller, "
+          "shards x%.2f smaller" % (error, len(pickled) / len(packed),
+                                    shardPickle / shardCompact))
+
+
+if __name__ == '__main__':
+    main()
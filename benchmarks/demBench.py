@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the DEM sampling
+#             Writes a 1 arc second SRTM tile and samples the nodes of a
+#             synthetic city inside it, once through the memory mapped tile
+#             and once after reading the whole tile into memory
+##############################################################################
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from gazebo_osm.synthetic import SyntheticCity
+from gazebo_osm.terrain import DEM, openDem
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--area', type=float, default=10.0,
+                        help='Area of the city in km^2')
+    parser.add_argument('--points', type=int, default=1000000,
+                        help='Number of sampled nodes')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        side = 3601
+        hgt = os.path.join(directory, 'N44W069.hgt')
+        rng = np.random.default_rng(0)
+        with open(hgt, 'wb') as f:
+            for row in range(side):
+                f.write(rng.integers(0, 2000, side).astype('>i2').tobytes())
+        city = SyntheticCity(args.area, origin=(-68.6, 44.5))
+        size = city.blocks * city.blockSize
+        lon, lat = city.toLonLat(rng.uniform(0, size, args.points),
+                                 rng.uniform(0, size, args.points))
+
+        start = time.perf_counter()
+        dem = openDem(hgt)
+        mapped = dem.sample(lon, lat)
+        mappedTime = time.perf_counter() - start
+        # Bytes of the window sample() slices out of the tile
+        rows = (dem.lat0 - lat) / dem.dlat
+        cols = (lon - dem.lon0) / dem.dlon
+        window = ((int(rows.max()) - int(rows.min()) + 2) *
+                  (int(cols.max()) - int(cols.min()) + 2) * 2)
+
+        start = time.perf_counter()
+        whole = DEM(np.fromfile(hgt, dtype='>i2').reshape(side, side),
+                    dem.lon0, dem.lat0, dem.dlon, dem.dlat, dem.nodata)
+        loaded = whole.sample(lon, lat)
+        loadedTime = time.perf_counter() - start
+        assert np.array_equal(mapped, loaded)
+    finally:
+        shutil.rmtree(directory)
+
+    print("%d nodes of a %g km^2 city on a %dx%d tile (%.1f MB)" % (
+        args.points, args.area, side, side, side * side * 2 / 1e6))
+    print("memory mapped: %8.3f s, %6.2f MB read" % (mappedTime,
+                                                    window / 1e6))
+    print("whole tile:    %8.3f s, %6.2f MB read" % (loadedTime,
+                                                    side * side * 2 / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of --instanceModels
+#             Writes a local model directory for every model type, generates
+#             the world of a synthetic city with one include per model and
+#             with instanced models, then loads both worlds the way the sdf
+#             parser expands includes: every include reads the model.config
+#             and model.sdf of its model and copies the model into the world
+##############################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lxml.etree as Et
+
+from gazebo_osm.cli import main as gzOsm
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.synthetic import SyntheticCity
+
+MODEL_CONFIG = '''<?xml version="1.0"?>
+<model><name>%s</name><version>1.0</version><sdf version="1.5">model.sdf</sdf>
+</model>
+'''
+MODEL_SDF = '''<?xml version="1.0"?>
+<sdf version="1.5"><model name="%s"><static>true</static><link name="link">
+<collision name="collision"><geometry><box><size>0.3 0.3 3</size></box>
+</geometry></collision>
+<visual name="visual"><geometry><mesh><uri>model://%s/meshes/model.dae</uri>
+</mesh></geometry></visual></link></model></sdf>
+'''
+
+
+def writeModels(directory):
+    '''One model directory per model type Osm2Dict includes'''
+    names = [model['modelName']
+             for model in Osm2Dict(0, 0, []).addModel.values()]
+    for name in names:
+        folder = name.lower().replace(' ', '_')
+        os.makedirs(os.path.join(directory, folder, 'meshes'))
+        with open(os.path.join(directory, folder, 'model.config'), 'w') as f:
+            f.write(MODEL_CONFIG % name)
+        with open(os.path.join(directory, folder, 'model.sdf'), 'w') as f:
+            f.write(MODEL_SDF % (folder, folder))
+    return len(names)
+
+
+def loadWorld(filename):
+    '''Expands the includes of the world. Returns the number of models and
+       links and the set of meshes, each loaded once'''
+    world = Et.parse(filename).getroot().find('world')
+    for include in world.findall('include'):
+        directory = include.findtext('uri')
+        if '://' in directory:
+            continue
+        config = Et.parse(os.path.join(directory, 'model.config')).getroot()
+        model = Et.parse(os.path.join(directory, config.findtext('sdf'))
+                         ).getroot().find('model')
+        model.set('name', include.findtext('name') or model.get('name'))
+        for tag in ('pose', 'static'):
+            if include.find(tag) is not None:
+                model.append(include.find(tag))
+        world.replace(include, model)
+    links = sum(len(model.findall('link')) for model in world.iter('model'))
+    meshes = {mesh.findtext('uri') for mesh in world.iter('mesh')}
+    return len(world.findall('model')), links, meshes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--area', type=float, default=4.0,
+                        help='Area of the city in km^2')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Loads of each world, the best is kept')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        models = os.path.join(directory, 'models')
+        writeModels(models)
+        osmFile = os.path.join(directory, 'city.osm')
+        with open(osmFile, 'w') as f:
+            SyntheticCity(args.area).write(f)
+        results = []
+        for mode, flags in (('includes', []),
+                            ('instanced', ['--instanceModels'])):
+            output = os.path.join(directory, mode, '')
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                gzOsm(['-O', osmFile, '-m', '-d', output, '--modelSource',
+                       'path', '--modelPath', models] + flags)
+            generate = time.perf_counter() - start
+            world = output + 'outFile.sdf'
+            load = float('inf')
+            for k in range(args.repeat):
+                start = time.perf_counter()
+                counts = loadWorld(world)
+                load = min(load, time.perf_counter() - start)
+            results.append((mode, generate, os.path.getsize(world),
+                            len(Et.parse(world).getroot().find('world')
+                                .findall('include')), counts, load))
+    finally:
+        shutil.rmtree(directory)
+
+    print("%g km^2 synthetic city, models only" % args.area)
+    print("%-10s %9s %10s %9s %7s %7s %7s %9s" % (
+        'mode', 'generate', 'bytes', 'includes', 'models', 'links',
+        'meshes', 'load'))
+    for mode, generate, size, includes, (models, links, meshes), load \
+            in results:
+        print("%-10s %8.2fs %10d %9d %7d %7d %7d %8.3fs" % (
+            mode, generate, size, includes, models, links, len(meshes),
+            load))
+    print("load time x%.1f" % (results[0][5] / results[1][5]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of --maxMemory
+#             Generates a synthetic city and runs gz_osm on it in child
+#             processes without a budget and with each budget, reporting
+#             their peak resident size, wall time and spilled bytes, and
+#             checking that every run writes the same world
+##############################################################################
+
+import argparse
+import filecmp
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from gazebo_osm.synthetic import SyntheticCity
+
+GZ_OSM = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                      'gz_osm.py')
+
+
+def run(arguments):
+    '''Wall time, peak resident size in bytes and output of a gz_osm child
+       process'''
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, GZ_OSM] + arguments,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    output = process.stdout.read().decode()
+    _, status, usage = os.wait4(process.pid, 0)
+    if status:
+        raise RuntimeError("gz_osm %s failed" % ' '.join(arguments))
+    return time.perf_counter() - start, usage.ru_maxrss * 1024, output
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--area', type=float, default=25.0,
+                        help='Area of the city in km^2')
+    parser.add_argument('--budgets', type=float, nargs='+',
+                        default=[8, 64, 256],
+                        help='Memory budgets in MB')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        osmFile = os.path.join(directory, 'city.osm')
+        with open(osmFile, 'w') as f:
+            SyntheticCity(args.area).write(f)
+        results = []
+        for budget in [None] + args.budgets:
+            output = os.path.join(directory, str(budget), '')
+            flags = [] if budget is None else ['--maxMemory', str(budget)]
+            seconds, peak, log = run(['-O', osmFile, '-a', '-d', output] +
+                                     flags)
+            spilled = re.search(r'([0-9.]+) MB spilled', log)
+            results.append((budget, seconds, peak,
+                            float(spilled.group(1)) if spilled else 0.0,
+                            filecmp.cmp(os.path.join(directory, 'None',
+                                                     'outFile.sdf'),
+                                        output + 'outFile.sdf',
+                                        shallow=False)))
+        size = os.path.getsize(osmFile)
+    finally:
+        shutil.rmtree(directory)
+
+    print("%g km^2 synthetic city, %.1f MB osm file" % (args.area,
+                                                        size / 2**20))
+    print("%-10s %8s %10s %10s %9s" % ('budget', 'time', 'peak rss',
+                                       'spilled', 'same sdf'))
+    for budget, seconds, peak, spilled, same in results:
+        print("%-10s %7.2fs %7.1f MB %7.1f MB %9s" % (
+            'none' if budget is None else '%g MB' % budget, seconds,
+            peak / 2**20, spilled, same))
+
+
+if __name__ == '__main__':
+    main()
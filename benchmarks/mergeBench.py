@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the GetSDF merge modes
+#             Builds the world for an osm file once per merge mode and
+#             reports entity counts, file size and load time. The load time
+#             is the lxml parse and entity walk of the world, plus
+#             "gz sdf -k" when a Gazebo installation is on the PATH
+##############################################################################
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lxml.etree as Et
+
+from gazebo_osm.dict2sdf import GetSDF, MERGEMODES
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.getOsmFile import getOsmFile
+
+
+def loadFeatures(osmFile):
+    '''Extracts the features of osmFile as gz_osm.py does'''
+    with open(osmFile, 'rb') as f:
+        bounds = Et.fromstring(f.read())[0]
+    box = [float(bounds.get(k)) for k in 'minlon minlat maxlon maxlat'.split()]
+    osmRoads = Osm2Dict(box[0], box[1], getOsmFile(box, '', osmFile))
+    return osmRoads, box, osmRoads.getMapDetails()
+
+
+def buildWorld(osmRoads, box, features, **sdfOptions):
+    roadPointWidthMap, modelPoseMap, buildingLocationMap = features
+    sdfFile = GetSDF(**sdfOptions)
+    sdfFile.addSphericalCoords(osmRoads.getLat(), osmRoads.getLon())
+    sdfFile.includeModel("sun")
+    sdfFile.addGroundPlane(osmRoads.getPointBBox(box))
+    for model, data in modelPoseMap.items():
+        points = data['points']
+        if len(points):
+            sdfFile.addModel(data['mainModel'], model, points[:, 0].tolist())
+    for building, data in buildingLocationMap.items():
+        sdfFile.addBuilding(data['mean'], data['points'], building,
+                            data['color'], data['height'])
+    for road, data in roadPointWidthMap.items():
+        sdfFile.addRoad(road, data['width'], data['points'])
+    return sdfFile
+
+
+def loadTime(filename):
+    '''Seconds to parse the world and walk all its entities'''
+    start = time.perf_counter()
+    world = Et.parse(filename).getroot().find('world')
+    for model in world.iter('model'):
+        for link in model.iter('link'):
+            link.findall('collision')
+            link.findall('visual')
+    return time.perf_counter() - start
+
+
+def gzCheckTime(filename):
+    '''Seconds for "gz sdf -k", or None without a Gazebo installation'''
+    gz = shutil.which('gz') or shutil.which('ign')
+    if gz is None:
+        return None
+    start = time.perf_counter()
+    subprocess.run([gz, 'sdf', '-k', filename], capture_output=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), '..',
+                                             'testFiles', 'umaine.osm'))
+    args = parser.parse_args()
+    osmRoads, box, features = loadFeatures(args.osmFile)
+    outDir = tempfile.mkdtemp()
+    print("%-10s %7s %7s %11s %10s %10s %10s" % (
+        'mode', 'models', 'links', 'collisions', 'bytes', 'load [s]',
+        'gz [s]'))
+    for mode in (None,) + MERGEMODES:
+        filename = os.path.join(outDir, '%s.sdf' % mode)
+        buildWorld(osmRoads, box, features,
+                   mergeMode=mode).writeToFile(filename)
+        world = Et.parse(filename).getroot().find('world')
+        gz = gzCheckTime(filename)
+        print("%-10s %7d %7d %11d %10d %10.4f %10s" % (
+            mode or 'none',
+            len(world.findall('model')) + len(world.findall('include')),
+            len(list(world.iter('link'))),
+            len(list(world.iter('collision'))),
+            os.path.getsize(filename),
+            loadTime(filename),
+            '-' if gz is None else '%.3f' % gz))
+    shutil.rmtree(outDir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the occupancy grid export
+#             Rasterizes the roads and buildings of an osm file, replicated
+#             on a grid for a larger map, at several resolutions and band
+#             heights and reports the time and the peak traced memory
+##############################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import time
+import tracemalloc
+
+from mergeBench import loadFeatures
+from parallelBench import replicate
+from gazebo_osm.occupancyMap import OccupancyMap
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), '..',
+                                             'testFiles', 'umaine.osm'))
+    parser.add_argument('--copies', type=int, default=1,
+                        help='Number of copies of the osm features')
+    parser.add_argument('--resolutions', type=float, nargs='*',
+                        default=[0.2, 0.1, 0.05])
+    parser.add_argument('--bands', type=int, nargs='*',
+                        default=[256, 1024, 16384],
+                        help='Rows rasterized at once')
+    args = parser.parse_args()
+    osmRoads, box, features = loadFeatures(args.osmFile)
+    bbox = osmRoads.getPointBBox(box)
+    spacing = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
+    roads, models, buildings = replicate(features, args.copies, spacing)
+    side = int(args.copies ** 0.5 + 0.999)
+    bbox = [bbox[0], bbox[1], bbox[2] + (side - 1) * spacing,
+            bbox[3] + (side - 1) * spacing]
+
+    print("%10s %13s %7s %9s %10s" % ('resolution', 'cells', 'band',
+                                      'time [s]', 'peak [MB]'))
+    for resolution in args.resolutions:
+        for band in args.bands:
+            tracemalloc.start()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                occupancyMap = OccupancyMap(bbox, resolution, bandRows=band)
+                occupancyMap.add_roads(roads)
+                occupancyMap.add_buildings(buildings)
+                image = occupancyMap.render()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("%10.2f %13s %7d %9.3f %10.1f" % (
+                resolution, '%dx%d' % image.shape[::-1], band, elapsed,
+                peak / 1e6))
+            del image
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the parallel GetSDF.addFeatures()
+#             Replicates the features of an osm file on a grid to get a
+#             large world, then reports the build and serialization
+#             throughput for a range of worker counts and checks that every
+#             output matches the serial one
+##############################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+
+from mergeBench import loadFeatures
+from gazebo_osm.dict2sdf import GetSDF
+
+
+def replicate(features, copies, spacing):
+    '''Copies of the road, model and building dictionaries, shifted by
+       spacing meters on a square grid'''
+    side = int(np.ceil(np.sqrt(copies)))
+    result = (dict(), dict(), dict())
+    for k in range(copies):
+        offset = np.array([[(k // side) * spacing], [(k % side) * spacing],
+                           [0.0]])
+        for source, target in zip(features, result):
+            for name, data in source.items():
+                copy = dict(data)
+                for key in ('points', 'mean'):
+                    if key in copy and len(copy[key]):
+                        copy[key] = copy[key] + offset
+                target['%s_%d' % (name, k)] = copy
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), '..',
+                                             'testFiles', 'umaine.osm'))
+    parser.add_argument('--copies', type=int, default=16,
+                        help='Number of copies of the osm features')
+    parser.add_argument('--jobs', type=int, nargs='*', default=[1, 2, 4, 8],
+                        help='Worker counts to time')
+    args = parser.parse_args()
+    osmRoads, box, features = loadFeatures(args.osmFile)
+    features = replicate(features, args.copies, 1000.0)
+    count = len(features[0]) + len(features[2])
+    print("%d roads and buildings, %d cpus" % (count, os.cpu_count()))
+
+    print("%6s %10s %14s %10s" % ('jobs', 'time [s]', 'features/s',
+                                  'identical'))
+    reference = None
+    for jobs in args.jobs:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sdfFile = GetSDF()
+            sdfFile.addFeatures(*features, jobs=jobs)
+            data = sdfFile.toString()
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = data
+        print("%6d %10.3f %14.0f %10s" % (jobs, elapsed, count / elapsed,
+                                          data == reference))
+
+
+if __name__ == '__main__':
+    main()
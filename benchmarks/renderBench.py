@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the map image renderers
+#             Renders the buildings and roads of an osm file, replicated on
+#             a grid for a larger map, with one matplotlib Polygon patch per
+#             feature as MPLBMap used to, with the batched PolyCollection
+#             per color of MPLBMap and with the numpy RasterMap
+##############################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import matplotlib as mplb
+import numpy as np
+import matplotlib.pyplot as plt
+
+from mergeBench import loadFeatures
+from parallelBench import replicate
+from gazebo_osm.getMapImage import MPLBMap, RGBACOLORS
+from gazebo_osm.rasterize import RasterMap
+
+
+class PatchMap(MPLBMap):
+    '''MPLBMap drawing every polygon as its own patch'''
+
+    def add_polygon(self, points, color, kind='building'):
+        self.ax.add_patch(mplb.patches.Polygon(points,
+                                               color=RGBACOLORS[color]))
+
+
+def render(mapClass, bbox, roads, buildings, filename):
+    '''Seconds to add the features and save the image'''
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        image = mapClass(bbox)
+        image.add_buildings(buildings)
+        image.add_roads(roads)
+        image.save_image(filename)
+    if hasattr(image, 'fig'):
+        plt.close(image.fig)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), '..',
+                                             'testFiles', 'umaine.osm'))
+    parser.add_argument('--copies', type=int, nargs='*', default=[1, 4],
+                        help='Numbers of copies of the osm features to render')
+    args = parser.parse_args()
+    osmRoads, box, features = loadFeatures(args.osmFile)
+    bbox = osmRoads.getPointBBox(box)
+    outDir = tempfile.mkdtemp()
+
+    print("%7s %9s %12s %12s %11s" % ('copies', 'features', 'patches [s]',
+                                      'batched [s]', 'raster [s]'))
+    for copies in args.copies:
+        spacing = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
+        roads, models, buildings = replicate(features, copies, spacing)
+        extent = (int(np.ceil(np.sqrt(copies))) - 1) * spacing
+        size = [bbox[0], bbox[1], bbox[2] + extent, bbox[3] + extent]
+        times = [render(mapClass, size, roads, buildings,
+                        os.path.join(outDir, '%s_%d.png' % (
+                            mapClass.__name__, copies)))
+                 for mapClass in (PatchMap, MPLBMap, RasterMap)]
+        print("%7d %9d %12.3f %12.3f %11.3f" % (
+            (copies, len(roads) + len(buildings)) + tuple(times)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the junction aware road merge
+#             Reports the road models, polygons and polygon vertices written
+#             for an osm file with and without mergeRoads(), and the area
+#             covered more than once by road polygons, sampled on a grid
+##############################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+
+from mergeBench import loadFeatures
+from gazebo_osm.dict2sdf import GetSDF
+from gazebo_osm.meshExport import roadPolygons
+from gazebo_osm.roadGraph import mergeRoads
+from gazebo_osm.spatialIndex import pointsInPolygon
+
+
+def roadStats(roadPointWidthMap, resolution):
+    '''Road models, polygons, vertices and overlapping area in m^2'''
+    with contextlib.redirect_stdout(io.StringIO()):
+        sdfFile = GetSDF()
+        for road, data in roadPointWidthMap.items():
+            sdfFile.addRoad(road, data['width'], data['points'])
+        polygons = [polygon for road, data in roadPointWidthMap.items()
+                    for polygon in roadPolygons(road, data['width'],
+                                                data['points'])]
+    lo = np.min([p.min(axis=0) for p in polygons], axis=0)
+    hi = np.max([p.max(axis=0) for p in polygons], axis=0)
+    shape = np.ceil((hi - lo) / resolution).astype(int) + 1
+    coverage = np.zeros(shape, dtype=np.int32)
+    for polygon in polygons:
+        start = np.floor((polygon.min(axis=0) - lo) / resolution).astype(int)
+        stop = np.ceil((polygon.max(axis=0) - lo) / resolution).astype(int)
+        i, j = np.meshgrid(np.arange(start[0], stop[0] + 1),
+                           np.arange(start[1], stop[1] + 1), indexing='ij')
+        centers = lo + (np.stack((i.ravel(), j.ravel()), axis=1) + 0.5) * \
+            resolution
+        inside = pointsInPolygon(centers, polygon)
+        np.add.at(coverage, (i.ravel()[inside], j.ravel()[inside]), 1)
+    return (len(sdfFile.world.findall('model')), len(polygons),
+            sum(len(p) for p in polygons),
+            np.count_nonzero(coverage > 1) * resolution ** 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), '..',
+                                             'testFiles', 'umaine.osm'))
+    parser.add_argument('--resolution', type=float, default=0.25,
+                        help='Grid spacing in meters of the overlap estimate')
+    args = parser.parse_args()
+    osmRoads, box, (roads, models, buildings) = loadFeatures(args.osmFile)
+
+    start = time.perf_counter()
+    merged = mergeRoads(roads)
+    elapsed = time.perf_counter() - start
+
+    print("%-10s %7s %7s %9s %9s %14s" % ('roads', 'entries', 'models',
+                                         'polygons', 'vertices',
+                                         'overlap [m^2]'))
+    for label, roadMap in (('ways', roads), ('merged', merged)):
+        print("%-10s %7d %7d %9d %9d %14.1f" % (
+            (label, len(roadMap)) + roadStats(roadMap, args.resolution)))
+    print("mergeRoads: %.4f s, %d junction patches" % (
+        elapsed, sum(1 for road in merged.values()
+                     if road.get('type') == 'junction')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Scaling benchmark on generated cities
+#             Generates synthetic cities of growing area and times writing
+#             them, parsing them with getOsmFile and extracting the features
+#             with Osm2Dict, along with the file size and peak resident set
+#             size. Cities larger than --parseArea are only generated, the
+#             DOM based parser does not fit them in memory
+##############################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.profiling import maxRss
+from gazebo_osm.synthetic import SyntheticCity
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--areas', nargs='*', type=float,
+                        default=[1, 10, 100, 1000],
+                        help='City areas in km^2')
+    parser.add_argument('--parseArea', type=float, default=100,
+                        help='Largest area that is also parsed')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    print("%8s %9s %9s %9s %9s %9s %9s %9s" % (
+        'km^2', 'nodes', 'ways', 'MB', 'write [s]', 'parse [s]',
+        'dict [s]', 'rss [MB]'))
+    try:
+        for area in args.areas:
+            osmFile = os.path.join(directory, 'city.osm')
+            city = SyntheticCity(area, args.seed)
+            start = time.perf_counter()
+            with open(osmFile, 'w') as f:
+                city.write(f)
+            write = time.perf_counter() - start
+            parse = extract = float('nan')
+            if area <= args.parseArea:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    osmDict = getOsmFile([], '', osmFile)
+                    parse = time.perf_counter() - start
+                    start = time.perf_counter()
+                    Osm2Dict(city.origin[0], city.origin[1],
+                             osmDict).getMapDetails()
+                    extract = time.perf_counter() - start
+                    del osmDict
+            rss = maxRss()
+            print("%8g %9d %9d %9.1f %9.3f %9.3f %9.3f %9s" % (
+                area, city.counts['node'], city.counts['way'],
+                os.path.getsize(osmFile) / 1e6, write, parse, extract,
+                '-' if rss is None else '%.0f' % (rss / 1e6)))
+            os.remove(osmFile)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
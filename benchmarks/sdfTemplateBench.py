@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of GetSDF model construction
+#             Times addBuilding/addRoad for a large number of synthetic
+#             features, against the per-SubElement construction used before
+#             the template cloning
+##############################################################################
+
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lxml.etree as Et
+import numpy as np
+
+from gazebo_osm.dict2sdf import GetSDF, MATERIALDICT
+
+
+def legacyAddBuilding(world, pointList, building_name, color, height):
+    '''addBuilding as written before the template cloning'''
+    building = Et.SubElement(world, 'model')
+    building.set('name', building_name)
+    Et.SubElement(building, 'static').text = 'true'
+    Et.SubElement(building, 'pose').text = '0 0 0 0 0 0'
+    link = Et.SubElement(building, 'link')
+    link.set('name', (building_name))
+    collision = Et.SubElement(link, 'collision')
+    collision.set('name', (building_name))
+    visual = Et.SubElement(link, 'visual')
+    visual.set('name', (building_name))
+    material = Et.SubElement(visual, 'material')
+    Et.SubElement(link, 'pose').text = '0 0 0 0 0 0'
+    for col_se in 'ambient diffuse specular'.split():
+        Et.SubElement(material, col_se).text = MATERIALDICT[color][col_se]
+    for colvis in (collision, visual):
+        geometry = Et.SubElement(colvis, 'geometry')
+        polyline = Et.SubElement(geometry, 'polyline')
+        Et.SubElement(polyline, 'height').text = "%f" % height
+        for point in range(np.size(pointList, 1)):
+            Et.SubElement(polyline, 'point').text = \
+                "%f %f" % tuple(pointList[:2, point].tolist())
+
+
+def syntheticBuildings(count, seed=0):
+    '''count closed square footprints in the (3, 5) Osm2Dict layout'''
+    rng = np.random.default_rng(seed)
+    corners = np.array([[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]).T
+    offsets = rng.uniform(0, 5000, size=(count, 2, 1))
+    colors = list(MATERIALDICT.keys())
+    for i in range(count):
+        xy = corners + offsets[i]
+        yield ("building_%d" % i,
+               np.vstack((xy, np.zeros((1, 5)))),
+               colors[i % len(colors)])
+
+
+def timeIt(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def runTemplate(features):
+    sdfFile = GetSDF()
+    for name, points, color in features:
+        sdfFile.addBuilding(None, points, name, color, 15)
+    return sdfFile
+
+
+def runLegacy(features):
+    sdf = Et.Element('sdf')
+    world = Et.SubElement(sdf, 'world')
+    for name, points, color in features:
+        legacyAddBuilding(world, points, name, color, 15)
+    return sdf
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--count', type=int, default=100000,
+                        help='Number of features to construct')
+    args = parser.parse_args()
+    features = list(syntheticBuildings(args.count))
+    legacy = timeIt(runLegacy, features)
+    template = timeIt(runTemplate, features)
+    print("Constructing %d buildings" % args.count)
+    print("  per-SubElement: %8.3f s" % legacy)
+    print("  template clone: %8.3f s  (%.2fx)" % (template, legacy / template))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the world server
+#             Loads a synthetic city as the region of a WorldServer and
+#             requests worlds of random boxes inside it, --concurrency at a
+#             time, reporting the latencies. For comparison the first box is
+#             also generated cold: parsed, extracted and built from scratch
+##############################################################################
+
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from gazebo_osm.cli import main as gzOsm
+from gazebo_osm.server import Region, WorldServer
+from gazebo_osm.synthetic import SyntheticCity
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--area', type=float, default=4.0,
+                        help='Area of the region in km^2')
+    parser.add_argument('--size', type=float, default=500.0,
+                        help='Side of the requested boxes in meters')
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        osmFile = os.path.join(directory, 'region.osm')
+        city = SyntheticCity(args.area)
+        with open(osmFile, 'w') as f:
+            city.write(f)
+        region = city.bounds()
+        rng = np.random.default_rng(0)
+        side = city.blocks * city.blockSize
+        boxes = []
+        for k in range(args.requests):
+            x, y = rng.uniform(0, side - args.size, 2)
+            boxes.append([float(v) for v in city.toLonLat(x, y) +
+                          city.toLonLat(x + args.size, y + args.size)])
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            gzOsm(['-O', osmFile, '-B'] + [repr(v) for v in boxes[0]] +
+                  ['--clip', '-d', os.path.join(directory, 'cold', '')])
+            cold = time.perf_counter() - start
+            server = WorldServer(Region(osmFile, region), args.concurrency)
+        loop = asyncio.new_event_loop()
+        port = loop.run_until_complete(server.start('127.0.0.1', 0))
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+
+        def request(box):
+            with urllib.request.urlopen(
+                    'http://127.0.0.1:%d/world' % port,
+                    json.dumps(dict(bbox=box, clip=True)).encode()) as r:
+                r.read()
+
+        try:
+            start = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(
+                    args.concurrency) as executor:
+                list(executor.map(request, boxes))
+            wall = time.perf_counter() - start
+            with urllib.request.urlopen(
+                    'http://127.0.0.1:%d/metrics' % port) as r:
+                metrics = json.loads(r.read())
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            server.close()
+            loop.close()
+    finally:
+        shutil.rmtree(directory)
+
+    route = metrics['routes']['POST /world']
+    print("region: %g km^2, %d roads, %d buildings, loaded in %.2f s" % (
+        args.area, metrics['region']['roads'], metrics['region']['buildings'],
+        metrics['region']['loadTime']))
+    print("cold gz_osm run:       %8.3f s" % cold)
+    print("%d requests, %d at a time: %.2f requests/s" % (
+        route['count'], args.concurrency, route['count'] / wall))
+    print("latency p50 %.3f s  p90 %.3f s  p99 %.3f s  max %.3f s" % (
+        route['p50'], route['p90'], route['p99'], route['max']))
+
+
+if __name__ == '__main__':
+    main()
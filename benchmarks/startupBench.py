@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the command line start up
+#             Times gz_osm.py --help, a plain sdf run and an image run on an
+#             osm file as separate processes, and lists the slow optional
+#             modules (matplotlib, mapnik, osmapi) each run imports. Point
+#             --script at the gz_osm.py of another checkout to compare
+##############################################################################
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HEAVY = ('matplotlib', 'mapnik', 'osmapi')
+
+
+def importedHeavy(command, cwd):
+    '''The HEAVY modules imported by command, from python -X importtime'''
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command,
+                            cwd=cwd, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    names = set(line.split('|')[-1].strip().split('.')[0]
+                for line in result.stderr.splitlines()
+                if line.startswith('import time:'))
+    return [name for name in HEAVY if name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(here, '..', 'testFiles',
+                                             'umaine.osm'))
+    parser.add_argument('--script',
+                        default=os.path.join(here, '..', 'gz_osm.py'),
+                        help='gz_osm.py to run, from its own directory')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    script = os.path.abspath(args.script)
+    osmFile = os.path.abspath(args.osmFile)
+    directory = tempfile.mkdtemp()
+    runs = [('--help', ['--help']),
+            ('sdf', ['-O', osmFile, '-d', directory + '/']),
+            ('image', ['-O', osmFile, '-d', directory + '/', '-i', 'map.png',
+                       '--renderer', 'matplotlib'])]
+
+    print("%-6s %10s %10s  %s" % ('run', 'median [s]', 'min [s]',
+                                  'heavy imports'))
+    for label, options in runs:
+        command = [script] + options
+        times = []
+        for k in range(args.repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + command,
+                           cwd=os.path.dirname(script),
+                           stdout=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+        print("%-6s %10.3f %10.3f  %s" % (
+            label, np.median(times), np.min(times),
+            ' '.join(importedHeavy(command, os.path.dirname(script))) or '-'))
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
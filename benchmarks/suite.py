@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: End to end benchmark suite
+#             Runs the stages of gz_osm.py (parsing a local osm file,
+#             feature extraction, road dilation, sdf construction and
+#             serialization, image rendering) on the bundled osm files, on
+#             larger copies of them and on generated cities, offline.
+#             Reports the time and peak traced memory of every stage (lxml
+#             trees live outside the python allocator and are not seen),
+#             writes them as JSON and compares them against a stored baseline
+##############################################################################
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lxml.etree as Et
+import numpy as np
+
+from gazebo_osm.dict2sdf import GetSDF
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.meshExport import roadPolygons
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.profiling import resetPeak
+from gazebo_osm.rasterize import RasterMap
+from gazebo_osm.synthetic import generateOsm
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TESTFILES = os.path.join(HERE, '..', 'testFiles')
+BASELINE = os.path.join(HERE, 'baseline.json')
+#dataset name: (osm file, copies per side)
+DATASETS = dict(map=('map.osm', 1),
+                umaine=('umaine.osm', 1),
+                umaine_x4=('umaine.osm', 2),
+                umaine_x16=('umaine.osm', 4))
+#dataset name: area in km^2 of a generated city
+SYNTHETIC = dict(synthetic_1km2=1.0,
+                 synthetic_10km2=10.0,
+                 synthetic_100km2=100.0)
+#Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.02
+MIN_BYTES = 1e6
+
+
+def osmBounds(osmFile):
+    '''[minLon, minLat, maxLon, maxLat] of the bounds of osmFile'''
+    bounds = Et.parse(osmFile).getroot().find('bounds')
+    return [float(bounds.get(k))
+            for k in 'minlon minlat maxlon maxlat'.split()]
+
+
+def replicateOsm(osmFile, side, outputFile):
+    '''Writes side x side copies of osmFile next to each other as one osm
+       file, with the ids of every copy offset so that they stay unique'''
+    root = Et.parse(osmFile).getroot()
+    bounds = root.find('bounds')
+    box = osmBounds(osmFile)
+    span = max(int(e.get('id')) for e in root if e.get('id') is not None) + 1
+    elements = [e for e in root if e.tag in ('node', 'way', 'relation')]
+    for e in elements:
+        root.remove(e)
+    for i in range(side):
+        for j in range(side):
+            offset = (i * side + j) * span
+            for element in elements:
+                element = copy.deepcopy(element)
+                element.set('id', str(int(element.get('id')) + offset))
+                if element.tag == 'node':
+                    element.set('lon', '%.7f' % (float(element.get('lon')) +
+                                                 i * (box[2] - box[0])))
+                    element.set('lat', '%.7f' % (float(element.get('lat')) +
+                                                 j * (box[3] - box[1])))
+                for ref in element.iter('nd', 'member'):
+                    ref.set('ref', str(int(ref.get('ref')) + offset))
+                root.append(element)
+    bounds.set('maxlon', '%.7f' % (box[0] + side * (box[2] - box[0])))
+    bounds.set('maxlat', '%.7f' % (box[1] + side * (box[3] - box[1])))
+    Et.ElementTree(root).write(outputFile, xml_declaration=True,
+                               encoding='UTF-8')
+
+
+def runStages(osmFile, box, imageFile, withMatplotlib):
+    '''Runs the stages in order. Yields (stage, seconds) pairs'''
+    start = time.perf_counter()
+    osmDict = getOsmFile([], '', osmFile)
+    yield 'getOsmFile', time.perf_counter() - start
+
+    start = time.perf_counter()
+    osmRoads = Osm2Dict(box[0], box[1], osmDict)
+    roads, models, buildings = osmRoads.getMapDetails()
+    bbox = osmRoads.getPointBBox(box)
+    yield 'getMapDetails', time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name, road in roads.items():
+        list(roadPolygons(name, road['width'], road['points']))
+    yield 'dilate', time.perf_counter() - start
+
+    start = time.perf_counter()
+    sdfFile = GetSDF()
+    sdfFile.addSphericalCoords(osmRoads.getLat(), osmRoads.getLon())
+    sdfFile.includeModel("sun")
+    sdfFile.addGroundPlane(bbox)
+    sdfFile.addFeatures(roads, models, buildings)
+    yield 'GetSDF', time.perf_counter() - start
+
+    start = time.perf_counter()
+    sdfFile.toString()
+    yield 'serialize', time.perf_counter() - start
+
+    start = time.perf_counter()
+    image = RasterMap(bbox)
+    image.add_buildings(buildings)
+    image.add_roads(roads)
+    image.save_image(imageFile)
+    yield 'RasterMap', time.perf_counter() - start
+
+    if withMatplotlib:
+        from gazebo_osm.getMapImage import MPLBMap
+        import matplotlib.pyplot as plt
+        start = time.perf_counter()
+        image = MPLBMap(bbox)
+        image.add_buildings(buildings)
+        image.add_roads(roads)
+        image.save_image(imageFile)
+        plt.close(image.fig)
+        yield 'MPLBMap', time.perf_counter() - start
+
+
+def measure(osmFile, box, imageFile, repeat, withMatplotlib):
+    '''{stage: {'time', 'median', 'peak'}}: the best and median seconds of
+       repeat runs and, from one more traced run, the peak traced bytes
+       above what was allocated when the stage started'''
+    times = dict()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for k in range(repeat):
+            for stage, seconds in runStages(osmFile, box, imageFile,
+                                            withMatplotlib):
+                times.setdefault(stage, []).append(seconds)
+        peaks = dict()
+        tracemalloc.start()
+        stages = runStages(osmFile, box, imageFile, withMatplotlib)
+        while True:
+            resetPeak()
+            before = tracemalloc.get_traced_memory()[0]
+            try:
+                stage, seconds = next(stages)
+            except StopIteration:
+                break
+            peaks[stage] = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+    return {stage: dict(time=min(values), median=float(np.median(values)),
+                        peak=peaks[stage])
+            for stage, values in times.items()}
+
+
+def compare(results, baseline, tolerance):
+    '''Prints the results next to the baseline. Returns the regressions:
+       stages slower or larger than the baseline by more than tolerance'''
+    regressions = []
+    print("%-15s %-14s %9s %8s %10s %8s" % ('dataset', 'stage', 'time [s]',
+                                            'x base', 'peak [MB]', 'x base'))
+    for dataset, stages in results.items():
+        for stage, result in stages.items():
+            base = baseline.get(dataset, {}).get(stage)
+            ratios = ['%8s' % '-', '%8s' % '-']
+            if base:
+                for k, (key, floor) in enumerate((('time', MIN_SECONDS),
+                                                  ('peak', MIN_BYTES))):
+                    ratio = result[key] / max(base[key], 1e-12)
+                    ratios[k] = '%8.2f' % ratio
+                    if (ratio > 1 + tolerance and
+                            result[key] - base[key] > floor):
+                        ratios[k] += ' !'
+                        regressions.append((dataset, stage, key, ratio))
+            print("%-15s %-14s %9.4f %s %10.2f %s" % (
+                dataset, stage, result['time'], ratios[0],
+                result['peak'] / 1e6, ratios[1]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datasets', nargs='*',
+                        choices=list(DATASETS) + list(SYNTHETIC),
+                        default=list(DATASETS) + ['synthetic_1km2'])
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed runs per dataset, the best one counts')
+    parser.add_argument('--noMatplotlib', action='store_true',
+                        help='Skip the MPLBMap stage')
+    parser.add_argument('--output', help='Write the results to this file')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='Results to compare against')
+    parser.add_argument('--saveBaseline', action='store_true',
+                        help=('Store the results in the baseline, ' +
+                              'replacing those of the same datasets'))
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slow down or growth over the baseline')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    results = dict()
+    try:
+        for dataset in args.datasets:
+            if dataset in SYNTHETIC:
+                osmFile = os.path.join(directory, dataset + '.osm')
+                generateOsm(osmFile, SYNTHETIC[dataset])
+                filename, side = osmFile, 1
+            else:
+                filename, side = DATASETS[dataset]
+                osmFile = os.path.join(TESTFILES, filename)
+            if side > 1:
+                replicated = os.path.join(directory, dataset + '.osm')
+                replicateOsm(osmFile, side, replicated)
+                osmFile = replicated
+            results[dataset] = measure(osmFile, osmBounds(osmFile),
+                                       os.path.join(directory, 'map.png'),
+                                       args.repeat, not args.noMatplotlib)
+    finally:
+        shutil.rmtree(directory)
+
+    report = dict(python=platform.python_version(),
+                  platform=platform.platform(),
+                  numpy=np.__version__,
+                  cpus=os.cpu_count(),
+                  date=time.strftime('%Y-%m-%d'),
+                  repeat=args.repeat,
+                  results=results)
+    baseline = dict()
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.saveBaseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(report, results=baseline), f, indent=2,
+                      sort_keys=True)
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("%d regressions over %s" % (len(regressions), args.baseline))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Benchmark of the XYZ tile pyramid
+#             Renders the slippy map tiles of an osm file, replicated on a
+#             grid for a larger map, with one and more worker processes and
+#             reports the tiles written and skipped and the time taken
+##############################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from mergeBench import loadFeatures
+from parallelBench import replicate
+from gazebo_osm.tilePyramid import writeTilePyramid
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('osmFile', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), '..',
+                                             'testFiles', 'umaine.osm'))
+    parser.add_argument('--copies', type=int, default=1,
+                        help='Number of copies of the osm features')
+    parser.add_argument('--zoom', type=int, nargs=2, default=[14, 19])
+    parser.add_argument('--jobs', type=int, nargs='*',
+                        default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+    osmRoads, box, features = loadFeatures(args.osmFile)
+    bbox = osmRoads.getPointBBox(box)
+    spacing = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
+    roads, models, buildings = replicate(features, args.copies, spacing)
+    # Stretch the lon, lat box over the copies
+    side = int(args.copies ** 0.5 + 0.999)
+    scale = [(side - 1) * spacing / (bbox[2] - bbox[0]) + 1,
+             (side - 1) * spacing / (bbox[3] - bbox[1]) + 1]
+    box = [box[0], box[1], box[0] + (box[2] - box[0]) * scale[0],
+           box[1] + (box[3] - box[1]) * scale[1]]
+
+    print("%5s %8s %8s %9s" % ('jobs', 'written', 'skipped', 'time [s]'))
+    for jobs in args.jobs:
+        directory = tempfile.mkdtemp()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            written, skipped = writeTilePyramid(
+                directory, osmRoads.getPoints, box,
+                range(args.zoom[0], args.zoom[1] + 1), roads, buildings, jobs)
+        elapsed = time.perf_counter() - start
+        shutil.rmtree(directory)
+        print("%5d %8d %8d %9.3f" % (jobs, written, skipped, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Converts OpenStreetMap data into Gazebo worlds
+#             The modules are imported on demand, e.g.
+#             from gazebo_osm.osm2dict import Osm2Dict; the command line
+#             program is gazebo_osm.cli.main()
+##############################################################################
+
+__version__ = '1.0'
@@ -0,0 +1,393 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: runManifest()
+#             Batch mode of gz_osm: runs the jobs of a JSON or CSV manifest,
+#             each a bounding box or an input osm file with its own flags
+#             and output directory. Jobs reading the same data form a group:
+#             overlapping bounding boxes are downloaded once as their union,
+#             within the limits of the OSM API, into a download cache, and
+#             every group runs in one worker process that parses the file
+#             once and extracts the features once per flag set, mapped to
+#             the frame of each job
+##############################################################################
+
+import concurrent.futures
+import contextlib
+import csv
+import json
+import os
+import re
+import shlex
+import tempfile
+import time
+import traceback
+
+import numpy as np
+
+from .getOsmFile import downloadOsmFile, parseOsmFile
+from .osm2dict import Osm2Dict
+from .spatialIndex import frameTransform, transformFeatures
+
+#Columns of a CSV manifest and keys of the jobs of a JSON manifest
+JOB_KEYS = ('name', 'bbox', 'inputOsmFile', 'directory', 'outFile', 'flags')
+#Log of every job, in its output directory
+LOG_FILE = 'gz_osm.log'
+#Largest area in square degrees the OSM API returns
+MAX_DOWNLOAD_AREA = 0.25
+#Largest ratio of the area of a union box to the summed areas of its boxes,
+#so that a chain of overlapping boxes does not download the land between
+MAX_UNION_RATIO = 2.0
+#Largest error in meters of the features of a group extraction mapped to
+#the frame of a job; beyond it the job extracts them on its own
+MAX_FIT_ERROR = 1e-3
+#Download cache file of a box
+DOWNLOAD_NAME = 'osm_%.7f_%.7f_%.7f_%.7f.osm'
+
+
+def splitFlags(flags):
+    '''Command line flags from a list or a shell quoted string'''
+    if not flags:
+        return []
+    if isinstance(flags, str):
+        return shlex.split(flags)
+    return [str(flag) for flag in flags]
+
+
+def readManifest(filename):
+    '''Jobs of the manifest filename, a CSV file with JOB_KEYS columns or a
+       JSON file holding a list of jobs or {"defaults": job, "jobs": list}.
+       Every job is a dictionary of JOB_KEYS; relative paths are relative to
+       the manifest and the defaults' flags come before the job's own'''
+    base = os.path.dirname(os.path.abspath(filename))
+    defaults = dict()
+    with open(filename, newline='') as f:
+        if filename.lower().endswith('.csv'):
+            rows = [{key: value for key, value in row.items() if value}
+                    for row in csv.DictReader(f)]
+        else:
+            manifest = json.load(f)
+            if isinstance(manifest, list):
+                manifest = dict(jobs=manifest)
+            defaults = manifest.get('defaults', dict())
+            rows = manifest['jobs']
+
+    jobs = []
+    for k, row in enumerate([defaults] + rows):
+        unknown = set(row) - set(JOB_KEYS)
+        if unknown:
+            raise ValueError("%s: unknown job keys %s" % (
+                filename, ', '.join(sorted(unknown))))
+        if k == 0:
+            continue
+        job = dict(defaults, **row)
+        job['name'] = str(job.get('name', 'job%d' % (k - 1)))
+        job['flags'] = (splitFlags(defaults.get('flags')) +
+                        splitFlags(row.get('flags')))
+        bbox = job.get('bbox')
+        if isinstance(bbox, str):
+            bbox = re.split(r'[\s,]+', bbox.strip())
+        if bbox is not None:
+            bbox = [float(value) for value in bbox]
+            if (len(bbox) != 4 or bbox[0] >= bbox[2] or
+                    bbox[1] >= bbox[3]):
+                raise ValueError("%s: job %s: bbox must be MinLon MinLat "
+                                 "MaxLon MaxLat" % (filename, job['name']))
+        job['bbox'] = bbox
+        if (bbox is None) == (job.get('inputOsmFile') is None):
+            raise ValueError("%s: job %s needs either a bbox or an "
+                             "inputOsmFile" % (filename, job['name']))
+        if job.get('inputOsmFile'):
+            job['inputOsmFile'] = os.path.join(base, job['inputOsmFile'])
+        job['directory'] = os.path.join(base,
+                                        job.get('directory', job['name']))
+        jobs.append(job)
+
+    names = [job['name'] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("%s: job names must be unique" % filename)
+    return jobs
+
+
+def boxesOverlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def boxArea(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def unionBox(a, b):
+    return [min(a[0], b[0]), min(a[1], b[1]),
+            max(a[2], b[2]), max(a[3], b[3])]
+
+
+def groupJobs(jobs):
+    '''Groups the jobs by the data they read: one group per input osm file
+       and one per set of overlapping bounding boxes, with their union as
+       the box to download. A box only joins a group while the union stays
+       within MAX_DOWNLOAD_AREA and MAX_UNION_RATIO times the summed areas
+       of the boxes, otherwise it starts a group of its own. Returns
+       dictionaries with the osmFile or box of the group and its jobs'''
+    groups = dict()
+    boxed = []
+    for job in jobs:
+        if job['bbox'] is None:
+            groups.setdefault(job['inputOsmFile'], []).append(job)
+        else:
+            boxed.append(job)
+    result = [dict(osmFile=osmFile, box=None, jobs=members)
+              for osmFile, members in groups.items()]
+
+    # Connected components of the overlap graph
+    remaining = list(boxed)
+    while remaining:
+        component = [remaining.pop(0)]
+        box = list(component[0]['bbox'])
+        area = boxArea(box)
+        grown = True
+        while grown:
+            grown = False
+            for job in list(remaining):
+                if not boxesOverlap(box, job['bbox']):
+                    continue
+                union = unionBox(box, job['bbox'])
+                if (boxArea(union) > MAX_DOWNLOAD_AREA or boxArea(union) >
+                        MAX_UNION_RATIO * (area + boxArea(job['bbox']))):
+                    continue
+                remaining.remove(job)
+                component.append(job)
+                box = union
+                area += boxArea(job['bbox'])
+                grown = True
+        result.append(dict(osmFile=None, box=box, jobs=component))
+    return result
+
+
+def splitGroups(groups, workers):
+    '''Halves the largest groups until there is a group per worker. The
+       jobs of a bounding box group are halved along the longer side of its
+       box and every half gets the union of its own boxes, so that it
+       downloads and parses only its part of the data. The halves of an
+       input osm file group each parse the whole file again, but run in
+       parallel'''
+    groups = sorted(groups, key=lambda group: -len(group['jobs']))
+    while len(groups) < workers and len(groups[0]['jobs']) > 1:
+        group = groups.pop(0)
+        jobs = group['jobs']
+        if group['box'] is not None:
+            box = group['box']
+            axis = 0 if box[2] - box[0] >= box[3] - box[1] else 1
+            jobs = sorted(jobs, key=lambda job: job['bbox'][axis] +
+                          job['bbox'][axis + 2])
+        half = len(jobs) // 2
+        for members in (jobs[:half], jobs[half:]):
+            box = group['box']
+            if box is not None:
+                box = members[0]['bbox']
+                for job in members[1:]:
+                    box = unionBox(box, job['bbox'])
+            groups.append(dict(group, box=box, jobs=members))
+        groups.sort(key=lambda group: -len(group['jobs']))
+    return groups
+
+
+def cachedBox(box, directory):
+    '''Path of the smallest download in the cache directory covering box,
+       or None'''
+    if not os.path.isdir(directory):
+        return None
+    found = []
+    for name in os.listdir(directory):
+        match = re.match(r'^osm_([-0-9.]+)_([-0-9.]+)_([-0-9.]+)_([-0-9.]+)'
+                         r'\.osm$', name)
+        if match:
+            cached = [float(value) for value in match.groups()]
+            if (cached[0] <= box[0] and cached[1] <= box[1] and
+                    box[2] <= cached[2] and box[3] <= cached[3]):
+                found.append((boxArea(cached), name))
+    return os.path.join(directory, min(found)[1]) if found else None
+
+
+def cachedDownload(box, directory):
+    '''Path of the osm file of box in the download cache directory,
+       downloading it unless an earlier run already did, for box or for a
+       box covering it'''
+    filename = os.path.join(directory, DOWNLOAD_NAME % tuple(box))
+    if not os.path.exists(filename):
+        covering = cachedBox(box, directory)
+        if covering is not None:
+            return covering
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(handle)
+        try:
+            downloadOsmFile(box, temporary)
+            # mkstemp creates the file 0600, give it the mode of open()
+            mask = os.umask(0)
+            os.umask(mask)
+            os.chmod(temporary, 0o666 & ~mask)
+            os.replace(temporary, filename)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+    return filename
+
+
+class SourceCache:
+    '''Parsed osm files and extracted features shared by the jobs of a group.
+       A file is extracted once per flag set, around the origin of the first
+       job; the other jobs get these features mapped to the frame of their
+       own origin by spatialIndex.frameTransform(), unless it is off by
+       more than MAX_FIT_ERROR over the nodes of the file. With downloaded,
+       the jobs read a download covering their bounding box and keep the
+       features touching it, as the OSM API selects them. Extraction
+       results are reused as they are, so jobs must not modify the feature
+       dictionaries they get'''
+
+    def __init__(self, downloaded=False):
+        self.downloaded = downloaded
+        self.parsed = dict()
+        self.extracted = dict()
+        #First extraction key and lon/lat node bounds per file and flag set
+        self.sources = dict()
+
+    def parse(self, osmFile):
+        key = os.path.abspath(osmFile)
+        if key not in self.parsed:
+            self.parsed[key] = parseOsmFile(osmFile)
+        return self.parsed[key]
+
+    def extract(self, osmFile, origin, flags):
+        '''(osm2dict, roads, models, buildings) of osmFile projected around
+           origin (lon, lat) with the display flags'''
+        key = (os.path.abspath(osmFile), tuple(origin), tuple(sorted(flags)))
+        if key in self.extracted:
+            return self.extracted[key]
+        source = self.sources.get(key[::2])
+        if source is not None:
+            sourceKey, bounds = source
+            osmRoads = Osm2Dict(origin[0], origin[1], [], list(flags))
+            transform, error = frameTransform(self.extracted[sourceKey][0],
+                                              osmRoads, bounds)
+            if error <= MAX_FIT_ERROR:
+                self.extracted[key] = (osmRoads,) + tuple(
+                    transformFeatures(features, transform)
+                    for features in self.extracted[sourceKey][1:])
+                return self.extracted[key]
+        osmRoads = Osm2Dict(origin[0], origin[1], self.parse(osmFile),
+                            list(flags))
+        self.extracted[key] = (osmRoads,) + tuple(osmRoads.getMapDetails())
+        if source is None and osmRoads.node:
+            lonLat = np.array([[float(node['lon']), float(node['lat'])]
+                               for node in osmRoads.node.values()])
+            self.sources[key[::2]] = (key, list(lonLat.min(axis=0)) +
+                                      list(lonLat.max(axis=0)))
+        return self.extracted[key]
+
+
+def jobArgv(job, osmFile):
+    '''gz_osm arguments of job reading osmFile. Jobs run on one cpu each
+       unless their flags say otherwise'''
+    argv = ['--jobs', '1', '--directory', os.path.join(job['directory'], ''),
+            '--inputOsmFile', osmFile]
+    if job.get('outFile'):
+        argv += ['--outFile', job['outFile']]
+    if job['bbox'] is not None:
+        argv += ['--boundingbox'] + ['%r' % value for value in job['bbox']]
+    return argv + job['flags']
+
+
+def runGroup(group):
+    '''Runs the jobs of a group one after the other, sharing a SourceCache.
+       The output of every job goes to LOG_FILE in its directory. Returns a
+       (name, status, seconds, error) tuple per job'''
+    from .cli import main
+    cache = SourceCache(downloaded=group['box'] is not None)
+    results = []
+    for job in group['jobs']:
+        start = time.perf_counter()
+        error = None
+        if not os.path.exists(job['directory']):
+            os.makedirs(job['directory'])
+        with open(os.path.join(job['directory'], LOG_FILE), 'w') as log, \
+                contextlib.redirect_stdout(log), \
+                contextlib.redirect_stderr(log):
+            try:
+                status = main(jobArgv(job, group['osmFile']), cache)
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 1
+                error = "invalid arguments"
+            except Exception as e:
+                traceback.print_exc()
+                status = 1
+                error = "%s: %s" % (type(e).__name__, e)
+        results.append((job['name'], status, time.perf_counter() - start,
+                        error))
+    return results
+
+
+def runBatch(jobs, processes=None, downloadDirectory='downloads'):
+    '''Runs the jobs on a pool of processes (default: all cpus), one group
+       of jobs reading the same data per task. Returns the runGroup results
+       in the order of jobs'''
+    results = dict()
+    processes = processes or os.cpu_count() or 1
+    pending = groupJobs(jobs)
+    pending = splitGroups(pending, processes) if pending else pending
+    groups = []
+    while pending:
+        group = pending.pop(0)
+        if group['osmFile'] is None:
+            try:
+                group['osmFile'] = cachedDownload(group['box'],
+                                                  downloadDirectory)
+            except Exception as e:
+                if len(group['jobs']) > 1:
+                    # Such as a union beyond the node limit of the API: the
+                    # jobs download their own boxes
+                    pending += [dict(osmFile=None, box=job['bbox'],
+                                     jobs=[job]) for job in group['jobs']]
+                    continue
+                for job in group['jobs']:
+                    results[job['name']] = (job['name'], 1, 0.0,
+                                            "download failed: %s" % e)
+                continue
+        groups.append(group)
+
+    if processes == 1 or len(groups) <= 1:
+        for group in groups:
+            for result in runGroup(group):
+                results[result[0]] = result
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                min(processes, len(groups))) as executor:
+            for groupResults in executor.map(runGroup, groups):
+                for result in groupResults:
+                    results[result[0]] = result
+    return [results[job['name']] for job in jobs]
+
+
+def runManifest(manifest, processes=None, downloadDirectory=None):
+    '''Runs the jobs of the manifest file and prints their outcome.
+       Downloads are cached in downloadDirectory, by default the downloads
+       folder next to the manifest. Returns the exit status: 1 if any job
+       failed'''
+    jobs = readManifest(manifest)
+    if downloadDirectory is None:
+        downloadDirectory = os.path.join(
+            os.path.dirname(os.path.abspath(manifest)), 'downloads')
+    start = time.perf_counter()
+    results = runBatch(jobs, processes, downloadDirectory)
+    failed = 0
+    for name, status, seconds, error in results:
+        if status:
+            failed += 1
+            print("%s: failed (%s)" % (name,
+                                       error or "exit status %s" % status))
+        else:
+            print("%s: done in %.2f seconds" % (name, seconds))
+    print("%d of %d jobs done in %.2f seconds" % (
+        len(results) - failed, len(results), time.perf_counter() - start))
+    return 1 if failed else 0
@@ -0,0 +1,675 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: main()
+#             Command line entry point converting an osm file or a bounding
+#             box into a gazebo world. Modules with slow imports (matplotlib,
+#             mapnik, osmapi) are only imported by the stage that needs
+#             them, so --help and plain sdf runs start quickly
+##############################################################################
+
+import os
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .dict2sdf import (GetSDF, MERGEMODES, BUILDINGCOLLISIONS,
+                       ROADCOLLISIONS, fileUri)
+from .osm2dict import Osm2Dict
+from .getOsmFile import downloadOsmFile, parseOsmFile, osmBounds
+from .spatialIndex import cropFeatures, touchingFeatures
+from .meshExport import MeshBuilder
+from .tiling import writeTiles
+from .rasterize import RasterMap
+from .occupancyMap import OccupancyMap, BACKGROUNDS
+from .tilePyramid import writeTilePyramid
+from .roadGraph import mergeRoads
+from .modelResolver import ModelResolver, SOURCES, MISSING
+from .profiling import Profiler, featureCounts, runStage, maxRss
+from .memoryBudget import MemoryBudget
+from .streamedOsm2Dict import StreamedOsm2Dict
+from .compactFeatures import snapFeatures, readFeatures, writeFeatures
+
+#Bounding box used when neither --boundingbox nor --inputOsmFile is given
+DEFAULT_BOX = [-75.380, 40.606, -75.377, 40.609]
+
+parser = argparse.ArgumentParser()
+parser.add_argument('-f', '--outFile',
+                    help='Output file name', type=str, default='outFile.sdf')
+parser.add_argument('-o', '--osmFile', help='Name of the osm file generated',
+                    type=str,
+                    default='map.osm')
+parser.add_argument('-O', '--inputOsmFile', help='Name of the Input osm file',
+                    type=str,
+                    default='')
+parser.add_argument('-i', '--imageFile',
+                    help='Generate and name .png image of the selected areas',
+                    type=str,
+                    default='')
+parser.add_argument('--renderer',
+                    help=('Image renderer: the built in numpy rasterizer ' +
+                          'or matplotlib'),
+                    choices=('raster', 'matplotlib'),
+                    default='raster')
+parser.add_argument('--occupancyMap',
+                    help=('Also write a map_server occupancy grid as ' +
+                          'OCCUPANCYMAP.pgm and OCCUPANCYMAP.yaml'),
+                    type=str,
+                    default='')
+parser.add_argument('--resolution',
+                    help='Occupancy grid cell size in meters',
+                    type=float,
+                    default=0.05)
+parser.add_argument('--occupancyBackground',
+                    help=('Occupancy of the cells that are neither road ' +
+                          'nor building'),
+                    choices=sorted(BACKGROUNDS),
+                    default='unknown')
+parser.add_argument('--occupancyTileSize',
+                    help=('Split the occupancy grid into tiles of this ' +
+                          'size in meters'),
+                    type=float,
+                    default=None)
+parser.add_argument('--xyzTiles',
+                    help=('Also render z/x/y.png slippy map tiles of the ' +
+                          'roads and buildings into this folder of the ' +
+                          'output directory'),
+                    type=str,
+                    default='')
+parser.add_argument('--xyzZoom',
+                    help='Lowest and highest zoom level of --xyzTiles',
+                    nargs=2,
+                    type=int,
+                    default=[15, 18])
+parser.add_argument('-d', '--directory',
+                    help='Output directory',
+                    type=str,
+                    default='./')
+parser.add_argument('-B', '--boundingbox',
+                    help=('Give the bounding box for the area\n' +
+                          'Format: MinLon MinLat MaxLon MaxLat. With ' +
+                          '--inputOsmFile it defaults to the bounds of the ' +
+                          'file'),
+                    nargs='*',
+                    type=float,
+                    default=None)
+
+parser.add_argument('-r', '--roads',
+                    help='Display Roads',
+                    action='store_true')
+
+parser.add_argument('-m', '--models',
+                    help='Display models',
+                    action='store_true')
+
+parser.add_argument('-b', '--buildings',
+                    help='Display buildings',
+                    action='store_true')
+
+parser.add_argument('-a', '--displayAll',
+                    help='Display roads and models',
+                    action='store_true')
+parser.add_argument('-c', '--clip',
+                    help=('Cull features outside the bounding box and clip ' +
+                          'the ones crossing its edge'),
+                    action='store_true')
+parser.add_argument('--mergeRoads',
+                    help=('Stitch ways of the same highway type into long ' +
+                          'roads, trim them at junctions and add junction ' +
+                          'patches instead of overlapping road ends'),
+                    action='store_true')
+parser.add_argument('--merge',
+                    help=('Group roads and buildings into a few static ' +
+                          'models with one link per feature, by feature ' +
+                          'class, material or grid cell'),
+                    choices=MERGEMODES,
+                    default=None)
+parser.add_argument('--mergeCellSize',
+                    help='Grid cell size in meters for --merge cell',
+                    type=float,
+                    default=200.0)
+parser.add_argument('--buildingCollision',
+                    help=('Collision geometry of buildings: the full ' +
+                          'footprint, its convex hull or its oriented ' +
+                          'bounding box'),
+                    choices=BUILDINGCOLLISIONS,
+                    default='full')
+parser.add_argument('--roadCollision',
+                    help=('Collision geometry of roads: the full polygons, ' +
+                          'none (ground plane only) or one box covering ' +
+                          'all roads'),
+                    choices=ROADCOLLISIONS,
+                    default='full')
+parser.add_argument('--cacheDir',
+                    help=('Directory of the serialized road and building ' +
+                          'cache reused across runs (not used with --merge)'),
+                    type=str,
+                    default=None)
+parser.add_argument('--mesh',
+                    help=('Write roads and buildings as extruded STL ' +
+                          'meshes, one per material, into the meshes/ ' +
+                          'folder of the output directory'),
+                    action='store_true')
+parser.add_argument('--meshTileSize',
+                    help=('Also split the --mesh files into tiles of this ' +
+                          'size in meters'),
+                    type=float,
+                    default=None)
+parser.add_argument('--tileSize',
+                    help=('Split the world into tile models of this size ' +
+                          'in meters, written to the tiles/ folder of the ' +
+                          'output directory and included from the output ' +
+                          'file'),
+                    type=float,
+                    default=None)
+parser.add_argument('--dem',
+                    help=('Elevation files (.hgt, uncompressed GeoTIFF or ' +
+                          'ESRI .asc grid in lon/lat) raising the roads, ' +
+                          'buildings and models and replacing the ground ' +
+                          'plane by a heightmap'),
+                    nargs='+',
+                    default=None)
+parser.add_argument('--demResolution',
+                    help='Largest heightmap pixel size in meters',
+                    type=float,
+                    default=10.0)
+parser.add_argument('--modelSource',
+                    help=('Uri of the included models: their Gazebo Fuel ' +
+                          'url, or the model directory found on --modelPath ' +
+                          'by path or as a model:// uri'),
+                    choices=SOURCES,
+                    default='fuel')
+parser.add_argument('--modelPath',
+                    help=('Model directories searched before the Gazebo ' +
+                          'model path variables and the Fuel caches'),
+                    nargs='+',
+                    default=None)
+parser.add_argument('--missingModels',
+                    help=('What becomes of the models not found locally: ' +
+                          'included as model://name, which classic Gazebo ' +
+                          'fetches online, skipped (default), or an error'),
+                    choices=MISSING,
+                    default=None)
+parser.add_argument('--instanceModels',
+                    help=('Add the models found locally as links of one ' +
+                          'static model per model type, sharing their ' +
+                          'meshes, instead of one include each (needs ' +
+                          '--modelSource path or uri)'),
+                    action='store_true')
+parser.add_argument('-j', '--jobs',
+                    help=('Number of worker processes building tiles, map ' +
+                          'tiles or roads and buildings (default: all cpus)'),
+                    type=int,
+                    default=None)
+parser.add_argument('--profile',
+                    help=('Write the time, memory and feature counts of ' +
+                          'every stage to this JSON file; tracing the ' +
+                          'memory slows the run down'),
+                    type=str,
+                    default='')
+parser.add_argument('--profileStats',
+                    help=('With --profile also write a cProfile file ' +
+                          'PROFILE_<stage>.prof of every stage'),
+                    action='store_true')
+parser.add_argument('--sequential',
+                    help=('Run the image, occupancy grid and map tile ' +
+                          'stages one after the other in this process ' +
+                          'instead of in worker processes next to the sdf ' +
+                          'stage'),
+                    action='store_true')
+parser.add_argument('--maxMemory',
+                    help=('Memory budget in MB. Streams the osm file, ' +
+                          'spills node, way, feature and sdf buffers beyond ' +
+                          'it to temporary memory mapped files and runs the ' +
+                          'stages one at a time (-j defaults to 1)'),
+                    type=float,
+                    default=None)
+parser.add_argument('--compact',
+                    help=('Round the extracted points to centimeters and ' +
+                          'send features to worker processes as int32 ' +
+                          'coordinates, as in --saveFeatures files'),
+                    action='store_true')
+parser.add_argument('--saveFeatures',
+                    help=('Write the extracted features to this file in ' +
+                          'the compact format (implies --compact)'),
+                    type=str,
+                    default=None)
+parser.add_argument('--loadFeatures',
+                    help=('Build the world from the features of a ' +
+                          '--saveFeatures file instead of osm data, in its ' +
+                          'bounding box'),
+                    type=str,
+                    default=None)
+parser.add_argument('--batch',
+                    help=('Run the jobs of this JSON or CSV manifest, each ' +
+                          'a bounding box or input osm file with its own ' +
+                          'flags and output directory, on --jobs processes. ' +
+                          'Jobs reading the same data share one download ' +
+                          'and one parse'),
+                    type=str,
+                    default='')
+parser.add_argument('--downloadCache',
+                    help=('Directory of the osm downloads reused by --batch ' +
+                          'runs (default: downloads/ next to the manifest)'),
+                    type=str,
+                    default=None)
+parser.add_argument('--interactive',
+                    help='Starts the interactive version of the program',
+                    action='store_true')
+
+
+def imageStage(counts, args, roadPointWidthMap, buildingLocationMap):
+    '''Renders the png image of the roads and buildings'''
+    print("Building the image file ...")
+    bbox = Osm2Dict(args.boundingbox[0], args.boundingbox[1],
+                    []).getPointBBox(args.boundingbox)
+    #getMapImage(osmDictionary, args.imageFile)
+    if args.renderer == 'matplotlib':
+        from .getMapImage import MPLBMap
+        mplbmap = MPLBMap(bbox)
+    else:
+        mplbmap = RasterMap(bbox)
+    mplbmap.add_buildings(buildingLocationMap)
+    mplbmap.add_roads(roadPointWidthMap)
+    mplbmap.save_image(args.imageFile)
+    counts['bytes'] = os.path.getsize(args.imageFile)
+
+
+def occupancyStage(counts, args, roadPointWidthMap, buildingLocationMap):
+    '''Writes the occupancy grid of the roads and buildings'''
+    print("Building the occupancy grid ...")
+    occupancyMap = OccupancyMap(
+        Osm2Dict(args.boundingbox[0], args.boundingbox[1],
+                 []).getPointBBox(args.boundingbox),
+        args.resolution,
+        BACKGROUNDS[args.occupancyBackground])
+    occupancyMap.add_roads(roadPointWidthMap)
+    occupancyMap.add_buildings(buildingLocationMap)
+    counts['files'] = len(occupancyMap.save(
+        args.directory + args.occupancyMap, args.occupancyTileSize))
+    counts['cells'] = occupancyMap.shape[0] * occupancyMap.shape[1]
+
+
+def xyzTilesStage(counts, args, roadPointWidthMap, buildingLocationMap):
+    '''Renders the slippy map tiles of the roads and buildings'''
+    print("Rendering the map tiles ...")
+    written, skipped = writeTilePyramid(
+        os.path.join(args.directory, args.xyzTiles),
+        Osm2Dict(args.boundingbox[0], args.boundingbox[1], []).getPoints,
+        args.boundingbox,
+        range(args.xyzZoom[0], args.xyzZoom[1] + 1),
+        roadPointWidthMap,
+        buildingLocationMap,
+        args.jobs)
+    print("Wrote %d map tiles, %d empty" % (written, skipped))
+    counts.update(written=written, skipped=skipped)
+
+
+def main(argv=None, cache=None):
+    '''Runs gz_osm with the command line arguments argv (by default
+       sys.argv). A batch.SourceCache passed as cache supplies the parsed
+       osm data and extracted features, of which the features touching the
+       bounding box are kept if the cache holds downloads. Returns the exit
+       status'''
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        from .batch import runManifest
+        return runManifest(args.batch, args.jobs, args.downloadCache)
+
+    if args.mesh and args.tileSize:
+        parser.error("--mesh and --tileSize cannot be combined")
+    if args.profileStats and not args.profile:
+        parser.error("--profileStats needs --profile")
+    if args.instanceModels and args.modelSource == 'fuel':
+        parser.error("--instanceModels needs --modelSource path or uri")
+    if args.loadFeatures and (args.inputOsmFile or args.boundingbox or
+                              args.interactive):
+        parser.error("--loadFeatures takes the bounding box of the file, "
+                     "without --inputOsmFile, --boundingbox or --interactive")
+    args.compact = (args.compact or bool(args.saveFeatures) or
+                    bool(args.loadFeatures))
+    budget = None
+    if args.maxMemory:
+        budget = MemoryBudget(int(args.maxMemory * 2**20))
+        args.sequential = True
+        if args.jobs is None:
+            args.jobs = 1
+
+    flags = []
+
+    if args.buildings:
+        flags.append('b')
+
+    if args.models:
+        flags.append('m')
+
+    if args.roads:
+        flags.append('r')
+
+    if not(args.roads or args.models or args.buildings) or args.displayAll:
+        flags.append('a')
+
+    if not os.path.exists(args.directory):
+        os.makedirs(args.directory)
+
+    args.osmFile = args.directory + args.osmFile
+    args.outFile = args.directory + args.outFile
+
+    osmDictionary = {}
+
+    if args.interactive:
+        print("\nPlease enter the latitudnal and logitudnal" +
+              " coordinates of the area or select from" +
+              " default by hitting return twice \n")
+
+        startCoords = input("Enter starting coordinates: " +
+                                "[lon lat] :").split(' ')
+        endCoords = input("Enter ending coordnates: [lon lat]: ").split(' ')
+
+        if (startCoords and endCoords and
+                len(startCoords) == 2 and len(endCoords) == 2):
+
+            for incoords in range(2):
+
+                startCoords[incoords] = float(startCoords[incoords])
+                endCoords[incoords] = float(endCoords[incoords])
+
+        else:
+
+            choice = input("Default Coordinate options: West El " +
+                               "Camino Real Highway, CA (2), Bethlehem," +
+                               " PA (default=1): ")
+
+            if choice != '2':
+                startCoords = [40.61, -75.382]
+                endCoords = [40.608, -75.3714]
+
+            else:
+                startCoords = [37.385844, -122.101464]
+                endCoords = [37.395664, -122.083697]
+
+        option = input("Do you want to view the area specified? [Y/N]" +
+                           " (default: Y): ").upper()
+
+        osmFile = 'map.osm'
+        args.boundingbox = [min(startCoords[1], endCoords[1]),
+                            min(startCoords[0], endCoords[0]),
+                            max(startCoords[1], endCoords[1]),
+                            max(startCoords[0], endCoords[0])]
+
+        if option != 'N':
+            args.imageFile = 'map.png'
+
+    if args.imageFile:
+        args.imageFile = args.directory + args.imageFile
+
+    profiler = Profiler(bool(args.profile),
+                        (os.path.splitext(args.profile)[0]
+                         if args.profileStats else None))
+    loaded = None
+    if args.loadFeatures:
+        with profiler.stage('load') as counts:
+            print("Loading the features ... ")
+            try:
+                header, loaded = readFeatures(args.loadFeatures)
+            except (OSError, ValueError) as e:
+                parser.error("%s: %s" % (args.loadFeatures, e))
+            args.boundingbox = header['boundingbox']
+            counts.update(bytes=os.path.getsize(args.loadFeatures),
+                          roads=featureCounts(loaded[0]),
+                          models=featureCounts(loaded[1]),
+                          buildings=featureCounts(loaded[2]))
+
+    if args.inputOsmFile and args.boundingbox is None:
+        args.boundingbox = osmBounds(args.inputOsmFile)
+        if args.boundingbox is None:
+            parser.error("%s has no bounds, give --boundingbox" %
+                         args.inputOsmFile)
+    elif args.boundingbox is None:
+        args.boundingbox = DEFAULT_BOX
+    if not args.inputOsmFile and loaded is None:
+        with profiler.stage('download') as counts:
+            print("Downloading the osm data ... ")
+            downloadOsmFile(args.boundingbox, args.osmFile)
+            counts['bytes'] = os.path.getsize(args.osmFile)
+
+    terrain = None
+    heightmap = None
+    elevation = 0.0
+    if args.dem:
+        with profiler.stage('terrain') as counts:
+            print("Sampling the terrain ...")
+            from .terrain import Terrain, openDem, writeHeightmap
+            local = Osm2Dict(args.boundingbox[0], args.boundingbox[1], [])
+            try:
+                terrain = Terrain([openDem(dem) for dem in args.dem])
+            except (OSError, ValueError) as e:
+                parser.error(str(e))
+            heights = terrain.heightmap(local.getPoints, args.boundingbox,
+                                        local.getPointBBox(args.boundingbox),
+                                        args.demResolution)
+            elevation, span = writeHeightmap(
+                os.path.join(args.directory, 'terrain.png'), heights)
+            terrain.datum = elevation
+            heightmap = (fileUri(os.path.join(args.directory,
+                                              'terrain.png')), 0.0, span)
+            missing = int(np.isnan(heights).sum())
+            if missing:
+                print("Warning: the DEMs miss %d of %d heightmap samples" % (
+                    missing, heights.size))
+            counts.update(samples=heights.size, missing=missing)
+
+    if loaded is not None:
+        osmRoads = Osm2Dict(args.boundingbox[0], args.boundingbox[1], [])
+        roadPointWidthMap, modelPoseMap, buildingLocationMap = loaded
+        if not args.dem:
+            elevation = header.get('elevation', 0.0)
+    else:
+        with profiler.stage('parse') as counts:
+            print("Parsing the osm data ... ")
+            osmFile = args.inputOsmFile or args.osmFile
+            if budget is not None:
+                # Parsed and indexed in one pass, without the osmapi list
+                osmRoads = StreamedOsm2Dict(args.boundingbox[0],
+                                            args.boundingbox[1], osmFile,
+                                            budget, flags, terrain)
+                counts.update(osmRoads.counts)
+            else:
+                osmDictionary = (parseOsmFile(osmFile) if cache is None
+                                 else cache.parse(osmFile))
+                for element in osmDictionary:
+                    counts[element['type']] = counts.get(element['type'],
+                                                         0) + 1
+
+        with profiler.stage('extract') as counts:
+            print("Extracting the map data for gazebo ...")
+            if budget is not None:
+                (roadPointWidthMap,
+                 modelPoseMap,
+                 buildingLocationMap) = osmRoads.getMapDetails()
+                osmRoads.drop()
+            elif cache is None or terrain is not None:
+                #Initialize the class
+                osmRoads = Osm2Dict(args.boundingbox[0], args.boundingbox[1],
+                                    osmDictionary, flags, terrain)
+
+                #get Road and model details
+                (roadPointWidthMap,
+                 modelPoseMap,
+                 buildingLocationMap) = osmRoads.getMapDetails()
+            else:
+                (osmRoads,
+                 roadPointWidthMap,
+                 modelPoseMap,
+                 buildingLocationMap) = cache.extract(
+                     osmFile, args.boundingbox[:2], flags)
+            if cache is not None and cache.downloaded:
+                # A batch job reading the download of a larger box keeps
+                # what a download of its own box would hold
+                (roadPointWidthMap,
+                 modelPoseMap,
+                 buildingLocationMap) = touchingFeatures(
+                     osmRoads.getPointBBox(args.boundingbox),
+                     roadPointWidthMap,
+                     modelPoseMap,
+                     buildingLocationMap)
+            if args.mergeRoads:
+                roadPointWidthMap = mergeRoads(roadPointWidthMap)
+            if args.clip:
+                (roadPointWidthMap,
+                 modelPoseMap,
+                 buildingLocationMap) = cropFeatures(
+                     osmRoads.getPointBBox(args.boundingbox),
+                     roadPointWidthMap,
+                     modelPoseMap,
+                     buildingLocationMap)
+            if args.compact:
+                # Every later stage sees the points as stored in the compact
+                # format, so worker processes and reloaded runs give the same
+                # output
+                (roadPointWidthMap,
+                 modelPoseMap,
+                 buildingLocationMap) = snapFeatures(roadPointWidthMap,
+                                                     modelPoseMap,
+                                                     buildingLocationMap)
+            if args.saveFeatures:
+                size = writeFeatures(args.saveFeatures,
+                                     (roadPointWidthMap, modelPoseMap,
+                                      buildingLocationMap),
+                                     dict(boundingbox=args.boundingbox,
+                                          elevation=elevation, flags=flags))
+                print("Saved the features to %s (%d bytes)" % (
+                    args.saveFeatures, size))
+            if budget is not None:
+                budget.spillFeatures(roadPointWidthMap, modelPoseMap,
+                                     buildingLocationMap)
+            counts.update(roads=featureCounts(roadPointWidthMap),
+                          models=featureCounts(modelPoseMap),
+                          buildings=featureCounts(buildingLocationMap))
+
+    # Included models are looked up once, before any output is written
+    modelResolver = ModelResolver(args.modelSource, args.modelPath,
+                                  args.missingModels)
+    try:
+        missing = modelResolver.check(['sun'] + [
+            model['mainModel'] for model in modelPoseMap.values()])
+    except LookupError as e:
+        print("Error: %s" % e)
+        return 1
+    if missing:
+        print("Warning: models not found locally: %s" % ', '.join(missing))
+
+    # The output stages only read the features, so they run in worker
+    # processes while this one builds the sdf file
+    outputStages = [(name, function) for name, function, option in (
+        ('image', imageStage, args.imageFile),
+        ('occupancy', occupancyStage, args.occupancyMap),
+        ('xyzTiles', xyzTilesStage, args.xyzTiles)) if option]
+    futures = []
+    executor = None
+    if outputStages and not args.sequential:
+        executor = ProcessPoolExecutor(len(outputStages))
+        futures = [executor.submit(runStage, name, function,
+                                   (args, roadPointWidthMap,
+                                    buildingLocationMap),
+                                   profiler.enabled, profiler.statsPrefix)
+                   for name, function in outputStages]
+    else:
+        for name, function in outputStages:
+            with profiler.stage(name) as counts:
+                function(counts, args, roadPointWidthMap,
+                         buildingLocationMap)
+
+    with profiler.stage('sdf') as counts:
+        print("Building sdf file ...")
+        sdfOptions = dict(mergeMode=args.merge,
+                          mergeCellSize=args.mergeCellSize,
+                          buildingCollision=args.buildingCollision,
+                          roadCollision=args.roadCollision,
+                          cacheDirectory=args.cacheDir,
+                          modelResolver=modelResolver,
+                          instanceModels=args.instanceModels,
+                          compactShards=args.compact)
+        if args.tileSize:
+            written, unchanged = writeTiles(
+                args.outFile,
+                os.path.join(args.directory, 'tiles'),
+                osmRoads.getLat(), osmRoads.getLon(),
+                osmRoads.getPointBBox(args.boundingbox),
+                args.tileSize,
+                roadPointWidthMap,
+                modelPoseMap,
+                buildingLocationMap,
+                args.jobs,
+                sdfOptions,
+                heightmap,
+                elevation)
+            print("Wrote %d tiles, %d unchanged" % (written, unchanged))
+            counts.update(written=written, unchanged=unchanged)
+        else:
+            #Initialize the getSdf class
+            sdfFile = GetSDF(fragments=(budget and budget.fragmentStore()),
+                             **sdfOptions)
+
+            #Set up the spherical coordinates
+            sdfFile.addSphericalCoords(osmRoads.getLat(), osmRoads.getLon(),
+                                       elevation)
+            #add Required models
+            sdfFile.includeModel("sun")
+            if heightmap is None:
+                sdfFile.addGroundPlane(osmRoads.getPointBBox(args.boundingbox))
+            else:
+                sdfFile.addHeightmap(heightmap[0],
+                                     osmRoads.getPointBBox(args.boundingbox),
+                                     *heightmap[1:])
+            if args.mesh:
+                sdfFile.addFeatures({}, modelPoseMap, {})
+                meshBuilder = MeshBuilder(args.meshTileSize)
+                for building in buildingLocationMap.values():
+                    meshBuilder.addBuilding(building['points'],
+                                            building['color'],
+                                            building['height'],
+                                            building.get('holes', []))
+                for road in roadPointWidthMap.keys():
+                    meshBuilder.addRoad(road, roadPointWidthMap[road]['width'],
+                                        roadPointWidthMap[road]['points'])
+                meshDirectory = os.path.join(args.directory, 'meshes')
+                for kind, color, name, filename, footprints in \
+                        meshBuilder.write(meshDirectory):
+                    sdfFile.addMesh(kind, name, fileUri(filename), color,
+                                    footprints)
+            elif budget is not None and args.merge is None:
+                # Each road and building is serialized as soon as it is
+                # built instead of growing the tree
+                sdfFile.addFeatures({}, modelPoseMap, {})
+                sdfFile.addFeaturesParallel(roadPointWidthMap,
+                                            buildingLocationMap, args.jobs)
+            else:
+                sdfFile.addFeatures(roadPointWidthMap, modelPoseMap,
+                                    buildingLocationMap, args.jobs)
+
+            #output sdf File
+            sdfFile.writeToFile(args.outFile)
+            if sdfFile.cache is not None:
+                print("Fragment cache: %d hits, %d misses" % (
+                    sdfFile.cache.hits, sdfFile.cache.misses))
+                counts.update(cacheHits=sdfFile.cache.hits,
+                              cacheMisses=sdfFile.cache.misses)
+        counts['bytes'] = os.path.getsize(args.outFile)
+
+    if executor is not None:
+        with executor:
+            for future in futures:
+                profiler.record(future.result())
+
+    if budget is not None:
+        peak = maxRss()
+        print("Memory budget %g MB: %.1f MB spilled to disk, peak resident "
+              "size %s MB" % (args.maxMemory, budget.spilled / 2**20,
+                              '?' if peak is None else peak // 2**20))
+        budget.close()
+
+    if args.profile:
+        profiler.writeJson(args.profile)
+    return 0
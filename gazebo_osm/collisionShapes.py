@@ -0,0 +1,57 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: convexHull() and orientedBoundingBox()
+#             Cheap collision shapes for building footprints, used by GetSDF
+#             in place of the full resolution visual polylines
+##############################################################################
+
+import numpy as np
+
+
+def convexHull(points):
+    '''Andrew's monotone chain convex hull of the points (N, 2).
+       Returns the counter clockwise hull vertices (M, 2)'''
+    pts = np.unique(np.asarray(points, dtype=float), axis=0)
+    if len(pts) < 3:
+        return pts
+
+    def chain(sequence):
+        hull = []
+        for p in sequence:
+            while len(hull) >= 2 and (
+                    (hull[-1][0] - hull[-2][0]) * (p[1] - hull[-2][1]) -
+                    (hull[-1][1] - hull[-2][1]) * (p[0] - hull[-2][0])) <= 0:
+                hull.pop()
+            hull.append(p)
+        return hull[:-1]
+
+    # np.unique sorts lexicographically by x, then y
+    lower = chain(pts)
+    upper = chain(pts[::-1])
+    return np.asarray(lower + upper)
+
+
+def orientedBoundingBox(points):
+    '''Minimum area rectangle around the points (N, 2), found by testing
+       the orientation of every convex hull edge at once.
+       Returns the center (2,), the size (2,) and the yaw in radians'''
+    hull = convexHull(points)
+    if len(hull) < 3:
+        lo, hi = np.min(hull, axis=0), np.max(hull, axis=0)
+        return (lo + hi) / 2, hi - lo, 0.0
+    edges = np.roll(hull, -1, axis=0) - hull
+    angles = np.unique(np.mod(np.arctan2(edges[:, 1], edges[:, 0]),
+                              np.pi / 2))
+    cos, sin = np.cos(angles), np.sin(angles)
+    # Hull coordinates in the frame of every candidate orientation
+    u = hull[None, :, 0] * cos[:, None] + hull[None, :, 1] * sin[:, None]
+    v = -hull[None, :, 0] * sin[:, None] + hull[None, :, 1] * cos[:, None]
+    uMin, uMax = np.min(u, axis=1), np.max(u, axis=1)
+    vMin, vMax = np.min(v, axis=1), np.max(v, axis=1)
+    best = np.argmin((uMax - uMin) * (vMax - vMin))
+    cu, cv = (uMin[best] + uMax[best]) / 2, (vMin[best] + vMax[best]) / 2
+    center = np.array([cu * cos[best] - cv * sin[best],
+                       cu * sin[best] + cv * cos[best]])
+    size = np.array([uMax[best] - uMin[best], vMax[best] - vMin[best]])
+    return center, size, float(angles[best])
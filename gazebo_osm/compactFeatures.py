@@ -0,0 +1,201 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: packFeatures() and unpackFeatures()
+#             Compact binary format of the road, model and building maps of
+#             Osm2Dict: points quantized to int32 centimeters, without the z
+#             row when it is zero, and the other fields as JSON. Used for
+#             the shards sent to worker processes, --saveFeatures archives
+#             and --loadFeatures runs. A point takes 8 bytes instead of the
+#             24 of a float64 column
+##############################################################################
+
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b'GZOSMFT\0'
+VERSION = 1
+#Quantization step of the coordinates in meters
+RESOLUTION = 0.01
+#Magic, version, metadata bytes, number of point arrays, resolution
+HEADER = struct.Struct('<8sIIQd')
+INT32 = np.iinfo(np.int32)
+
+
+def isPoints(value):
+    '''Whether value is a (3, N) float array of points in the gazebo frame'''
+    return (isinstance(value, np.ndarray) and value.ndim == 2 and
+            value.shape[0] == 3 and value.dtype.kind == 'f')
+
+
+def quantize(points, resolution=RESOLUTION):
+    '''Little endian int32 (2, N) array of the (3, N) points in multiples of
+       resolution, (3, N) when some z is not zero. ValueError beyond the
+       int32 range (21474 km at 1 cm)'''
+    values = np.rint(np.asarray(points, dtype=np.float64)[
+        :3 if np.any(points[2]) else 2] / resolution)
+    if values.size and (values.min() < INT32.min or
+                        values.max() > INT32.max):
+        raise ValueError("Points beyond %g m cannot be quantized" % (
+            INT32.max * resolution))
+    return values.astype('<i4')
+
+
+def dequantize(values, resolution=RESOLUTION):
+    '''(3, N) float64 points of the quantize() values'''
+    points = np.zeros((3, values.shape[1]))
+    points[:len(values)] = values
+    return points * resolution
+
+
+def snapFeatures(*featureMaps):
+    '''Copies of the feature maps with their points rounded to the
+       quantization grid, so that they survive packFeatures() unchanged'''
+    return [{name: {key: snapValue(value) for key, value in feature.items()}
+             for name, feature in features.items()}
+            for features in featureMaps]
+
+
+def snapValue(value):
+    if isPoints(value):
+        # + 0.0 turns the -0.0 of small negative values into the 0.0 of
+        # dequantize()
+        return np.rint(value / RESOLUTION) * RESOLUTION + 0.0
+    if isinstance(value, list):
+        return [snapValue(item) for item in value]
+    return value
+
+
+def encodeValue(value, arrays):
+    '''JSON form of a feature field, moving the points to arrays and
+       leaving {} in their place'''
+    if isPoints(value):
+        arrays.append(value)
+        return {}
+    if isinstance(value, (list, tuple)):
+        return [encodeValue(item, arrays) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        raise ValueError("Dictionary fields cannot be packed")
+    return value
+
+
+def decodeValue(value, arrays, resolution):
+    '''Feature field of the JSON value, taking its points from the
+       iterator arrays'''
+    if isinstance(value, dict):
+        return dequantize(next(arrays), resolution)
+    if isinstance(value, list):
+        return [decodeValue(item, arrays, resolution) for item in value]
+    return value
+
+
+def encodeFeatures(features, arrays):
+    '''Runs of consecutive features with the same fields, as
+       [fields, [[name, value, ...], ...]]'''
+    groups = []
+    for name, feature in features.items():
+        fields = list(feature)
+        if not groups or groups[-1][0] != fields:
+            groups.append([fields, []])
+        groups[-1][1].append([name] + [encodeValue(value, arrays)
+                                       for value in feature.values()])
+    return groups
+
+
+def packFeatures(featureMaps, header=None):
+    '''Bytes of the feature maps, such as the (roads, models, buildings) of
+       Osm2Dict.getMapDetails(), and of the JSON header dictionary:
+       HEADER, the metadata JSON padded to 8 bytes, the int64 start of every
+       point array in the coordinates, the uint8 row count of every array
+       padded to 8 bytes, then the int32 coordinates, row after row'''
+    arrays = []
+    metadata = dict(header=header or {},
+                    features=[encodeFeatures(features, arrays)
+                              for features in featureMaps])
+    text = json.dumps(metadata, separators=(',', ':')).encode()
+    text += b' ' * (-len(text) % 8)
+    # All points are quantized at once, then split back per array
+    ends = np.cumsum([points.shape[1] for points in arrays], dtype=np.int64)
+    starts = ends - [points.shape[1] for points in arrays]
+    values = quantize(np.concatenate(arrays, axis=1) if arrays
+                      else np.zeros((3, 0)))
+    if len(values) == 2:
+        rows = np.full(len(arrays), 2)
+    else:
+        nonzero = np.concatenate(([0], np.cumsum(values[2] != 0)))
+        rows = 2 + (nonzero[ends] > nonzero[starts])
+    offsets = np.zeros(len(arrays) + 1, dtype='<i8')
+    np.cumsum(rows * (ends - starts), out=offsets[1:])
+    counts = np.zeros(len(arrays) + (-len(arrays) % 8), dtype=np.uint8)
+    counts[:len(arrays)] = rows
+    return b''.join([HEADER.pack(MAGIC, VERSION, len(text), len(arrays),
+                                 RESOLUTION), text, offsets.tobytes(),
+                     counts.tobytes()] + [
+                         values[:r, s:e].tobytes()
+                         for r, s, e in zip(rows.tolist(), starts.tolist(),
+                                            ends.tolist())])
+
+
+def unpackFeatures(data):
+    '''(header, feature maps) of the packFeatures() bytes, with float64
+       points. ValueError if data is not in this format'''
+    if len(data) < HEADER.size:
+        raise ValueError("Not a feature file: too short")
+    magic, version, size, count, resolution = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a feature file")
+    if version != VERSION:
+        raise ValueError("Unsupported feature file version %d" % version)
+    start = HEADER.size
+    metadata = json.loads(bytes(data[start:start + size]))
+    start += size
+    offsets = np.frombuffer(data, dtype='<i8', count=count + 1, offset=start)
+    start += offsets.nbytes
+    rows = np.frombuffer(data, dtype=np.uint8, count=count, offset=start)
+    start += count + (-count % 8)
+    coordinates = np.frombuffer(data, dtype='<i4', count=int(offsets[-1]),
+                                offset=start)
+    arrays = (coordinates[offsets[k]:offsets[k + 1]].reshape(rows[k], -1)
+              for k in range(count))
+    featureMaps = []
+    for groups in metadata['features']:
+        features = dict()
+        for fields, items in groups:
+            for name, *values in items:
+                features[name] = {field: decodeValue(value, arrays,
+                                                     resolution)
+                                  for field, value in zip(fields, values)}
+        featureMaps.append(features)
+    return metadata['header'], featureMaps
+
+
+def writeFeatures(filename, featureMaps, header=None):
+    '''Writes packFeatures() to filename, renamed into place once complete.
+       Returns the number of bytes written'''
+    data = packFeatures(featureMaps, header)
+    directory = os.path.dirname(os.path.abspath(filename))
+    handle, tmp = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file 0600, give it the mode of open()
+        mask = os.umask(0)
+        os.umask(mask)
+        os.chmod(tmp, 0o666 & ~mask)
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return len(data)
+
+
+def readFeatures(filename):
+    '''(header, feature maps) of a writeFeatures() file'''
+    with open(filename, 'rb') as f:
+        return unpackFeatures(f.read())
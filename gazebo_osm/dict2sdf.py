@@ -0,0 +1,769 @@
+##############################################################################
+#Author: Tashwin Khurana
+#Version: 1.0
+#Package: gazebo_osm
+#
+#Description: GetSDF() class
+#             Builds a sdf file by adding models and seting their properties,
+#             roads and sets spherical coordinates for the world
+##############################################################################
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import lxml.etree as Et
+from copy import deepcopy
+import xml.dom.minidom as minidom
+import numpy as np
+
+from .collisionShapes import convexHull, orientedBoundingBox
+from .compactFeatures import packFeatures, unpackFeatures
+from .fragmentCache import FragmentCache
+from .modelResolver import ModelResolver
+
+# Copied from here: https://github.com/gazebosim/gazebo-classic/blob/gazebo11/media/materials/scripts/gazebo.material
+MATERIALDICT = dict(
+    Red=dict(ambient="1  0  0 1",
+            diffuse="1 0 0 1",
+            specular="0.1 0.1 0.1 1"),    
+    Blue=dict(ambient="0 0 1 1",
+            diffuse="0 0 1 1",
+            specular="0.1 0.1 0.1 1"),
+    Green=dict(ambient="0 1 0 1",
+            diffuse="0 1 0 1",
+            specular="0.1 0.1 0.1 1"),
+    RedBright=dict(ambient="0.87 0.26 0.07 1",
+            diffuse="0.87 0.26 0.07 1",
+            specular="0.87 0.26 0.07 1"),
+    Purple=dict(ambient="1 0 1 1",
+            diffuse="1 0 1 1",
+            specular="0.1 0.1 0.1 1"),
+    Orange=dict(ambient="1 0.5088 0.0468 1",
+            diffuse="1 0.5088 0.0468 1",
+            specular="0.5 0.5 0.5 1"),
+    Yellow=dict(ambient="1 1 0 1",
+            diffuse="1 1 0 1",
+            specular="0 0 0 0"),
+    GroundGray=dict(ambient="0.3 0.3 0.3 1",
+            diffuse="0.7 0.7 0.7 1",
+            specular="0.01 0.01 0.01 1"),
+    
+    )
+
+def allclose_index(road_points, point):
+    '''Index of the first of road_points np.allclose() to point, or None'''
+    if not len(road_points):
+        return None
+    points = np.asarray(road_points)
+    close = np.all(np.abs(point - points) <= 1e-08 + 1e-05 * np.abs(points),
+                   axis=1)
+    hits = np.flatnonzero(close)
+    return int(hits[0]) if len(hits) else None
+
+def split_roads(roadName, roadPoints):
+    # Break if loops are there
+    road_points = []
+    multi_roads = []
+    Npts = np.size(roadPoints, 1)
+    for pidx in range(Npts):
+        point = roadPoints[:3, pidx]
+        idx = allclose_index(road_points, point)
+        if idx is not None and pidx != Npts and idx != 0:
+            print("Found loops in ", roadName)
+            road_points.append(point)
+            if idx >= 1:
+                multi_roads.append(np.asarray(road_points[:idx]).T)
+            if idx < len(road_points):
+                multi_roads.append(np.asarray(road_points[idx:]).T)
+            road_points = []
+        else:
+            road_points.append(point)
+    if len(road_points):
+        multi_roads.append(np.asarray(road_points).T)
+    return multi_roads
+
+def dilate_polyline(roadPoints, width):
+
+
+    closed_polyline_points = []
+    return_points = []
+    prev_uvec = None
+    for pidx in range(np.size(roadPoints, 1)-1):
+        point = roadPoints[:2, pidx]
+        next_point = roadPoints[:2, pidx+1]
+        vec = (next_point - point) 
+        uvec = vec / np.linalg.norm(vec)
+        perpvec = np.array([-uvec[1], uvec[0]])
+        point_left = point - perpvec * width / 2
+        point_right = point + perpvec * width / 2
+        if len(closed_polyline_points):
+            prev_point_left = closed_polyline_points[-1]
+            prev_ret_point = return_points[-1]
+            if uvec.dot(prev_uvec) >= 0:  # Acute angle change in direction
+                closed_polyline_points.append(point_left)
+                return_points.append(point_right)
+            else:
+                # Direction has changed
+                theta = np.atan2(prev_uvec[1], prev_uvec[0]) - np.atan2(uvec[1], uvec[0])
+                thetan = (theta + np.pi) % (2*np.pi) - np.pi
+                if thetan > 0: # direction changed to the left
+                    # find the intersection of prev left boundary with left boundary
+                    # prev_point + prev_uvec * t = point_left + uvec * q
+                    tq = np.linalg.solve(np.vstack((uvec, -prev_uvec)).T, 
+                                            prev_point_left - point_left)
+                    cont_point = prev_point_left + prev_uvec * tq[1]
+                    closed_polyline_points.append(cont_point)
+                    return_points.append(point_left)
+                    return_points.append(point_right)
+                else: # direction changed to right
+                    # find the intersection of prev right boundary with right boundary
+                    # prev_ret_point + prev_uvec * t = point_right + uvec * q
+                    tq = np.linalg.solve(np.vstack((uvec, -prev_uvec)).T, 
+                                            prev_ret_point - point_right)
+                    cont_ret_point = prev_ret_point + prev_uvec * tq[1]
+                    return_points.append(cont_ret_point)
+                    closed_polyline_points.append(point_right)
+                    closed_polyline_points.append(point_left)
+
+        else:
+            closed_polyline_points.append(point_left)
+            return_points.append(point_right)
+        prev_uvec = uvec
+
+    point_left = next_point - perpvec * width / 2
+    point_right = next_point + perpvec * width / 2
+    closed_polyline_points.append(point_left)
+    return_points.append(point_right)
+    closed_polyline_points.extend(reversed(return_points))
+    closed_polyline_points.append(closed_polyline_points[0].copy())
+    return closed_polyline_points
+
+
+def serializeFragment(element):
+    '''Pretty printed element without indentation, as spliced into the
+       output by GetSDF.addFragment()'''
+    return Et.tostring(element, pretty_print=True, with_tail=False)
+
+
+FRAGMENT = re.compile(rb'^( *)<fragment index="(\d+)"/>\n', re.MULTILINE)
+
+
+def indentFragment(fragment, indent):
+    return indent + fragment[:-1].replace(b'\n', b'\n' + indent) + b'\n'
+
+
+def serializeWithFragments(root, fragments):
+    '''Serializes root like Et.tostring(pretty_print=True), replacing the
+       <fragment> placeholders by the indented bytes in fragments'''
+    data = Et.tostring(root, pretty_print=True, xml_declaration=True)
+    if not len(fragments):
+        return data
+    return FRAGMENT.sub(lambda match: indentFragment(
+        fragments[int(match.group(2))], match.group(1)), data)
+
+
+def writeWithFragments(f, root, fragments):
+    '''Writes serializeWithFragments(root, fragments) to the file f one
+       fragment at a time'''
+    data = Et.tostring(root, pretty_print=True, xml_declaration=True)
+    start = 0
+    for match in FRAGMENT.finditer(data):
+        f.write(data[start:match.start()])
+        f.write(indentFragment(fragments[int(match.group(2))],
+                               match.group(1)))
+        start = match.end()
+    f.write(data[start:])
+
+
+def fileUri(path):
+    '''Absolute file:// uri of path, found whatever the working directory
+       and resource path of the simulator'''
+    return 'file://' + os.path.abspath(path)
+
+
+def lowestNode(points):
+    '''Lowest height of the (3, N) points, 0 without a z row or points'''
+    if len(points) > 2 and points.shape[1]:
+        return float(np.min(points[2]))
+    return 0.0
+
+
+def addPolylinePoints(polyline, points):
+    '''Appends one <point> element per row of the (N, 2) points'''
+    for x, y in np.asarray(points).tolist():
+        Et.SubElement(polyline, 'point').text = "%f %f" % (x, y)
+
+
+def buildFragments(task):
+    '''Worker of GetSDF.addFeatures(): adds the buildings or roads of one
+       shard to a private GetSDF. Returns the serialized world children of
+       every feature and the fragment cache hit and miss counts'''
+    kind, features, options = task
+    if isinstance(features, bytes):
+        features = list(unpackFeatures(features)[1][0].items())
+    sdfFile = GetSDF(**options)
+    fragments = []
+    for name, data in features:
+        if kind == 'building':
+            sdfFile.addBuilding(data['mean'], data['points'], name,
+                                data['color'], data['height'])
+        else:
+            sdfFile.addRoad(name, data['width'], data['points'])
+        added = list(sdfFile.world)
+        fragments.append(b''.join(
+            sdfFile.fragments[int(e.get('index'))] if e.tag == 'fragment'
+            else serializeFragment(e) for e in added))
+        for element in added:
+            sdfFile.world.remove(element)
+        sdfFile.fragments = []
+    cache = sdfFile.cache
+    return fragments, (cache.hits, cache.misses) if cache else (0, 0)
+
+
+MERGEMODES = ('class', 'material', 'cell')
+BUILDINGCOLLISIONS = ('full', 'hull', 'obb')
+ROADCOLLISIONS = ('full', 'none', 'patch')
+ROAD_HEIGHT = 0.001
+#Fewest features per worker task of GetSDF.addFeatures()
+MIN_SHARD = 64
+#Fields of the roads and buildings used by buildFragments()
+SHARD_FIELDS = dict(building=('mean', 'points', 'color', 'height'),
+                    road=('width', 'points'))
+
+
+class GetSDF:
+
+    def __init__(self, mergeMode=None, mergeCellSize=200.0,
+                 buildingCollision='full', roadCollision='full',
+                 cacheDirectory=None, modelResolver=None,
+                 instanceModels=False, fragments=None, compactShards=False):
+        '''mergeMode None adds every road and building as its own model.
+           Otherwise they become links of a few static models, grouped by
+           feature class ('class'), by class and material ('material') or by
+           class and a grid cell of mergeCellSize meters ('cell').
+           buildingCollision replaces the building footprint in <collision>
+           by its convex hull ('hull') or oriented bounding box ('obb').
+           roadCollision drops road collisions in favour of the ground plane
+           ('none') or of a single thin box covering all roads ('patch').
+           With a cacheDirectory, roads and buildings are spliced in from
+           the serialized fragments of previous runs when unchanged.
+           modelResolver, a ModelResolver, gives the uri of the included
+           models, by default their Gazebo Fuel url. With instanceModels,
+           the models it finds locally are added as links of one static
+           model per model type instead of one include each. fragments is
+           the list the serialized fragments are appended to, such as a
+           memoryBudget.FragmentStore. With compactShards, the shards of
+           addFeaturesParallel() go to the worker processes in the int32
+           format of compactFeatures, which only matches the serial output
+           for points snapped by compactFeatures.snapFeatures()'''
+        for value, valid, what in ((mergeMode, MERGEMODES + (None,), 'merge'),
+                                   (buildingCollision, BUILDINGCOLLISIONS,
+                                    'building collision'),
+                                   (roadCollision, ROADCOLLISIONS,
+                                    'road collision')):
+            if value not in valid:
+                raise ValueError("Unknown %s mode %r [Valid values : %s]"
+                                 % (what, value, ", ".join(
+                                     v for v in valid if v)))
+        self.sdf = Et.Element('sdf')
+        self.sdf.set('version', "1.5")
+        self.world = Et.SubElement(self.sdf, 'world')
+        self.world.set('name', 'default')
+        self.modelList = dict()
+        self.mergeMode = mergeMode
+        self.mergeCellSize = mergeCellSize
+        self.buildingCollision = buildingCollision
+        self.roadCollision = roadCollision
+        self.roadPatch = None
+        #Serialized fragments standing in for world children
+        self.fragments = [] if fragments is None else fragments
+        self.cache = None
+        self.cacheDirectory = cacheDirectory
+        self.modelResolver = modelResolver or ModelResolver()
+        self.instanceModels = instanceModels
+        self.compactShards = compactShards
+        #Static model holding the instances of every model type
+        self.instances = dict()
+        if cacheDirectory is not None and mergeMode is None:
+            self.cache = FragmentCache(cacheDirectory)
+        #Prebuilt subtrees, deep-copied for every model that is added
+        self.materials = dict()
+        self.templates = dict()
+        self.groups = dict()
+
+    def getMaterial(self, color):
+        '''Returns the cached material element for the color in MATERIALDICT'''
+        if color not in self.materials:
+            material = Et.Element('material')
+            colors = MATERIALDICT[color]
+            for col_se in 'ambient diffuse specular'.split():
+                Et.SubElement(material, col_se).text = colors[col_se]
+            self.materials[color] = material
+        return self.materials[color]
+
+    def buildTemplate(self, kind, color):
+        '''Builds the static model subtree shared by every road, building or
+           ground plane of the given color, without names and geometry'''
+        model = Et.Element('model')
+        Et.SubElement(model, 'static').text = 'true'
+        Et.SubElement(model, 'pose').text = '0 0 0 0 0 0'
+        link = Et.SubElement(model, 'link')
+        if kind == 'road':
+            Et.SubElement(link, 'pose').text = '0 0 0 0 0 0'
+        collision = Et.SubElement(link, 'collision')
+        if kind in ('road', 'ground_plane'):
+            ode = Et.SubElement(Et.SubElement(Et.SubElement(
+                collision, 'surface'), 'friction'), 'ode')
+            Et.SubElement(ode, 'mu').text = '100'
+            Et.SubElement(ode, 'mu2').text = '50'
+        visual = Et.SubElement(link, 'visual')
+        if kind in ('road', 'ground_plane'):
+            Et.SubElement(visual, 'cast_shadows').text = 'false'
+        visual.append(deepcopy(self.getMaterial(color)))
+        if kind != 'road':
+            Et.SubElement(link, 'pose').text = '0 0 0 0 0 0'
+        return model
+
+    def groupName(self, kind, color, anchor):
+        '''Name of the merged model a feature of kind and color belongs to'''
+        name = kind + 's'
+        if self.mergeMode == 'material':
+            name += '_' + color
+        elif self.mergeMode == 'cell':
+            name += '_%d_%d' % (np.floor(anchor[0] / self.mergeCellSize),
+                                np.floor(anchor[1] / self.mergeCellSize))
+        return name
+
+    def getGroup(self, name):
+        '''Returns the merged static model name, adding it on first use'''
+        if name not in self.groups:
+            group = Et.SubElement(self.world, 'model')
+            group.set('name', name)
+            Et.SubElement(group, 'static').text = 'true'
+            Et.SubElement(group, 'pose').text = '0 0 0 0 0 0'
+            self.groups[name] = group
+        return self.groups[name]
+
+    def cloneModel(self, kind, color, name, anchor=(0, 0)):
+        '''Adds a copy of the (kind, color) template to the world, named name.
+           In merge mode only its link is added, to the group model chosen
+           from kind, color and the anchor point.
+           Returns the model, collision and visual elements'''
+        key = (kind, color)
+        if key not in self.templates:
+            self.templates[key] = self.buildTemplate(kind, color)
+        if self.mergeMode is not None and kind != 'ground_plane':
+            model = self.getGroup(self.groupName(kind, color, anchor))
+            link = deepcopy(self.templates[key][2])
+            model.append(link)
+        else:
+            model = deepcopy(self.templates[key])
+            model.set('name', name)
+            self.world.append(model)
+            link = model[2]
+        link.set('name', name)
+        collision = link.find('collision')
+        collision.set('name', name)
+        visual = link.find('visual')
+        visual.set('name', name)
+        return model, collision, visual
+
+    def addSphericalCoords(self, latVal, lonVal,
+                           elevationVal=0.0, headingVal=0):
+        ''' Add the spherical coordinates for the map'''
+        spherical_coordinates = Et.SubElement(self.world,
+                                              'spherical_coordinates')
+
+        model = Et.SubElement(spherical_coordinates, 'surface_model')
+        model.text = "EARTH_WGS84"
+
+        lat = Et.SubElement(spherical_coordinates, 'latitude_deg')
+        lat.text = str(latVal)
+
+        lon = Et.SubElement(spherical_coordinates, 'longitude_deg')
+        lon.text = str(lonVal)
+
+        elevation = Et.SubElement(spherical_coordinates, 'elevation')
+        elevation.text = str(elevationVal)
+
+        heading = Et.SubElement(spherical_coordinates, 'heading_deg')
+        heading.text = str(headingVal)
+
+    def addInclude(self, uri, name=None):
+        '''Include the model at uri, optionally renamed to name'''
+        includeModel = Et.SubElement(self.world, 'include')
+        includeUri = Et.SubElement(includeModel, 'uri')
+        includeUri.text = uri
+        if name is not None:
+            Et.SubElement(includeModel, 'name').text = name
+        return includeModel
+
+    def includeModel(self, modelName):
+        ''' Include models in gazebo database, resolved by the
+            modelResolver. Returns None for skipped missing models'''
+        uri = self.modelResolver.uri(modelName)
+        if uri is None:
+            return None
+        return self.addInclude(uri)
+
+    def addModel(self, mainModel, modelName, pose):
+        '''Add model with pose and the name taken as inputs'''
+        if self.instanceModels:
+            links = self.modelResolver.modelLinks(mainModel)
+            if links is not None:
+                self.addInstance(mainModel, modelName, pose, links)
+                return
+
+        includeModel = self.includeModel(mainModel)
+        if includeModel is None:
+            return
+
+        model = Et.SubElement(includeModel, 'name')
+        model.text = modelName
+
+        static = Et.SubElement(includeModel, 'static')
+        static.text = 'true'
+
+        modelPose = Et.SubElement(includeModel, 'pose')
+
+        modelPose.text = (str(pose[0]) +
+                          " " + str(pose[1]) +
+                          " " + str(pose[2]) + " 0 0 0")
+
+    def addInstance(self, mainModel, modelName, pose, links):
+        '''Adds copies of the links of mainModel, moved to pose, to the
+           static model of its instances. Meshes are shared through their
+           uri, so the model is loaded once however many instances there are'''
+        if mainModel not in self.instances:
+            model = Et.SubElement(self.world, 'model')
+            model.set('name', mainModel.replace(' ', '_') + '_instances')
+            Et.SubElement(model, 'static').text = 'true'
+            Et.SubElement(model, 'pose').text = '0 0 0 0 0 0'
+            self.instances[mainModel] = model
+        for link in links:
+            link = deepcopy(link)
+            link.set('name', modelName if len(links) == 1
+                     else modelName + '_' + link.get('name'))
+            linkPose = link.find('pose')
+            values = [float(v) for v in linkPose.text.split()]
+            linkPose.text = ' '.join('%f' % v for v in (
+                [pose[k] + values[k] for k in range(3)] + values[3:]))
+            self.instances[mainModel].append(link)
+
+    def addFragment(self, data):
+        '''Add serialized world children, as returned by serializeFragment()'''
+        placeholder = Et.SubElement(self.world, 'fragment')
+        placeholder.set('index', str(len(self.fragments)))
+        self.fragments.append(data)
+
+    def addCached(self, key, build, *args):
+        '''Adds the fragment cached under key. On a miss, runs build(*args)
+           and caches the serialized world children it added'''
+        data = self.cache.get(key)
+        if data is None:
+            start = len(self.world)
+            build(*args)
+            added = self.world[start:]
+            data = b''.join(serializeFragment(e) for e in added)
+            for element in added:
+                self.world.remove(element)
+            self.cache.put(key, data)
+        self.addFragment(data)
+
+    def addRoad(self, roadName, width, roadPoints):
+        '''Add road to sdf file'''
+        if not roadPoints.shape[1]:
+            return
+        if self.cache is not None:
+            self.addCached(self.cache.key('road', roadName, width, roadPoints,
+                                          self.roadCollision),
+                           self.buildRoad, roadName, width, roadPoints)
+        else:
+            self.buildRoad(roadName, width, roadPoints)
+        if self.roadCollision == 'patch':
+            self.extendRoadPatch(roadPoints, width)
+
+    def buildRoad(self, roadName, width, roadPoints):
+        '''Add the road models, split where the road loops'''
+        multiroads = split_roads(roadName, roadPoints)
+        if len(multiroads) >= 2:
+            for i, roads in enumerate(multiroads):
+                self.buildRoad(roadName + '_p%d' % i, width, roads)
+            return
+
+        road, collision, visual = self.cloneModel('road', 'GroundGray',
+                                                  roadName, roadPoints[:2, 0])
+        geometry = Et.Element('geometry')
+        polyline = Et.SubElement(geometry, 'polyline')
+        Et.SubElement(polyline, 'height').text = "%g" % ROAD_HEIGHT
+        if np.all(roadPoints[:2, 0] == roadPoints[:2, -1]):
+            addPolylinePoints(polyline, roadPoints[:2, :].T)
+        else:
+            dilated_road_points = dilate_polyline(roadPoints, width)
+            addPolylinePoints(polyline, dilated_road_points)
+        self.setLinkElevation(visual, roadPoints)
+        if self.roadCollision == 'full':
+            collision.append(geometry)
+        else:
+            collision.getparent().remove(collision)
+        visual.append(deepcopy(geometry))
+
+    def extendRoadPatch(self, roadPoints, width):
+        '''Grows the collision box standing in for all road collisions so
+           that it covers the road'''
+        lo = np.min(roadPoints[:2, :], axis=1) - width / 2
+        hi = np.max(roadPoints[:2, :], axis=1) + width / 2
+        if self.roadPatch is None:
+            patch = Et.SubElement(self.world, 'model')
+            patch.set('name', 'road_collision_patch')
+            Et.SubElement(patch, 'static').text = 'true'
+            pose = Et.SubElement(patch, 'pose')
+            link = Et.SubElement(patch, 'link')
+            link.set('name', 'road_collision_patch')
+            collision = Et.SubElement(link, 'collision')
+            collision.set('name', 'road_collision_patch')
+            ode = Et.SubElement(Et.SubElement(Et.SubElement(
+                collision, 'surface'), 'friction'), 'ode')
+            Et.SubElement(ode, 'mu').text = '100'
+            Et.SubElement(ode, 'mu2').text = '50'
+            size = Et.SubElement(Et.SubElement(Et.SubElement(
+                collision, 'geometry'), 'box'), 'size')
+            self.roadPatch = [lo, hi, pose, size]
+        patchLo, patchHi, pose, size = self.roadPatch
+        patchLo = self.roadPatch[0] = np.minimum(patchLo, lo)
+        patchHi = self.roadPatch[1] = np.maximum(patchHi, hi)
+        center = (patchLo + patchHi) / 2
+        pose.text = '%f %f %f 0 0 0' % (center[0], center[1], ROAD_HEIGHT / 2)
+        size.text = '%f %f %f' % (patchHi[0] - patchLo[0],
+                                  patchHi[1] - patchLo[1], ROAD_HEIGHT)
+
+    def setLinkElevation(self, visual, points):
+        '''Raises the link of visual to the lowest height of the points, so
+           that a road or building on a terrain stands on its lowest node'''
+        height = lowestNode(points)
+        if height:
+            visual.getparent().find('pose').text = '0 0 %f 0 0 0' % height
+
+    def setRoadWidth(self, width, roadName):
+        ''' Set the width of the road specified by the road name'''
+        allRoads = self.world.findall('road')
+
+        roadWanted = [road for road in allRoads
+                      if road.get('name') == roadName]
+
+        roadWidth = Et.SubElement(roadWanted[0], 'width')
+        roadWidth.text = str(width)
+
+    def addRoadPoint(self, point, roadName, width):
+        '''Add points required to build a road, specified by the roadname'''
+        allRoads = self.world.findall('road')
+
+        roadWanted = [road for road in allRoads
+                      if road.get('name') == roadName]
+        roadPoint = Et.SubElement(roadWanted[0], 'point')
+        roadPoint.text = (str(point[0]) +
+                          " " + str(point[1]) +
+                          " " + str(point[2]))
+
+    def addBuilding(self, mean, pointList, building_name, color, height):
+        if self.cache is not None:
+            self.addCached(self.cache.key('building', building_name, pointList,
+                                          color, height,
+                                          self.buildingCollision),
+                           self.buildBuilding, pointList, building_name,
+                           color, height)
+        else:
+            self.buildBuilding(pointList, building_name, color, height)
+
+    def buildBuilding(self, pointList, building_name, color, height):
+        building, collision, visual = self.cloneModel('building', color,
+                                                      building_name,
+                                                      pointList[:2, 0])
+        geometry = Et.Element('geometry')
+        polyline = Et.SubElement(geometry, 'polyline')
+        Et.SubElement(polyline, 'height').text = "%f" % height
+        addPolylinePoints(polyline, pointList[:2, :].T)
+        visual.append(geometry)
+        self.setLinkElevation(visual, pointList)
+        if self.buildingCollision == 'full':
+            collision.append(deepcopy(geometry))
+        else:
+            self.addFootprintCollision(collision, pointList, height)
+
+    def addFootprintCollision(self, collision, pointList, height, base=0.0):
+        '''Add the convex hull or oriented bounding box of the footprint,
+           as chosen by buildingCollision, to the collision element, from
+           base to base + height'''
+        if self.buildingCollision == 'hull':
+            hull = convexHull(pointList[:2, :].T)
+            if base:
+                Et.SubElement(collision, 'pose').text = '0 0 %f 0 0 0' % base
+            geometry = Et.SubElement(collision, 'geometry')
+            polyline = Et.SubElement(geometry, 'polyline')
+            Et.SubElement(polyline, 'height').text = "%f" % height
+            addPolylinePoints(polyline, np.vstack((hull, hull[:1])))
+        else:
+            center, size, yaw = orientedBoundingBox(pointList[:2, :].T)
+            Et.SubElement(collision, 'pose').text = '%f %f %f 0 0 %f' % (
+                center[0], center[1], base + height / 2, yaw)
+            Et.SubElement(Et.SubElement(Et.SubElement(
+                collision, 'geometry'), 'box'), 'size').text = '%f %f %f' % (
+                    size[0], size[1], height)
+
+    def addFeatures(self, roadPointWidthMap, modelPoseMap, buildingLocationMap,
+                    jobs=1):
+        '''Add the models, buildings and roads returned by
+           Osm2Dict.getMapDetails(). With jobs other than 1 (None for all
+           cpus) the buildings and roads are built by a pool of worker
+           processes, giving the same output as the serial path'''
+        for model in modelPoseMap.keys():
+            points = modelPoseMap[model]['points']
+            if len(points):
+                self.addModel(modelPoseMap[model]['mainModel'],
+                              model,
+                              [points[0, 0], points[1, 0], points[2, 0]])
+
+        # Merge mode groups links of all features into shared models
+        if jobs != 1 and self.mergeMode is None:
+            self.addFeaturesParallel(roadPointWidthMap, buildingLocationMap,
+                                     jobs)
+            return
+
+        for building in buildingLocationMap.keys():
+            self.addBuilding(buildingLocationMap[building]['mean'],
+                             buildingLocationMap[building]['points'],
+                             building,
+                             buildingLocationMap[building]['color'],
+                             buildingLocationMap[building]['height'])
+
+        for road in roadPointWidthMap.keys():
+            self.addRoad(road, roadPointWidthMap[road]['width'],
+                         roadPointWidthMap[road]['points'])
+
+    def addFeaturesParallel(self, roadPointWidthMap, buildingLocationMap,
+                            jobs=None):
+        '''Shards the buildings and roads over worker processes and adds
+           their serialized fragments in the serial order'''
+        workers = jobs or os.cpu_count() or 1
+        # The road collision patch spans all roads, so it is grown here
+        options = dict(buildingCollision=self.buildingCollision,
+                       roadCollision=('none' if self.roadCollision == 'patch'
+                                      else self.roadCollision),
+                       cacheDirectory=(self.cacheDirectory
+                                       if self.cache is not None
+                                       else None))
+        tasks = []
+        for kind, features in (('building', buildingLocationMap),
+                               ('road', roadPointWidthMap)):
+            items = list(features.items())
+            size = max(MIN_SHARD, -(-len(items) // (4 * workers)))
+            tasks.extend((kind, items[start:start + size], options)
+                         for start in range(0, len(items), size))
+        if len(tasks) > 1 and workers > 1:
+            payloads = tasks
+            if self.compactShards:
+                payloads = [(kind, packFeatures([{
+                    name: {key: data[key] for key in SHARD_FIELDS[kind]}
+                    for name, data in features}]), options)
+                    for kind, features, options in tasks]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                self.addShards(tasks, executor.map(buildFragments, payloads))
+        else:
+            self.addShards(tasks, map(buildFragments, tasks))
+
+    def addShards(self, tasks, results):
+        '''Adds the fragments of the buildFragments() results of the tasks
+           as they come'''
+        for (kind, features, options), (fragments, counts) in zip(tasks,
+                                                                  results):
+            if self.cache is not None:
+                self.cache.hits += counts[0]
+                self.cache.misses += counts[1]
+            for (name, data), fragment in zip(features, fragments):
+                if fragment:
+                    self.addFragment(fragment)
+                if (kind == 'road' and self.roadCollision == 'patch' and
+                        data['points'].shape[1]):
+                    self.extendRoadPatch(data['points'], data['width'])
+
+    def addMesh(self, kind, meshName, uri, color, footprints=()):
+        '''Add a static road or building model whose visual geometry is the
+           mesh file at uri. The collision follows roadCollision and
+           buildingCollision: the mesh itself in full mode, otherwise the
+           footprints of the mesh, (2, N) road polygons extending the road
+           patch or (pointList, height) buildings each given a hull or box
+           standing on its lowest node'''
+        mesh, collision, visual = self.cloneModel(kind, color, meshName)
+        geometry = Et.Element('geometry')
+        Et.SubElement(Et.SubElement(geometry, 'mesh'), 'uri').text = uri
+        visual.append(deepcopy(geometry))
+        mode = self.roadCollision if kind == 'road' else \
+            self.buildingCollision
+        if mode == 'full':
+            collision.append(geometry)
+            return
+        link = collision.getparent()
+        position = link.index(collision)
+        link.remove(collision)
+        for k, footprint in enumerate(footprints):
+            if kind == 'road':
+                if mode == 'patch':
+                    self.extendRoadPatch(footprint, 0)
+                continue
+            shape = deepcopy(collision)
+            shape.set('name', '%s_%d' % (meshName, k))
+            pointList, height = footprint
+            self.addFootprintCollision(shape, pointList, height,
+                                       lowestNode(pointList))
+            link.insert(position + k, shape)
+
+    def addGroundPlane(self, bbox):
+        ground_plane_name = 'ground_plane'
+        ground_plane, collision, visual = self.cloneModel(
+            'ground_plane', 'Yellow', ground_plane_name)
+        ground_plane.find('pose').text = '%f %f 0 0 0 0' % (
+            (bbox[0]+bbox[2])/2, (bbox[1]+bbox[3])/2)
+        geometry = Et.Element('geometry')
+        plane = Et.SubElement(geometry, 'plane')
+        Et.SubElement(plane, 'normal').text = '0 0 1'
+        Et.SubElement(plane, 'size').text = '%f %f' % (
+            (bbox[2]-bbox[0]), (bbox[3]-bbox[1]))
+        collision.append(geometry)
+        visual.append(deepcopy(geometry))
+
+    def addHeightmap(self, uri, bbox, low, span):
+        '''Add the terrain of the bbox as the heightmap image at uri, its
+           darkest pixel at height low and its brightest at low + span'''
+        terrain, collision, visual = self.cloneModel(
+            'ground_plane', 'Yellow', 'terrain')
+        geometry = Et.Element('geometry')
+        heightmap = Et.SubElement(geometry, 'heightmap')
+        Et.SubElement(heightmap, 'uri').text = uri
+        Et.SubElement(heightmap, 'size').text = '%f %f %f' % (
+            (bbox[2]-bbox[0]), (bbox[3]-bbox[1]), span)
+        Et.SubElement(heightmap, 'pos').text = '%f %f %f' % (
+            (bbox[0]+bbox[2])/2, (bbox[1]+bbox[3])/2, low)
+        collision.append(geometry)
+        visual.append(deepcopy(geometry))
+
+    def modelString(self, modelName):
+        '''Serializes everything added to the world as a single static
+           model named modelName, for use as a model.sdf file'''
+        sdf = Et.Element('sdf')
+        sdf.set('version', self.sdf.get('version'))
+        model = Et.SubElement(sdf, 'model')
+        model.set('name', modelName)
+        Et.SubElement(model, 'static').text = 'true'
+        for child in self.world:
+            if child.tag in ('model', 'include', 'fragment'):
+                model.append(deepcopy(child))
+        return serializeWithFragments(sdf, self.fragments)
+
+    def toString(self):
+        '''Serialized sdf file'''
+        return serializeWithFragments(self.sdf, self.fragments)
+
+    def writeToFile(self, filename):
+        '''Write sdf file'''
+        with open(filename, "wb") as outfile:
+            writeWithFragments(outfile, self.sdf, self.fragments)
@@ -0,0 +1,71 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: FragmentCache() class
+#             On-disk cache of serialized sdf model fragments, keyed by a
+#             hash of everything the fragment is generated from, so that
+#             unchanged features are spliced in as bytes across runs
+##############################################################################
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+#Bump when the generated sdf changes, to invalidate existing caches
+CACHE_VERSION = 1
+
+
+class FragmentCache:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def key(self, *parts):
+        '''Hash of the parts: numpy arrays by dtype, shape and contents,
+           anything else by repr'''
+        digest = hashlib.sha256(b'gazebo_osm %d' % CACHE_VERSION)
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                part = np.ascontiguousarray(part)
+                digest.update(('%s%r' % (part.dtype.str, part.shape)).encode())
+                digest.update(part.tobytes())
+            else:
+                digest.update(repr(part).encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + '.sdf')
+
+    def get(self, key):
+        '''Returns the cached fragment for key, or None'''
+        try:
+            with open(self.path(key), 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        '''Stores the fragment under key. The file is renamed into place so
+           that concurrent processes never read a partial fragment'''
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        handle, tmp = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
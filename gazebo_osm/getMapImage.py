@@ -10,37 +10,18 @@
 ##############################################################################
 
 import os
-try:
-    import mapnik
-    HAS_MAPNIK = True
-except ImportError:
-    HAS_MAPNIK = False
-
-try:
-    import matplotlib.pyplot as plt
-    import matplotlib as mplb
-    HAS_MTPLT = True
-except ImportError:
-    HAS_MTPLT = False
 
 import numpy as np
-        
-from dict2sdf import dilate_polyline, split_roads, allclose_index
 
+from .dict2sdf import dilate_polyline, split_roads, allclose_index
+from .rasterize import RGBACOLORS
 
-RGBACOLORS = dict(
-    Red=[1,  0,  0, 1],
-    Blue=[0, 0, 1, 1],
-    Green=[0,1,0,1],
-    RedBright=[0.87,0.26,0.07,1],
-    Purple=[1,0,1,1],
-    Orange=[1,0.5088,0.0468,1],
-    Yellow=[1,1,0,1],
-    GroundGray=[0.3,0.3,0.3,1]
-    )
 
 class MPLBMap():
     def __init__(self, bbox):
+        # matplotlib takes longer to import than the rest of the package,
+        # so it is only loaded once a map is drawn with it
+        import matplotlib.pyplot as plt
         self.fig, self.ax = plt.subplots(
             figsize=((bbox[2]-bbox[0])/100,
                      (bbox[3]-bbox[1])/100),
@@ -52,6 +33,26 @@ class MPLBMap():
         self.ax.set_ylim(bbox[1], bbox[3])
         self.ax.axis('off')
         self.ax.axis('equal')
+        #Polygons waiting to be drawn, one list per (kind, color) in the
+        #order they were first added
+        self.polygons = dict()
+
+    def add_polygon(self, points, color, kind='building'):
+        '''Queues the (N, 2) polygon to be drawn with the others of its
+           kind and color'''
+        self.polygons.setdefault((kind, color), []).append(points)
+
+    def flush(self):
+        '''Adds the queued polygons as one PolyCollection per kind and color'''
+        from matplotlib import rcParams
+        from matplotlib.collections import PolyCollection
+        for (kind, color), polygons in self.polygons.items():
+            # Data limits as add_patch() would set them, without autoscaling
+            self.ax.update_datalim(np.concatenate(polygons))
+            self.ax.add_collection(PolyCollection(
+                polygons, color=RGBACOLORS[color],
+                linewidths=rcParams['patch.linewidth']), autolim=False)
+        self.polygons = dict()
 
     def add_road(self, road_name, width, road_points):
         if not road_points.shape[1]:
@@ -66,9 +67,7 @@ class MPLBMap():
             dilated_road_points = road_points[:2, :].T
         else:
             dilated_road_points = np.asarray(dilate_polyline(road_points, width))
-        self.ax.add_patch(mplb.patches.Polygon(
-            dilated_road_points[:-1], color=RGBACOLORS['GroundGray']))
-            
+        self.add_polygon(dilated_road_points[:-1], 'GroundGray', 'road')
 
     def add_roads(self, roadPointWidthMap):
         for road_name, road_data in roadPointWidthMap.items():
@@ -82,17 +81,19 @@ class MPLBMap():
                         building['color'],
                         building['height'])
     def add_building(self, mean, pointList, building_name, color, height):
-        self.ax.add_patch(mplb.patches.Polygon(pointList[:2, :-1].T, 
-                                               color=RGBACOLORS[color]))
+        self.add_polygon(pointList[:2, :-1].T, color)
 
 
     def save_image(self, image_file):
+        self.flush()
         self.fig.savefig(image_file)
 
 def getMapImage(osmFile, map_output):
     '''Uses the data from the osmFile to out a .png image
        of the area depicted by the input file'''
-    if not HAS_MAPNIK :
+    try:
+        import mapnik
+    except ImportError:
         print ('Error: Mapnik module is missing. ' +
                'Please install for getting the image functionality.')
         return -2
@@ -0,0 +1,87 @@
+##############################################################################
+#Author: Tashwin Khurana
+#Version: 1.0
+#Package: gazebo_osm
+#
+#Description: getOsmFile()
+#             Downloads the .osm file for the stated bounding box and
+#             Stores it in file with the specified name
+##############################################################################
+
+import shutil
+import urllib.request
+
+from lxml import etree
+
+
+def downloadOsmFile(box, outputFile='map.osm'):
+    '''downloads the data file for the bounding box
+       [minLon, minLat, maxLon, maxLat] and stores it as outputFile'''
+    with urllib.request.urlopen('http://api.openstreetmap.org' +
+                                '/api/0.6/map?bbox=' +
+                                str(box)[1:-1].replace(" ", "")) as osmFile:
+        with open(outputFile, 'wb') as osm:
+            shutil.copyfileobj(osmFile, osm)
+
+
+def parseOsmFile(osmFile):
+    '''converts the data of the .osm file in the form of a dictionary'''
+    # Only needed here, so importing the package stays fast
+    import osmapi
+    with open(osmFile, 'r') as osmRead:
+        return osmapi.parser.ParseOsm(osmRead.read())
+
+
+def streamOsmFile(osmFile):
+    '''Yields the elements of the .osm file one at a time, in the format of
+       parseOsmFile() but with only the id, lat, lon, nd, member and tag
+       fields. The parsed part of the document is freed as it goes'''
+    with open(osmFile, 'rb') as f:
+        for event, element in etree.iterparse(
+                f, events=('end',), tag=('node', 'way', 'relation')):
+            data = dict(id=int(element.get('id')),
+                        tag={tag.get('k'): tag.get('v')
+                             for tag in element.iterchildren('tag')})
+            if element.tag == 'node':
+                data['lat'] = float(element.get('lat'))
+                data['lon'] = float(element.get('lon'))
+            elif element.tag == 'way':
+                data['nd'] = [int(nd.get('ref'))
+                              for nd in element.iterchildren('nd')]
+            else:
+                data['member'] = [dict(type=member.get('type'),
+                                       ref=int(member.get('ref')),
+                                       role=member.get('role'))
+                                  for member in element.iterchildren('member')]
+            yield dict(type=element.tag, data=data)
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def osmBounds(osmFile):
+    '''[minLon, minLat, maxLon, maxLat] of the bounds element of the .osm
+       file, read without parsing the rest of it, or None'''
+    with open(osmFile, 'rb') as f:
+        for event, element in etree.iterparse(f, events=('start',)):
+            if element.tag == 'bounds':
+                return [float(element.get(key))
+                        for key in ('minlon', 'minlat', 'maxlon', 'maxlat')]
+            if element.tag in ('node', 'way', 'relation'):
+                return None
+    return None
+
+
+def getOsmFile(box, outputFile='map.osm', inputOsmFile=''):
+    '''downloads the data file for the specified bounding box
+       stores the file as outputFile, if inputOsmFile is not specified
+       and also converts the data in the form of a dictionary'''
+    if not box and not inputOsmFile:
+        return None
+
+    if inputOsmFile:
+        outputFile = inputOsmFile
+    else:
+        downloadOsmFile(box, outputFile)
+
+    return parseOsmFile(outputFile)
@@ -0,0 +1,206 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: MemoryBudget class
+#             Bounds the memory held by the large buffers of a run: node
+#             and way columns of the streamed osm data, feature points and
+#             serialized sdf fragments. Buffers stay in memory while they
+#             fit in their share of the budget and are spilled to memory
+#             mapped temporary files beyond it, whose pages the kernel can
+#             drop instead of the process being killed
+##############################################################################
+
+import array
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+#Items of a Column appended between two checks of the budget
+CHUNK = 1 << 16
+
+
+class MemoryBudget:
+    '''maxBytes is the memory allowed to the whole run. The spilled buffers
+       share a quarter of it, the rest is left to the interpreter, the
+       parser and the sdf tree. Temporary files go to a new directory in
+       directory (by default the system temporary directory), removed by
+       close()'''
+
+    def __init__(self, maxBytes, directory=None):
+        self.maxBytes = maxBytes
+        self.bufferBytes = maxBytes // 4
+        self.held = 0
+        self.spilled = 0
+        self.parent = directory
+        self.directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reserve(self, nbytes):
+        '''Takes nbytes of the buffer share if they fit, returns whether
+           they did'''
+        if self.held + nbytes > self.bufferBytes:
+            return False
+        self.held += nbytes
+        return True
+
+    def release(self, nbytes):
+        self.held -= nbytes
+
+    def tempFile(self):
+        '''New temporary file opened for binary writing'''
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='gz_osm_',
+                                              dir=self.parent)
+            self.remove = weakref.finalize(self, shutil.rmtree,
+                                           self.directory, True)
+        return tempfile.NamedTemporaryFile(dir=self.directory, delete=False)
+
+    def column(self, typecode):
+        return Column(self, typecode)
+
+    def fragmentStore(self):
+        return FragmentStore(self)
+
+    def spillFeatures(self, *featureMaps):
+        '''Moves the points of the features to one memory mapped file when
+           they do not fit in the budget. Returns the bytes spilled'''
+        arrays = [(feature, np.ascontiguousarray(feature['points']))
+                  for features in featureMaps for feature in features.values()
+                  if isinstance(feature['points'], np.ndarray) and
+                  feature['points'].dtype == np.float64 and
+                  feature['points'].size]
+        size = sum(points.size for feature, points in arrays)
+        if self.reserve(size * 8):
+            return 0
+        with self.tempFile() as f:
+            for feature, points in arrays:
+                f.write(points.tobytes())
+        spilled = np.memmap(f.name, dtype=np.float64, mode='r', shape=(size,))
+        start = 0
+        for feature, points in arrays:
+            feature['points'] = spilled[start:start + points.size].reshape(
+                points.shape)
+            start += points.size
+        self.spilled += size * 8
+        return size * 8
+
+    def close(self):
+        '''Removes the temporary files, also done when the budget is
+           garbage collected or the interpreter exits'''
+        if self.directory is not None:
+            self.remove()
+            self.directory = None
+
+
+class Column:
+    '''Growing array of the array module typecode ('q' int64, 'd' float64)
+       kept in memory while it fits in the budget, then in a file. array()
+       returns its values as a numpy array or memmap'''
+
+    def __init__(self, budget, typecode):
+        self.budget = budget
+        self.typecode = typecode
+        self.dtype = np.dtype(typecode)
+        self.buffer = array.array(typecode)
+        self.chunks = []
+        self.held = 0
+        self.file = None
+        self.size = 0
+
+    def append(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) == CHUNK:
+            self.flush()
+
+    def extend(self, values):
+        self.buffer.extend(values)
+        if len(self.buffer) >= CHUNK:
+            self.flush()
+
+    def flush(self):
+        chunk = self.buffer
+        self.buffer = array.array(self.typecode)
+        self.size += len(chunk)
+        nbytes = len(chunk) * chunk.itemsize
+        if self.file is None and self.budget.reserve(nbytes):
+            self.chunks.append(chunk)
+            self.held += nbytes
+            return
+        if self.file is None:
+            self.file = self.budget.tempFile()
+            for held in self.chunks:
+                held.tofile(self.file)
+            self.chunks = []
+            self.budget.release(self.held)
+            self.budget.spilled += self.held
+            self.held = 0
+        chunk.tofile(self.file)
+        self.budget.spilled += nbytes
+
+    def array(self):
+        self.flush()
+        if self.file is None:
+            values = array.array(self.typecode)
+            for chunk in self.chunks:
+                values.extend(chunk)
+            self.chunks = [values]
+            return np.frombuffer(values, dtype=self.dtype)
+        self.file.close()
+        if not self.size:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.file.name, dtype=self.dtype, mode='r',
+                         shape=(self.size,))
+
+    def close(self):
+        '''Gives the memory of the column back to the budget, once its
+           array is no longer used'''
+        self.budget.release(self.held)
+        self.held = 0
+        self.chunks = []
+
+
+class FragmentStore:
+    '''List of the serialized fragments of GetSDF, kept in memory while
+       they fit in the budget, then appended to a file and read back by
+       index'''
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.fragments = []
+        self.held = 0
+        self.file = None
+        self.offsets = array.array('q', [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def append(self, data):
+        if self.file is None and self.budget.reserve(len(data)):
+            self.fragments.append(data)
+            self.held += len(data)
+        else:
+            if self.file is None:
+                self.file = self.budget.tempFile()
+                self.file.write(b''.join(self.fragments))
+                self.fragments = []
+                self.budget.release(self.held)
+                self.budget.spilled += self.held
+            self.file.write(data)
+            self.budget.spilled += len(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+
+    def __getitem__(self, index):
+        if self.file is None:
+            return self.fragments[index]
+        self.file.flush()
+        return os.pread(self.file.fileno(),
+                        self.offsets[index + 1] - self.offsets[index],
+                        self.offsets[index])
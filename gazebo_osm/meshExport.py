@@ -0,0 +1,276 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: MeshBuilder() class
+#             Triangulates building footprints and road polygons by ear
+#             clipping, extrudes them by their height from their lowest
+#             node and writes one binary STL mesh per material (or per
+#             material and tile) for the sdf file to reference through
+#             <mesh><uri>
+##############################################################################
+
+import os
+import numpy as np
+
+from .dict2sdf import split_roads, dilate_polyline, lowestNode, ROAD_HEIGHT
+
+STL_DTYPE = np.dtype([('normal', '<f4', (3,)),
+                      ('vertices', '<f4', (3, 3)),
+                      ('attribute', '<u2')])
+
+
+def signedArea(ring):
+    '''Signed area of the ring (N, 2), positive if counter clockwise'''
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)
+
+
+def cleanRing(points):
+    '''Drops the closing point, repeated consecutive points and zero width
+       spikes (a -> b -> a) of the ring (N, 2)'''
+    ring = np.asarray(points, dtype=float)
+    while len(ring) > 2:
+        keep = np.any(ring != np.roll(ring, 1, axis=0), axis=1)
+        if not np.any(keep):
+            return ring[:1]
+        ring = ring[keep]
+        spike = np.all(np.roll(ring, 1, axis=0) == np.roll(ring, -1, axis=0),
+                       axis=1)
+        if not np.any(spike):
+            break
+        # Drop the tip of the first spike; its base is merged on the next pass
+        ring = np.delete(ring, np.flatnonzero(spike)[0], axis=0)
+    return ring
+
+
+def cross2(o, a, b):
+    '''z component of (a - o) x (b - o), broadcast over leading axes'''
+    return ((a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) -
+            (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0]))
+
+
+def bridgeHole(outer, hole):
+    '''Joins the clockwise hole to the counter clockwise outer ring through
+       a pair of coincident bridge edges, giving a single weakly simple ring'''
+    m = np.argmax(hole[:, 0])
+    mx, my = hole[m]
+    start = outer
+    end = np.roll(outer, -1, axis=0)
+    straddles = ((start[:, 1] - my) * (end[:, 1] - my) <= 0) & \
+        (start[:, 1] != end[:, 1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ix = start[:, 0] + ((my - start[:, 1]) * (end[:, 0] - start[:, 0]) /
+                            (end[:, 1] - start[:, 1]))
+    hits = straddles & (ix >= mx)
+    if np.any(hits):
+        edge = np.flatnonzero(hits)[np.argmin(ix[hits])]
+        nxt = (edge + 1) % len(outer)
+        p = edge if outer[edge, 0] > outer[nxt, 0] else nxt
+        # A reflex vertex inside (M, I, P) would block the bridge, take the
+        # one closest in angle to the ray instead
+        corner = np.array([[mx, my], [ix[edge], my], outer[p]])
+        if cross2(corner[0], corner[1], corner[2]) < 0:
+            corner = corner[[0, 2, 1]]
+        inside = ((cross2(corner[0], corner[1], outer) >= 0) &
+                  (cross2(corner[1], corner[2], outer) >= 0) &
+                  (cross2(corner[2], corner[0], outer) >= 0))
+        reflex = cross2(np.roll(outer, 1, axis=0), outer,
+                        np.roll(outer, -1, axis=0)) < 0
+        blocking = np.flatnonzero(inside & reflex)
+        blocking = blocking[blocking != p]
+        if len(blocking):
+            delta = outer[blocking] - [mx, my]
+            angle = np.abs(np.arctan2(delta[:, 1], delta[:, 0]))
+            p = blocking[np.argmin(angle)]
+    else:
+        p = np.argmin(np.sum((outer - [mx, my]) ** 2, axis=1))
+    return np.vstack((outer[:p + 1], np.roll(hole, -m, axis=0),
+                      hole[m:m + 1], outer[p:]))
+
+
+def earClip(ring):
+    '''Ear clipping triangulation of the counter clockwise ring (N, 2).
+       Returns the (N - 2, 3) vertex indices of the triangles'''
+    remaining = list(range(len(ring)))
+    triangles = []
+    k = 0
+    misses = 0
+    while len(remaining) > 3:
+        n = len(remaining)
+        k %= n
+        i0, i1, i2 = remaining[k - 1], remaining[k], remaining[(k + 1) % n]
+        a, b, c = ring[i0], ring[i1], ring[i2]
+        isEar = cross2(a, b, c) > 0
+        if isEar:
+            others = ring[remaining]
+            notCorner = ~(np.all(others == a, axis=1) |
+                          np.all(others == b, axis=1) |
+                          np.all(others == c, axis=1))
+            others = others[notCorner]
+            isEar = not np.any((cross2(a, b, others) >= 0) &
+                               (cross2(b, c, others) >= 0) &
+                               (cross2(c, a, others) >= 0))
+        if isEar or misses > n:
+            # Degenerate rings (collinear or self touching) never produce
+            # a clean ear, so after a full lap clip the current vertex
+            if isEar or cross2(a, b, c) != 0:
+                triangles.append((i0, i1, i2))
+            del remaining[k]
+            misses = 0
+        else:
+            k += 1
+            misses += 1
+    if len(remaining) == 3:
+        triangles.append(tuple(remaining))
+    return np.asarray(triangles, dtype=int).reshape(-1, 3)
+
+
+def orientRings(outer, holes=()):
+    '''Cleans the outer ring to counter clockwise and the holes to
+       clockwise order, dropping holes with less than three points'''
+    outerRing = cleanRing(outer)
+    if signedArea(outerRing) < 0:
+        outerRing = outerRing[::-1]
+    holeRings = []
+    for hole in holes:
+        hole = cleanRing(hole)
+        if len(hole) >= 3:
+            holeRings.append(hole[::-1] if signedArea(hole) > 0 else hole)
+    return outerRing, holeRings
+
+
+def triangulate(outer, holes=()):
+    '''Triangulates the polygon outer (N, 2) with the given hole rings.
+       Returns the vertices (V, 2) and the (T, 3) counter clockwise
+       triangles indexing them'''
+    ring, holeRings = orientRings(outer, holes)
+    for hole in sorted(holeRings, key=lambda h: -np.max(h[:, 0])):
+        ring = bridgeHole(ring, hole)
+    if len(ring) < 3:
+        return ring, np.zeros((0, 3), dtype=int)
+    return ring, earClip(ring)
+
+
+def extrude(vertices, triangles, rings, height, base=0.0):
+    '''Prism between base and base + height over the triangulated polygon.
+       rings are the outer and hole boundaries used for the side walls.
+       Returns a (T, 3, 3) triangle soup with outward facing triangles'''
+    top = base + height
+    tri = vertices[triangles]
+    zeros = np.zeros(tri.shape[:2] + (1,))
+    caps = [np.concatenate((tri, zeros + top), axis=2),
+            np.concatenate((tri[:, ::-1], zeros + base), axis=2)]
+    for ring in rings:
+        p = ring
+        q = np.roll(ring, -1, axis=0)
+        lo = np.full((len(p), 1), base)
+        hi = np.full((len(p), 1), top)
+        p0, q0 = np.hstack((p, lo)), np.hstack((q, lo))
+        p1, q1 = np.hstack((p, hi)), np.hstack((q, hi))
+        caps.append(np.stack((p0, q0, q1), axis=1))
+        caps.append(np.stack((p0, q1, p1), axis=1))
+    return np.concatenate(caps, axis=0)
+
+
+def prism(outer, holes, height, base=0.0):
+    '''Triangle soup of the polygon outer with holes extruded by height
+       from base'''
+    outerRing, holeRings = orientRings(outer, holes)
+    if len(outerRing) < 3:
+        return np.zeros((0, 3, 3))
+    vertices, triangles = triangulate(outerRing, holeRings)
+    return extrude(vertices, triangles, [outerRing] + holeRings, height,
+                   base)
+
+
+def writeStl(filename, triangles):
+    '''Writes the (T, 3, 3) triangles as a binary STL file'''
+    triangles = np.asarray(triangles, dtype=float).reshape(-1, 3, 3)
+    normals = np.cross(triangles[:, 1] - triangles[:, 0],
+                       triangles[:, 2] - triangles[:, 0])
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, length, out=np.zeros_like(normals),
+                        where=length > 0)
+    records = np.zeros(len(triangles), dtype=STL_DTYPE)
+    records['normal'] = normals
+    records['vertices'] = triangles
+    with open(filename, 'wb') as stl:
+        stl.write(b'gazebo_osm'.ljust(80, b' '))
+        stl.write(np.uint32(len(records)).tobytes())
+        stl.write(records.tobytes())
+
+
+def roadPolygons(roadName, width, roadPoints):
+    '''Yields the (N, 2) polygons GetSDF.addRoad draws for a road'''
+    if not roadPoints.shape[1]:
+        return
+    multiroads = split_roads(roadName, roadPoints)
+    if len(multiroads) >= 2:
+        for i, roads in enumerate(multiroads):
+            yield from roadPolygons(roadName + '_p%d' % i, width, roads)
+        return
+    if np.all(roadPoints[:2, 0] == roadPoints[:2, -1]):
+        yield roadPoints[:2, :].T
+    elif roadPoints.shape[1] >= 2:
+        yield np.asarray(dilate_polyline(roadPoints, width))
+
+
+class MeshBuilder:
+    '''Collects extruded buildings and roads into one triangle soup per
+       (kind, material), or per (kind, material, tile) if tileSize is given,
+       with the footprints of each mesh for its collision geometry'''
+
+    def __init__(self, tileSize=None):
+        self.tileSize = tileSize
+        self.meshes = dict()
+        self.footprints = dict()
+
+    def meshKey(self, kind, color, anchor):
+        if not self.tileSize:
+            return (kind, color)
+        return (kind, color,
+                int(np.floor(anchor[0] / self.tileSize)),
+                int(np.floor(anchor[1] / self.tileSize)))
+
+    def addTriangles(self, kind, color, anchor, triangles, footprint):
+        if len(triangles):
+            key = self.meshKey(kind, color, anchor)
+            self.meshes.setdefault(key, []).append(triangles)
+            self.footprints.setdefault(key, []).append(footprint)
+
+    def addBuilding(self, pointList, color, height, holes=()):
+        '''Add the extruded footprint of a building, standing on its lowest
+           node like the links of GetSDF.setLinkElevation'''
+        self.addTriangles('building', color, pointList[:2, 0],
+                          prism(pointList[:2, :].T,
+                                [hole[:2, :].T for hole in holes], height,
+                                lowestNode(pointList)),
+                          (pointList, height))
+
+    def addRoad(self, roadName, width, roadPoints):
+        '''Add the dilated and extruded road, every part split where the
+           road loops standing on its lowest node'''
+        parts = split_roads(roadName, roadPoints) \
+            if roadPoints.shape[1] else []
+        for part in (parts if len(parts) >= 2 else [roadPoints]):
+            base = lowestNode(part)
+            for polygon in roadPolygons(roadName, width, part):
+                self.addTriangles('road', 'GroundGray', polygon[0],
+                                  prism(polygon, [], ROAD_HEIGHT, base),
+                                  polygon.T)
+
+    def write(self, directory):
+        '''Writes one STL file per mesh into directory. Returns a list of
+           (kind, color, name, filename, footprints) for the written meshes,
+           footprints being the (2, N) polygons of the roads or the
+           (pointList, height) of the buildings of the mesh'''
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        written = []
+        for key, parts in self.meshes.items():
+            name = "_".join([key[0] + 's'] + [str(k) for k in key[1:]])
+            filename = os.path.join(directory, name + '.stl')
+            writeStl(filename, np.concatenate(parts, axis=0))
+            written.append((key[0], key[1], name, filename,
+                            self.footprints[key]))
+        return written
@@ -0,0 +1,212 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: ModelResolver class
+#             Chooses the uri of the models included in a world: the Gazebo
+#             Fuel url, or the model directory found on local model paths,
+#             written as a file:// or a model:// uri. Local models are
+#             looked up once at generation time, so that the world never
+#             needs the network when it starts, and the missing ones are
+#             reported
+##############################################################################
+
+import os
+from copy import deepcopy
+
+import lxml.etree as Et
+import numpy as np
+
+FUEL_URL = "https://fuel.gazebosim.org/1.0/OpenRobotics/models/"
+SOURCES = ('fuel', 'path', 'uri')
+MISSING = ('include', 'skip', 'error')
+#Environment variables listing model directories, by Gazebo version
+PATH_VARIABLES = ('GZ_SIM_RESOURCE_PATH', 'IGN_GAZEBO_RESOURCE_PATH',
+                  'GAZEBO_MODEL_PATH')
+#Model caches of gz fuel download, holding <name>/<version>/ directories
+FUEL_CACHES = ('~/.gz/fuel', '~/.ignition/fuel')
+FUEL_MODELS = os.path.join('fuel.gazebosim.org', 'openrobotics', 'models')
+
+
+def defaultModelPaths():
+    '''Model directories of the environment, then the Fuel caches'''
+    paths = []
+    for variable in PATH_VARIABLES:
+        paths += [path for path in os.environ.get(variable, '').split(
+            os.pathsep) if path]
+    caches = [os.environ['GZ_FUEL_CACHE_PATH']] \
+        if os.environ.get('GZ_FUEL_CACHE_PATH') else []
+    caches += [os.path.expanduser(cache) for cache in FUEL_CACHES]
+    paths += [os.path.join(cache, FUEL_MODELS) for cache in caches]
+    return paths
+
+
+def directoryNames(modelName):
+    '''Directory names a model may be stored under: the Fuel name, its
+       lower case, as in the Fuel cache, and the snake case of the classic
+       model database (Stop Sign, stop sign, stop_sign)'''
+    names = [modelName, modelName.lower(),
+             modelName.lower().replace(' ', '_')]
+    return sorted(set(names), key=names.index)
+
+
+def parsePose(element):
+    '''Six floats of a <pose> element, zeros if there is none'''
+    if element is None or not (element.text or '').split():
+        return np.zeros(6)
+    return np.array([float(v) for v in element.text.split()])
+
+
+def readModel(directory):
+    '''<model> element of the sdf file named by the model.config of the
+       model directory, by default model.sdf. None if it cannot be read'''
+    sdfFile = 'model.sdf'
+    try:
+        config = Et.parse(os.path.join(directory, 'model.config'))
+        sdfFile = (config.getroot().findtext('sdf') or sdfFile).strip()
+    except (OSError, Et.XMLSyntaxError):
+        pass
+    try:
+        return Et.parse(os.path.join(directory, sdfFile), Et.XMLParser(
+            remove_blank_text=True)).getroot().find('model')
+    except (OSError, Et.XMLSyntaxError):
+        return None
+
+
+def isModel(directory):
+    return (os.path.isfile(os.path.join(directory, 'model.config')) or
+            os.path.isfile(os.path.join(directory, 'model.sdf')))
+
+
+def modelDirectory(directory):
+    '''directory if it holds a model, else its latest numbered version
+       holding one, as in the Fuel cache, else None'''
+    if isModel(directory):
+        return directory
+    versions = [entry for entry in (os.listdir(directory)
+                                    if os.path.isdir(directory) else [])
+                if entry.isdigit() and isModel(os.path.join(directory, entry))]
+    if versions:
+        return os.path.join(directory, max(versions, key=int))
+    return None
+
+
+class ModelResolver:
+    '''Uri of the included models. source 'fuel' includes them from Gazebo
+       Fuel; 'path' and 'uri' include the model directory found on
+       modelPaths, then the Gazebo model path variables and the Fuel caches,
+       as file://<absolute directory> or as model://<directory> (Fuel cache
+       versions always as file://). missing tells what becomes of the models
+       not found: 'include' keeps them as model://<snake_case_name>, which
+       classic Gazebo fetches from its online model database, 'skip' leaves
+       them out and 'error' makes check() raise. It defaults to 'skip' for
+       the local sources, so that the world never needs the network'''
+
+    def __init__(self, source='fuel', modelPaths=None, missing=None):
+        if missing is None:
+            missing = 'include' if source == 'fuel' else 'skip'
+        for value, valid, what in ((source, SOURCES, 'model source'),
+                                   (missing, MISSING, 'missing model mode')):
+            if value not in valid:
+                raise ValueError("Unknown %s %r [Valid values : %s]"
+                                 % (what, value, ", ".join(valid)))
+        self.source = source
+        self.missing = missing
+        self.modelPaths = list(modelPaths or []) + (
+            defaultModelPaths() if source != 'fuel' else [])
+        #Model directory of every model name looked up, None if missing
+        self.found = dict()
+        #Links of the model.sdf of every model name instanced
+        self.links = dict()
+
+    def __getstate__(self):
+        # Parsed links are not picklable: worker processes parse them again
+        return dict(self.__dict__, links=dict())
+
+    def find(self, modelName):
+        '''Directory of the model on the model paths, None if missing. The
+           Fuel cache keeps one directory per version: the latest is used'''
+        if modelName not in self.found:
+            found = (modelDirectory(os.path.join(path, name))
+                     for path in self.modelPaths
+                     for name in directoryNames(modelName))
+            directory = next((d for d in found if d is not None), None)
+            self.found[modelName] = (directory and
+                                     os.path.abspath(directory))
+        return self.found[modelName]
+
+    def check(self, modelNames):
+        '''Looks up the models once and returns the sorted missing names.
+           Raises LookupError if any is missing in 'error' mode'''
+        if self.source == 'fuel':
+            return []
+        missing = sorted(name for name in set(modelNames)
+                         if self.find(name) is None)
+        if missing and self.missing == 'error':
+            raise LookupError("Models not found on %s: %s" % (
+                os.pathsep.join(self.modelPaths) or 'no model path',
+                ', '.join(missing)))
+        return missing
+
+    def uri(self, modelName):
+        '''Uri of the model, None if it is missing and skipped'''
+        if self.source == 'fuel':
+            return FUEL_URL + modelName
+        directory = self.find(modelName)
+        if directory is None:
+            if self.missing == 'skip':
+                return None
+            return 'model://' + directoryNames(modelName)[-1]
+        # model:// only finds <path>/<name>, not the versioned directories
+        # of the Fuel cache, which are given by file://
+        if self.source == 'path' or os.path.basename(directory).isdigit():
+            return 'file://' + os.path.abspath(directory)
+        return 'model://' + os.path.basename(directory)
+
+    def localUri(self, uri, modelName, directory):
+        '''uri of a file referenced by the sdf of the model in directory,
+           made valid outside the model: relative files and model:// uris
+           of the model itself are given by path when the model is, or when
+           they are relative'''
+        if '://' not in uri:
+            return uri if os.path.isabs(uri) else os.path.join(directory, uri)
+        if not uri.startswith('model://'):
+            return uri
+        name, _, rest = uri[len('model://'):].partition('/')
+        names = directoryNames(modelName) + [os.path.basename(directory)]
+        if name in names and (self.source == 'path' or
+                              os.path.basename(directory).isdigit()):
+            return os.path.join(directory, rest)
+        return uri
+
+    def modelLinks(self, modelName):
+        '''Links of the local model, posed in its model frame, with the
+           files they reference made valid outside the model directory.
+           None if the model is not found locally or cannot be flattened
+           into links: no links, or a rotated model pose'''
+        if modelName not in self.links:
+            self.links[modelName] = None
+            directory = self.find(modelName) if self.source != 'fuel' \
+                else None
+            model = readModel(directory) if directory else None
+            if model is not None:
+                modelPose = parsePose(model.find('pose'))
+                links = model.findall('link')
+                if links and not modelPose[3:].any():
+                    self.links[modelName] = [
+                        self.flattenLink(link, modelPose[:3], modelName,
+                                         directory) for link in links]
+        return self.links[modelName]
+
+    def flattenLink(self, link, offset, modelName, directory):
+        '''Copy of the link with the model pose offset added to its pose
+           and its file uris made valid outside the model'''
+        link = deepcopy(link)
+        pose = link.find('pose')
+        if pose is None:
+            pose = Et.SubElement(link, 'pose')
+        values = parsePose(pose)
+        values[:3] += offset
+        pose.text = ' '.join('%f' % v for v in values)
+        for uri in link.iter('uri'):
+            uri.text = self.localUri(uri.text.strip(), modelName, directory)
+        return link
@@ -0,0 +1,143 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: OccupancyMap() class
+#             2D occupancy grid of the world for navigation stacks, written
+#             as a map_server style PGM image and YAML file. Roads and flat
+#             areas (grass, parking) are free, building footprints occupied
+#             and everything else a configurable background. The grid is
+#             rasterized in bands of rows so that large maps fit in memory,
+#             and can be written as a set of tiles
+##############################################################################
+
+import os
+
+import numpy as np
+
+from .meshExport import roadPolygons
+from .rasterize import polygonMask
+
+OCCUPIED = 0
+FREE = 254
+UNKNOWN = 205
+BACKGROUNDS = dict(unknown=UNKNOWN, free=FREE, occupied=OCCUPIED)
+#Footprints lower than this, in meters, can be driven over
+OBSTACLE_HEIGHT = 0.1
+
+MAP_YAML = '''image: %s
+resolution: %f
+origin: [%f, %f, 0.0]
+negate: 0
+occupied_thresh: 0.65
+free_thresh: 0.196
+'''
+
+
+def writePgm(filename, image):
+    '''Writes the (H, W) uint8 image as a binary (P5) PGM file'''
+    with open(filename, 'wb') as pgm:
+        pgm.write(b'P5\n# CREATOR: gazebo_osm\n%d %d\n255\n' %
+                  (image.shape[1], image.shape[0]))
+        pgm.write(np.ascontiguousarray(image, dtype=np.uint8).tobytes())
+
+
+class OccupancyMap:
+    '''Occupancy grid over bbox with cells of resolution meters, row 0 at
+       the top (largest y) as map_server expects'''
+
+    def __init__(self, bbox, resolution=0.05, background=UNKNOWN,
+                 bandRows=1024):
+        self.bbox = bbox
+        self.resolution = resolution
+        self.background = background
+        self.bandRows = bandRows
+        self.shape = (max(1, int(np.ceil((bbox[3] - bbox[1]) / resolution))),
+                      max(1, int(np.ceil((bbox[2] - bbox[0]) / resolution))))
+        #Polygons in cell coordinates and their (row, column) bounds, in
+        #drawing order: roads first, buildings over them
+        self.layers = dict(free=([], []), occupied=([], []))
+
+    def toCells(self, points):
+        '''Cell coordinates (column, row) of the (N, 2) points'''
+        return np.stack(((points[:, 0] - self.bbox[0]) / self.resolution,
+                         (self.bbox[3] - points[:, 1]) / self.resolution),
+                        axis=1)
+
+    def addPolygon(self, rings, layer):
+        rings = [self.toCells(np.asarray(ring, dtype=float)) for ring in rings]
+        polygons, bounds = self.layers[layer]
+        polygons.append(rings)
+        bounds.append((rings[0][:, 1].min(), rings[0][:, 1].max(),
+                       rings[0][:, 0].min(), rings[0][:, 0].max()))
+
+    def add_roads(self, roadPointWidthMap):
+        for road_name, road_data in roadPointWidthMap.items():
+            for polygon in roadPolygons(road_name, road_data['width'],
+                                        road_data['points']):
+                self.addPolygon([polygon], 'free')
+
+    def add_buildings(self, buildingLocationMap):
+        for building in buildingLocationMap.values():
+            self.addPolygon([building['points'][:2, :].T] +
+                            [hole[:2, :].T
+                             for hole in building.get('holes', [])],
+                            'occupied' if building['height'] >= OBSTACLE_HEIGHT
+                            else 'free')
+
+    def render(self, top=0, left=0, height=None, width=None):
+        '''The uint8 cells of the window starting at row top and column
+           left, by default the whole map, filled band by band'''
+        height = self.shape[0] - top if height is None else height
+        width = self.shape[1] - left if width is None else width
+        image = np.full((height, width), self.background, dtype=np.uint8)
+        for layer, value in (('free', FREE), ('occupied', OCCUPIED)):
+            polygons, bounds = self.layers[layer]
+            if not polygons:
+                continue
+            bounds = np.asarray(bounds)
+            for bandTop in range(top, top + height, self.bandRows):
+                bandHeight = min(self.bandRows, top + height - bandTop)
+                selected = np.flatnonzero(
+                    (bounds[:, 0] < bandTop + bandHeight) &
+                    (bounds[:, 1] > bandTop) &
+                    (bounds[:, 2] < left + width) & (bounds[:, 3] > left))
+                box = polygonMask((bandHeight, width),
+                                  [[ring - [left, bandTop]
+                                    for ring in polygons[k]]
+                                   for k in selected])
+                if box is None:
+                    continue
+                boxTop, boxLeft, inside = box
+                rows = bandTop - top + boxTop
+                image[rows:rows + inside.shape[0],
+                      boxLeft:boxLeft + inside.shape[1]][inside] = value
+        return image
+
+    def writeMap(self, filename, image, top=0, left=0):
+        '''Writes image, the window at (top, left), as filename.pgm and
+           filename.yaml. Returns the name of the yaml file'''
+        writePgm(filename + '.pgm', image)
+        # The origin is the lower left corner of the image
+        origin = (self.bbox[0] + left * self.resolution,
+                  self.bbox[3] - (top + image.shape[0]) * self.resolution)
+        with open(filename + '.yaml', 'w') as yaml:
+            yaml.write(MAP_YAML % ((os.path.basename(filename) + '.pgm',
+                                    self.resolution) + origin))
+        return filename + '.yaml'
+
+    def save(self, filename, tileSize=None):
+        '''Writes the map as filename.pgm and filename.yaml, or with a
+           tileSize in meters as filename_i_j tiles, column i from the left
+           and row j from the top. Returns the yaml files'''
+        if not tileSize:
+            return [self.writeMap(filename, self.render())]
+        cells = max(1, int(round(tileSize / self.resolution)))
+        written = []
+        for i, left in enumerate(range(0, self.shape[1], cells)):
+            for j, top in enumerate(range(0, self.shape[0], cells)):
+                image = self.render(top, left,
+                                    min(cells, self.shape[0] - top),
+                                    min(cells, self.shape[1] - left))
+                written.append(self.writeMap('%s_%d_%d' % (filename, i, j),
+                                             image, top, left))
+        return written
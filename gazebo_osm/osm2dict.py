@@ -9,12 +9,13 @@
 ##############################################################################
 
 import numpy as np
+from .spatialIndex import pointsInPolygon
 DEFAULT_BUILDING_HEIGHT = 15
 
 
 class Osm2Dict:
 
-    def __init__(self, lonStart, latStart, data, flags=['a']):
+    def __init__(self, lonStart, latStart, data, flags=['a'], elevation=None):
 
         self.latStart = latStart
         self.lonStart = lonStart
@@ -24,6 +25,8 @@ class Osm2Dict:
         self.displayRoads = 'r' in flags
         self.displayBuildings = "b" in flags
         self.flags = flags
+        #Heights of lon, lat arrays, such as a terrain.Terrain
+        self.elevation = elevation
         #Radius of the Earth
         self.R = 6371e3 # m
         self.bbox = None
@@ -140,9 +143,13 @@ class Osm2Dict:
                   np.sin(np.radians(self.latStart)) *
                   np.cos(lat2) * np.cos(dLon)))
 
+        if self.elevation is None:
+            height = np.zeros(np.shape(distance))
+        else:
+            height = self.elevation(coords[:, 0], coords[:, 1])
         point = np.array([distance*np.cos(angles),# * 1000,
                           -distance*np.sin(angles),# * 1000,
-                          np.zeros(np.shape(distance))#*1000
+                          height
                           ])
         return point
 
@@ -186,7 +193,11 @@ class Osm2Dict:
                                                           location,
                                                           'width':
                                                           self.highwayType
-                                                          [typeHighway]}
+                                                          [typeHighway],
+                                                          'type':
+                                                          typeHighway,
+                                                          'nodes':
+                                                          list(node_ref)}
         return self.records
 
     def getModelDetails(self):
@@ -244,6 +255,10 @@ class Osm2Dict:
                 members = [self.ways[m['ref']]
                     for m in element.get("member")
                     if m.get('type') == 'way' and m.get('role') == 'outer']
+                holes = [self.latLonToPoints(self.ways[m['ref']].get("nd"))
+                         for m in element.get("member")
+                         if m.get('type') == 'way' and m.get('role') == 'inner'
+                         and m['ref'] in self.ways]
                 collected_node_ref = [] 
                 for element in members:
                     node_ref = element.get("nd")
@@ -256,6 +271,7 @@ class Osm2Dict:
                     members = [{'nd': sum(collected_node_ref, [])}]
             else:
                 members = [element]
+                holes = []
             for i, element in enumerate(members):
                 node_ref = element.get("nd")
                 location = self.latLonToPoints(node_ref)
@@ -275,6 +291,12 @@ class Osm2Dict:
                                                 "points": location,
                                                 "color": "Red",
                                                 "height": DEFAULT_BUILDING_HEIGHT}
+                buildingHoles = [hole for hole in holes
+                                 if len(members) == 1 or
+                                 pointsInPolygon(hole[:2, 0],
+                                                 location[:2, :].T)[0]]
+                if buildingHoles:
+                    self.buildings[buildingName]["holes"] = buildingHoles
 
         amenity = [self.data[i]
                    for i in range(len(self.data))
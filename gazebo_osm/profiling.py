@@ -0,0 +1,138 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Profiler() class
+#             Per stage instrumentation of a gz_osm run: wall and cpu time
+#             (own and of finished worker processes), peak traced python
+#             memory, peak resident set size and feature counts, written as
+#             JSON, with an optional cProfile .prof file per stage
+##############################################################################
+
+import cProfile
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+from . import __version__
+
+
+def maxRss():
+    '''Peak resident set size of the process in bytes, or None'''
+    if not HAS_RESOURCE:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def resetPeak():
+    '''Starts a new tracemalloc peak. Python 3.8 has no reset_peak(), so
+       the tracing is restarted there'''
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.stop()
+        tracemalloc.start()
+
+
+def featureCounts(features):
+    '''Number of features and of their points in a road, model or building
+       dictionary as returned by Osm2Dict.getMapDetails()'''
+    return dict(count=len(features),
+                vertices=sum(int(feature['points'].shape[1])
+                             for feature in features.values()
+                             if len(feature['points'])))
+
+
+class Profiler:
+    '''Collects the metrics of named stages. Every stage prints its wall
+       time. With enabled set it also traces python allocations, which
+       slows the run down, and with statsPrefix every stage is run under
+       cProfile and dumped to statsPrefix + '_<stage>.prof' '''
+
+    def __init__(self, enabled=False, statsPrefix=None, verbose=True):
+        self.enabled = enabled
+        self.statsPrefix = statsPrefix
+        self.verbose = verbose
+        self.stages = []
+        self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''Times the body of the with statement as stage name. Yields a
+           dictionary the body fills with counts of what it processed'''
+        counts = dict()
+        if self.enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            resetPeak()
+        profile = cProfile.Profile() if self.statsPrefix else None
+        times = os.times()
+        wall = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield counts
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall = time.perf_counter() - wall
+            end = os.times()
+            metrics = dict(name=name, wall=wall,
+                           cpu=(end.user - times.user +
+                                end.system - times.system),
+                           childCpu=(end.children_user - times.children_user +
+                                     end.children_system -
+                                     times.children_system),
+                           maxRss=maxRss(),
+                           counts=counts)
+            if self.enabled:
+                metrics['peakTraced'] = tracemalloc.get_traced_memory()[1]
+            if profile is not None:
+                metrics['stats'] = '%s_%s.prof' % (self.statsPrefix, name)
+                profile.dump_stats(metrics['stats'])
+            self.stages.append(metrics)
+            if self.verbose:
+                print("Elapsed time is " + str(wall) + " seconds.")
+
+    def record(self, metrics):
+        '''Adds the metrics of a stage run elsewhere, see runStage()'''
+        self.stages.append(metrics)
+
+    def report(self):
+        '''The collected metrics as a JSON serializable dictionary'''
+        return dict(version=__version__,
+                    python=platform.python_version(),
+                    platform=platform.platform(),
+                    argv=sys.argv,
+                    wall=time.perf_counter() - self.started,
+                    maxRss=maxRss(),
+                    stages=self.stages)
+
+    def writeJson(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+        if self.enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def runStage(name, function, arguments, enabled=False, statsPrefix=None):
+    '''Calls function(counts, *arguments) as stage name of a new Profiler,
+       for stages run in worker processes. Returns the metrics of the stage,
+       to be passed to Profiler.record()'''
+    profiler = Profiler(enabled, statsPrefix)
+    with profiler.stage(name) as counts:
+        function(counts, *arguments)
+    if enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return profiler.stages[0]
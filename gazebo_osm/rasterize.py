@@ -0,0 +1,202 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: RasterMap() class, fillPolygons() and writePng()
+#             Matplotlib free map preview. Building footprints and dilated
+#             roads are filled straight into a numpy RGBA buffer by a
+#             vectorized even-odd scanline fill and written as PNG with the
+#             standard library only
+##############################################################################
+
+import struct
+import zlib
+
+import numpy as np
+
+from .meshExport import roadPolygons
+
+RGBACOLORS = dict(
+    Red=[1,  0,  0, 1],
+    Blue=[0, 0, 1, 1],
+    Green=[0,1,0,1],
+    RedBright=[0.87,0.26,0.07,1],
+    Purple=[1,0,1,1],
+    Orange=[1,0.5088,0.0468,1],
+    Yellow=[1,1,0,1],
+    GroundGray=[0.3,0.3,0.3,1]
+    )
+
+
+def scanlineSpans(rings, ids, height):
+    '''Even-odd spans of the rings on the pixel rows whose centers they
+       cross. rings is a list of (N, 2) closed or open rings in pixel
+       coordinates, ids the polygon each ring belongs to (holes share the
+       id of their outer ring). Returns the rows and the start and end x
+       of every span'''
+    starts = [np.asarray(r, dtype=float) for r in rings]
+    ends = [np.roll(r, -1, axis=0) for r in starts]
+    edgeIds = np.concatenate([np.full(len(r), i) for r, i in zip(starts, ids)])
+    p = np.concatenate(starts)
+    q = np.concatenate(ends)
+    lo = np.minimum(p[:, 1], q[:, 1])
+    hi = np.maximum(p[:, 1], q[:, 1])
+    # Rows r with r + 0.5 in [lo, hi), so that every vertex is counted once
+    first = np.clip(np.ceil(lo - 0.5), 0, height).astype(np.int64)
+    last = np.clip(np.ceil(hi - 0.5), 0, height).astype(np.int64)
+    counts = last - first
+    edge = np.repeat(np.arange(len(p)), counts)
+    rows = (np.arange(len(edge)) - np.repeat(np.cumsum(counts) - counts,
+                                              counts) + first[edge])
+    y = rows + 0.5
+    t = (y - p[edge, 1]) / (q[edge, 1] - p[edge, 1])
+    x = p[edge, 0] + t * (q[edge, 0] - p[edge, 0])
+    order = np.lexsort((x, rows, edgeIds[edge]))
+    rows, x = rows[order], x[order]
+    # Every (polygon, row) holds an even number of crossings, paired in
+    # order into inside spans
+    return rows[0::2], x[0::2], x[1::2]
+
+
+def polygonMask(shape, polygons):
+    '''Union of the polygons on a (height, width) pixel grid, as the top
+       and left offsets of a boolean mask over their bounding box, or None
+       if they cover no pixel center. Every polygon is a list of rings in
+       pixel coordinates (x right, y down), the first the outer boundary and
+       the rest holes, filled with the even-odd rule'''
+    height, width = shape
+    rings, ids = [], []
+    for i, polygon in enumerate(polygons):
+        for ring in polygon:
+            if len(ring) >= 3:
+                rings.append(ring)
+                ids.append(i)
+    if not rings:
+        return None
+    rows, start, end = scanlineSpans(rings, ids, height)
+    # Pixel c is inside a span if its center c + 0.5 lies in [start, end)
+    start = np.clip(np.ceil(start - 0.5), 0, width).astype(np.int64)
+    end = np.clip(np.ceil(end - 0.5), 0, width).astype(np.int64)
+    keep = start < end
+    rows, start, end = rows[keep], start[keep], end[keep]
+    if not len(rows):
+        return None
+    # Difference array over the bounding box of the spans only; int16 is
+    # plenty for the number of polygons overlapping at one pixel
+    top, bottom = rows.min(), rows.max() + 1
+    left, right = start.min(), end.max()
+    coverage = np.zeros((bottom - top, right - left + 1), dtype=np.int16)
+    np.add.at(coverage, (rows - top, start - left), 1)
+    np.add.at(coverage, (rows - top, end - left), -1)
+    return top, left, np.cumsum(coverage[:, :-1], axis=1,
+                                dtype=np.int16) > 0
+
+
+def fillPolygons(shape, polygons):
+    '''Boolean mask of the given (height, width) shape covering the union
+       of the polygons, see polygonMask()'''
+    mask = np.zeros(shape, dtype=bool)
+    box = polygonMask(shape, polygons)
+    if box is not None:
+        top, left, inside = box
+        mask[top:top + inside.shape[0], left:left + inside.shape[1]] = inside
+    return mask
+
+
+def pngChunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data +
+            struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+
+def writePng(filename, image, palette=None):
+    '''Writes the (H, W) gray, (H, W, 3) RGB or (H, W, 4) RGBA uint8 or
+       uint16 image as a PNG file. With an (N, 4) uint8 RGBA palette the
+       (H, W) uint8 image holds palette indices'''
+    image = np.asarray(image)
+    if image.dtype not in (np.uint8, np.uint16):
+        raise ValueError("Unsupported PNG sample type %s" % image.dtype)
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    colorType = 3 if palette is not None else {1: 0, 3: 2, 4: 6}[channels]
+    height, width = image.shape[:2]
+    # PNG samples are big endian, every row starts with filter type 0
+    rows = image.astype(image.dtype.newbyteorder('>')).reshape(height, -1)
+    raw = np.zeros((height, rows.nbytes // height + 1), dtype=np.uint8)
+    raw[:, 1:] = rows.view(np.uint8).reshape(height, -1)
+    header = struct.pack('>IIBBBBB', width, height, image.dtype.itemsize * 8,
+                         colorType, 0, 0, 0)
+    with open(filename, 'wb') as png:
+        png.write(b'\x89PNG\r\n\x1a\n')
+        png.write(pngChunk(b'IHDR', header))
+        if palette is not None:
+            palette = np.asarray(palette, dtype=np.uint8)
+            png.write(pngChunk(b'PLTE', palette[:, :3].tobytes()))
+            png.write(pngChunk(b'tRNS', palette[:, 3].tobytes()))
+        png.write(pngChunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        png.write(pngChunk(b'IEND', b''))
+
+
+class RasterMap:
+    '''Drop in replacement of MPLBMap drawing into a numpy buffer at
+       pixelsPerMeter (3 by default, as MPLBMap at dpi 300)'''
+
+    def __init__(self, bbox, pixelsPerMeter=3.0):
+        self.bbox = bbox
+        self.scale = pixelsPerMeter
+        self.shape = (max(1, int(np.ceil((bbox[3] - bbox[1]) * self.scale))),
+                      max(1, int(np.ceil((bbox[2] - bbox[0]) * self.scale))))
+        #Polygons waiting to be drawn, one list per (kind, color) in the
+        #order they were first added
+        self.polygons = dict()
+
+    def toPixels(self, points):
+        '''Pixel coordinates of the (N, 2) points, row 0 at the top'''
+        return np.stack(((points[:, 0] - self.bbox[0]) * self.scale,
+                         (self.bbox[3] - points[:, 1]) * self.scale), axis=1)
+
+    def add_polygon(self, rings, color, kind='building'):
+        '''Queues the polygon given as a list of (N, 2) rings, outer first'''
+        self.polygons.setdefault((kind, color), []).append(
+            [self.toPixels(np.asarray(ring, dtype=float)) for ring in rings])
+
+    def add_road(self, road_name, width, road_points):
+        for polygon in roadPolygons(road_name, width, road_points):
+            self.add_polygon([polygon], 'GroundGray', 'road')
+
+    def add_roads(self, roadPointWidthMap):
+        for road_name, road_data in roadPointWidthMap.items():
+            self.add_road(road_name, road_data['width'], road_data['points'])
+
+    def add_buildings(self, buildingLocationMap):
+        for building_name, building in buildingLocationMap.items():
+            self.add_building(building['mean'],
+                              building['points'],
+                              building_name,
+                              building['color'],
+                              building['height'],
+                              building.get('holes', []))
+
+    def add_building(self, mean, pointList, building_name, color, height,
+                     holes=()):
+        self.add_polygon([pointList[:2, :].T] +
+                         [hole[:2, :].T for hole in holes], color)
+
+    def renderIndexed(self):
+        '''The (H, W) uint8 palette indices, later groups painted over
+           earlier ones on a white background, and the (N, 4) RGBA palette'''
+        palette = [[1, 1, 1, 1]]
+        index = np.zeros(self.shape, dtype=np.uint8)
+        for (kind, color), polygons in self.polygons.items():
+            box = polygonMask(self.shape, polygons)
+            if box is not None:
+                top, left, inside = box
+                index[top:top + inside.shape[0],
+                      left:left + inside.shape[1]][inside] = len(palette)
+            palette.append(RGBACOLORS[color])
+        return index, np.round(np.asarray(palette) * 255).astype(np.uint8)
+
+    def render(self):
+        '''The (H, W, 4) uint8 RGBA image'''
+        index, palette = self.renderIndexed()
+        return palette[index]
+
+    def save_image(self, image_file):
+        writePng(image_file, *self.renderIndexed())
@@ -0,0 +1,253 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: mergeRoads()
+#             Road network stage working on the shared node ids of the osm
+#             ways. Ways of the same highway type are stitched into long
+#             chains, continuing straight through junctions where they can.
+#             Roads ending at a junction are trimmed back to the edge of the
+#             road passing through it, and junctions without a through road
+#             get one patch polygon, so the dilated roads no longer overlap
+##############################################################################
+
+import numpy as np
+
+from .collisionShapes import convexHull
+
+#Largest deviation from straight, in radians, for a road to continue
+#through a junction
+MAX_TURN = np.pi / 4
+#Bounds of the trim distance at a patched junction, in widths of its
+#widest road
+MIN_TRIM = 0.5
+MAX_TRIM = 2.0
+
+
+def polylineLength(points):
+    '''Cumulative length along the polyline (3, N)'''
+    steps = np.linalg.norm(np.diff(points[:2, :], axis=1), axis=0)
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+def trimStart(points, distance):
+    '''Cuts distance meters off the start of the polyline (3, N)'''
+    length = polylineLength(points)
+    k = np.searchsorted(length, distance, side='right')
+    if k >= points.shape[1]:
+        return points[:, -1:]
+    t = (distance - length[k - 1]) / (length[k] - length[k - 1])
+    start = points[:, k - 1] + t * (points[:, k] - points[:, k - 1])
+    return np.hstack((start[:, None], points[:, k:]))
+
+
+def armDirection(points, atStart):
+    '''Angle of the polyline (3, N) leaving its start or end point,
+       or None if all of its points coincide'''
+    ordered = points if atStart else points[:, ::-1]
+    moved = np.flatnonzero(np.any(ordered[:2, 1:] != ordered[:2, :1], axis=0))
+    if not len(moved):
+        return None
+    direction = ordered[:2, moved[0] + 1] - ordered[:2, 0]
+    return np.arctan2(direction[1], direction[0])
+
+
+def splitWays(roadPointWidthMap, arms):
+    '''Splits the ways at their interior junction nodes.
+       Returns a list of (name, type, width, nodes, points) segments'''
+    segments = []
+    for name, road in roadPointWidthMap.items():
+        nodes = road['nodes']
+        cuts = [k for k in range(1, len(nodes) - 1) if arms[nodes[k]] >= 3]
+        bounds = [0] + cuts + [len(nodes) - 1]
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            segments.append((name, road['type'], road['width'],
+                             nodes[a:b + 1], road['points'][:, a:b + 1]))
+    return segments
+
+
+def linkEnds(segments):
+    '''Pairs up the segment ends meeting at every node: the two ends of a
+       plain node if they have the same type, and at junctions the straightest
+       pairs of the same type first, then the halves of a way passing
+       through. Returns the links between
+       (segment index, end) tuples and the ends meeting at every node'''
+    ends = dict()
+    for s, segment in enumerate(segments):
+        ends.setdefault(segment[3][0], []).append((s, 0))
+        ends.setdefault(segment[3][-1], []).append((s, 1))
+
+    link = dict()
+    for node, incident in ends.items():
+        angles = [armDirection(segments[s][4], e == 0) for s, e in incident]
+        candidates = []
+        for a in range(len(incident)):
+            for b in range(a + 1, len(incident)):
+                (s, e), (t, f) = incident[a], incident[b]
+                if (s == t or segments[s][1] != segments[t][1] or
+                        angles[a] is None or angles[b] is None):
+                    continue
+                # Opposite arms (angles pi apart) continue straight
+                turn = abs(np.mod(angles[a] - angles[b], 2 * np.pi) - np.pi)
+                # A way passing through keeps going if nothing straighter
+                # takes its ends
+                sameWay = (segments[s][0] == segments[t][0] and
+                           abs(s - t) == 1 and e != f)
+                if len(incident) == 2 or turn <= MAX_TURN:
+                    candidates.append((0, turn, a, b))
+                elif sameWay:
+                    candidates.append((1, turn, a, b))
+        used = set()
+        for rank, turn, a, b in sorted(candidates):
+            if a not in used and b not in used:
+                used.update((a, b))
+                link[incident[a]] = incident[b]
+                link[incident[b]] = incident[a]
+    return link, ends
+
+
+def chainSegments(segments, link):
+    '''Follows the links into chains of (segment index, reversed) tuples'''
+    chains = []
+    visited = set()
+    for first in range(len(segments)):
+        if first in visited:
+            continue
+        # Walk back to the head of the chain, or around a ring once
+        head, entry = first, 0
+        while (head, entry) in link:
+            previous, exit = link[(head, entry)]
+            if previous == first:
+                break
+            head, entry = previous, 1 - exit
+        chain = []
+        s, e = head, entry
+        while s not in visited:
+            visited.add(s)
+            chain.append((s, e == 1))
+            if (s, 1 - e) not in link:
+                break
+            s, e = link[(s, 1 - e)]
+        if len(chain) > 1 and (s, e) == (head, entry):
+            # A ring of ways; a closed chain would be drawn filled, so its
+            # last way is left as a chain of its own
+            chains.append(chain[:-1])
+            chain = chain[-1:]
+        chains.append(chain)
+    return chains
+
+
+def junctionTrims(segments, link, ends):
+    '''Trim distance of the unlinked segment ends at every junction, and
+       whether the junction needs a patch (no road passes through it)'''
+    trims = dict()
+    for node, incident in ends.items():
+        free = [(s, e) for s, e in incident if (s, e) not in link]
+        if len(incident) < 3 or not free:
+            continue
+        through = [segments[s][2] for s, e in incident if (s, e) in link]
+        if through:
+            trims[node] = (max(through) / 2, False)
+            continue
+        widest = max(segments[s][2] for s, e in incident)
+        angles = [armDirection(segments[s][4], e == 0) for s, e in incident]
+        angles = np.sort([a for a in angles if a is not None])
+        if not len(angles):
+            continue
+        gaps = np.diff(np.concatenate((angles, angles[:1] + 2 * np.pi)))
+        # Two roads at an angle g overlap up to w / 2 / tan(g / 2) from
+        # the junction node
+        with np.errstate(divide='ignore'):
+            needed = widest / 2 / np.tan(np.minimum(gaps, np.pi) / 2)
+        trims[node] = (float(np.clip(np.max(needed), MIN_TRIM * widest,
+                                     MAX_TRIM * widest)), True)
+    return trims
+
+
+def mergeRoads(roadPointWidthMap):
+    '''Returns a new road dictionary with the ways stitched into chains,
+       trimmed at the junctions they end on, and one closed patch road per
+       junction without a through road. Trimmed road ends get the node id
+       None. Roads without node ids and closed ways are passed through
+       unchanged'''
+    merged = dict()
+    ways = dict()
+    for name, road in roadPointWidthMap.items():
+        nodes = road.get('nodes')
+        if (not nodes or len(nodes) < 2 or nodes[0] == nodes[-1] or
+                len(nodes) != road['points'].shape[1]):
+            merged[name] = road
+        else:
+            ways[name] = road
+
+    # Arms of a node: one per way end, two per way passing through
+    arms = dict()
+    for road in ways.values():
+        nodes = road['nodes']
+        for k, node in enumerate(nodes):
+            arms[node] = arms.get(node, 0) + (1 if k in (0, len(nodes) - 1)
+                                              else 2)
+
+    segments = splitWays(ways, arms)
+    link, ends = linkEnds(segments)
+    trims = junctionTrims(segments, link, ends)
+
+    corners = dict()
+    # Heights of the trimmed road ends around every junction
+    heights = dict()
+    for chain in chainSegments(segments, link):
+        nodes = []
+        points = []
+        for s, backwards in chain:
+            step = -1 if backwards else 1
+            skip = 1 if nodes else 0
+            nodes.extend(segments[s][3][::step][skip:])
+            points.append(segments[s][4][:, ::step][:, skip:])
+        points = np.hstack(points)
+        name, kind, width = segments[chain[0][0]][:3]
+
+        length = polylineLength(points)[-1]
+        for atStart in (True, False):
+            node = nodes[0] if atStart else nodes[-1]
+            if node not in trims:
+                continue
+            # Never trim away more than 45% of the road from either end
+            distance = min(trims[node][0], 0.45 * length)
+            count = points.shape[1]
+            if atStart:
+                points = trimStart(points, distance)
+            else:
+                points = trimStart(points[:, ::-1], distance)[:, ::-1]
+            # The new end point lies between nodes
+            removed = count - points.shape[1] + 1
+            nodes = ([None] + nodes[removed:] if atStart
+                     else nodes[:len(nodes) - removed] + [None])
+            angle = armDirection(points, atStart)
+            if angle is None:
+                continue
+            end = points[:2, 0] if atStart else points[:2, -1]
+            normal = np.array([-np.sin(angle), np.cos(angle)]) * width / 2
+            corners.setdefault(node, []).extend([end + normal, end - normal])
+            if len(points) > 2:
+                heights.setdefault(node, []).append(
+                    points[2, 0] if atStart else points[2, -1])
+
+        while name in merged:
+            name += "_m"
+        merged[name] = {'points': points, 'width': width, 'type': kind,
+                        'nodes': nodes}
+
+    for node in sorted(corners, key=str):
+        if not trims[node][1]:
+            continue
+        # Rounded so that split_roads() sees no near duplicate corners
+        hull = convexHull(np.round(np.asarray(corners[node]), 2))
+        if len(hull) < 3:
+            continue
+        ring = np.vstack((hull, hull[:1])).T
+        # The patch lies flat at the lowest road end it joins
+        merged["junction_%s" % node] = {
+            'points': np.vstack((ring, np.full(ring.shape[1], min(
+                heights.get(node, [0.0]))))),
+            'width': max(segments[s][2] for s, e in ends[node]),
+            'type': 'junction'}
+    return merged
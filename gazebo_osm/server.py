@@ -0,0 +1,432 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: WorldServer() class
+#             Long running local HTTP service generating worlds on demand.
+#             A region is parsed and extracted once and its features kept
+#             in memory behind a GridIndex; POST /world {"bbox": [...]}
+#             crops them to the box and answers with the sdf file, or a zip
+#             archive of tiles with "tileSize". GET /metrics reports request
+#             counts and latencies as JSON. Requests are served concurrently
+#             by a thread pool, so a slow world does not block the others
+##############################################################################
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+from . import __version__
+from .dict2sdf import GetSDF, MERGEMODES, BUILDINGCOLLISIONS, ROADCOLLISIONS
+from .getOsmFile import downloadOsmFile, osmBounds, parseOsmFile
+from .modelResolver import ModelResolver, SOURCES, MISSING
+from .osm2dict import Osm2Dict
+from .roadGraph import mergeRoads
+from .spatialIndex import (cropFeatures, featureIndex, frameTransform,
+                           transformFeatures)
+from .tiling import writeTiles
+
+#Latencies kept per route for the percentiles of /metrics
+LATENCY_WINDOW = 1024
+#Largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    '''Invalid request, answered with status and the message'''
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+class Region:
+    '''Features of an osm file, extracted once around the south west corner
+       of its bounds and indexed for cropping. The features of a box inside
+       the region are mapped into the frame of a separate extraction around
+       the box's own south west corner by an affine fit, which leaves errors
+       well below a millimeter over a few km'''
+
+    def __init__(self, osmFile, box=None, cellSize=100.0):
+        start = time.perf_counter()
+        self.box = box or osmBounds(osmFile)
+        if self.box is None:
+            raise ValueError("%s has no bounds" % osmFile)
+        self.osmRoads = Osm2Dict(self.box[0], self.box[1],
+                                 parseOsmFile(osmFile))
+        (self.roads,
+         self.models,
+         self.buildings) = self.osmRoads.getMapDetails()
+        # Only the features are kept, not the parsed osm data
+        self.osmRoads.data = self.osmRoads.node = self.osmRoads.ways = None
+        self.cellSize = cellSize
+        self.bbox = self.pointBBox(self.box)
+        self.index = featureIndex(self.bbox, self.roads, self.models,
+                                  self.buildings, cellSize)
+        self.merged = None
+        self.lock = threading.Lock()
+        self.loadTime = time.perf_counter() - start
+
+    def pointBBox(self, box):
+        '''[minX, minY, maxX, maxY] of the lon/lat box in the region frame'''
+        points = self.osmRoads.getPoints(np.asarray(box).reshape(2, 2))
+        return list(np.min(points[:2], axis=1)) + \
+            list(np.max(points[:2], axis=1))
+
+    def mergedRoads(self):
+        '''Roads stitched by mergeRoads() and their index, built on the first
+           request that asks for them'''
+        with self.lock:
+            if self.merged is None:
+                roads = mergeRoads(self.roads)
+                self.merged = (roads, featureIndex(self.bbox, roads, {}, {},
+                                                   self.cellSize))
+        return self.merged
+
+    def contains(self, box):
+        return (self.box[0] <= box[0] < box[2] <= self.box[2] and
+                self.box[1] <= box[1] < box[3] <= self.box[3])
+
+    def features(self, box, flags='a', merge=False, clip=False):
+        '''Roads, models and buildings of the lon/lat box in the frame of its
+           south west corner, with its bbox in that frame. Without clip,
+           features overlapping the box are kept whole'''
+        bbox = self.pointBBox(box)
+        roads, roadIndex = self.mergedRoads() if merge else (self.roads,
+                                                             self.index)
+        if clip:
+            models, buildings = cropFeatures(
+                bbox, {}, self.models, self.buildings, self.cellSize,
+                self.index)[1:]
+            roads = cropFeatures(bbox, roads, {}, {}, self.cellSize,
+                                 roadIndex)[0]
+        else:
+            selected = set(self.index.query(bbox))
+            roadSelected = set(roadIndex.query(bbox))
+            roads = {name: road for name, road in roads.items()
+                     if ('road', name) in roadSelected}
+            models = {name: model for name, model in self.models.items()
+                      if ('model', name) in selected}
+            buildings = {name: building
+                         for name, building in self.buildings.items()
+                         if ('building', name) in selected}
+        if not ('a' in flags or 'r' in flags):
+            roads = dict()
+        if not ('a' in flags or 'm' in flags):
+            models = dict()
+        if not ('a' in flags or 'b' in flags):
+            buildings = dict()
+        local = Osm2Dict(box[0], box[1], [])
+        transform = frameTransform(self.osmRoads, local, box)[0]
+        return (transformFeatures(roads, transform),
+                transformFeatures(models, transform),
+                transformFeatures(buildings, transform),
+                local.getPointBBox(box))
+
+
+def parseWorldRequest(body):
+    '''Validated options of a POST /world body'''
+    try:
+        request = json.loads(body.decode('utf-8') or '{}')
+    except ValueError as e:
+        raise RequestError(400, "invalid JSON: %s" % e)
+    if not isinstance(request, dict):
+        raise RequestError(400, "the body must be a JSON object")
+    known = ('bbox', 'flags', 'clip', 'mergeRoads', 'merge', 'mergeCellSize',
+             'buildingCollision', 'roadCollision', 'tileSize')
+    unknown = set(request) - set(known)
+    if unknown:
+        raise RequestError(400, "unknown keys %s" % ', '.join(sorted(unknown)))
+    try:
+        box = [float(value) for value in request['bbox']]
+    except (KeyError, TypeError, ValueError):
+        raise RequestError(400, "bbox must be [MinLon, MinLat, MaxLon, " +
+                           "MaxLat]")
+    if len(box) != 4 or box[0] >= box[2] or box[1] >= box[3]:
+        raise RequestError(400, "bbox must be [MinLon, MinLat, MaxLon, " +
+                           "MaxLat]")
+    flags = request.get('flags', 'a')
+    if not isinstance(flags, (str, list)) or not flags or \
+            not set(flags) <= set('armb'):
+        raise RequestError(400, "flags must be made of a, r, m and b")
+    for key, valid in (('merge', MERGEMODES + (None,)),
+                       ('buildingCollision', BUILDINGCOLLISIONS),
+                       ('roadCollision', ROADCOLLISIONS)):
+        if key in request and request[key] not in valid:
+            raise RequestError(400, "%s must be one of %s" % (
+                key, ', '.join(v for v in valid if v)))
+    for key in ('tileSize', 'mergeCellSize'):
+        if key in request and not (isinstance(request[key], (int, float))
+                                   and request[key] > 0):
+            raise RequestError(400, "%s must be a positive number" % key)
+    return dict(box=box, flags=flags,
+                clip=bool(request.get('clip', False)),
+                mergeRoads=bool(request.get('mergeRoads', False)),
+                tileSize=request.get('tileSize'),
+                sdfOptions=dict(
+                    mergeMode=request.get('merge'),
+                    mergeCellSize=float(request.get('mergeCellSize', 200.0)),
+                    buildingCollision=request.get('buildingCollision',
+                                                  'full'),
+                    roadCollision=request.get('roadCollision', 'full')))
+
+
+class WorldServer:
+    '''Serves the worlds of a Region over HTTP. The handlers run on a pool
+       of threads; tiled worlds are built by jobs worker processes'''
+
+    def __init__(self, region, threads=4, jobs=1, cacheDirectory=None,
+                 modelResolver=None):
+        self.region = region
+        self.jobs = jobs
+        self.cacheDirectory = cacheDirectory
+        self.modelResolver = modelResolver
+        self.executor = concurrent.futures.ThreadPoolExecutor(threads)
+        self.started = time.time()
+        self.inFlight = 0
+        self.counts = collections.Counter()
+        self.errors = collections.Counter()
+        self.latencies = collections.defaultdict(
+            lambda: collections.deque(maxlen=LATENCY_WINDOW))
+        self.server = None
+
+    def world(self, body):
+        '''(content type, bytes) of the world requested by a POST body'''
+        request = parseWorldRequest(body)
+        box = request['box']
+        if not self.region.contains(box):
+            raise RequestError(400, "bbox %s is not inside the region %s" % (
+                box, self.region.box))
+        roads, models, buildings, bbox = self.region.features(
+            box, request['flags'], request['mergeRoads'], request['clip'])
+        options = dict(request['sdfOptions'],
+                       cacheDirectory=self.cacheDirectory,
+                       modelResolver=self.modelResolver)
+        if request['tileSize']:
+            directory = tempfile.mkdtemp()
+            try:
+                writeTiles(os.path.join(directory, 'world.sdf'),
+                           os.path.join(directory, 'tiles'), box[1], box[0],
+                           bbox, request['tileSize'], roads, models,
+                           buildings, self.jobs, options,
+                           tileUris='model')
+                archive = io.BytesIO()
+                with zipfile.ZipFile(archive, 'w',
+                                     zipfile.ZIP_DEFLATED) as z:
+                    for root, dirs, files in os.walk(directory):
+                        dirs.sort()
+                        for filename in sorted(files):
+                            path = os.path.join(root, filename)
+                            z.write(path, os.path.relpath(path, directory))
+            finally:
+                shutil.rmtree(directory)
+            return 'application/zip', archive.getvalue()
+        sdfFile = GetSDF(**options)
+        sdfFile.addSphericalCoords(box[1], box[0])
+        sdfFile.includeModel("sun")
+        sdfFile.addGroundPlane(bbox)
+        sdfFile.addFeatures(roads, models, buildings)
+        return 'application/xml', sdfFile.toString()
+
+    def metrics(self):
+        '''Request counts, errors and latency percentiles in seconds per
+           route, over the last LATENCY_WINDOW requests of each'''
+        routes = dict()
+        for route, count in self.counts.items():
+            latencies = np.array(self.latencies[route])
+            routes[route] = dict(count=count, errors=self.errors[route])
+            if len(latencies):
+                routes[route].update(
+                    mean=float(np.mean(latencies)),
+                    p50=float(np.percentile(latencies, 50)),
+                    p90=float(np.percentile(latencies, 90)),
+                    p99=float(np.percentile(latencies, 99)),
+                    max=float(np.max(latencies)))
+        return dict(version=__version__,
+                    uptime=time.time() - self.started,
+                    inFlight=self.inFlight,
+                    region=dict(box=self.region.box,
+                                loadTime=self.region.loadTime,
+                                roads=len(self.region.roads),
+                                models=len(self.region.models),
+                                buildings=len(self.region.buildings)),
+                    routes=routes)
+
+    async def dispatch(self, method, path, body):
+        '''(status, content type, bytes) of a request'''
+        if path == '/world':
+            if method != 'POST':
+                raise RequestError(405, "use POST /world")
+            return (200,) + await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.world, body)
+        if path == '/metrics':
+            if method != 'GET':
+                raise RequestError(405, "use GET /metrics")
+            return (200, 'application/json',
+                    json.dumps(self.metrics(), indent=2,
+                               sort_keys=True).encode())
+        raise RequestError(404, "unknown path %s" % path)
+
+    async def handle(self, reader, writer):
+        '''Answers one HTTP/1.1 request and closes the connection'''
+        start = time.perf_counter()
+        route = None
+        self.inFlight += 1
+        try:
+            try:
+                requestLine = (await reader.readline()).decode('latin-1')
+                method, target = requestLine.split()[:2]
+                headers = dict()
+                while True:
+                    line = (await reader.readline()).decode('latin-1')
+                    if line in ('\r\n', '\n', ''):
+                        break
+                    key, _, value = line.partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length < 0:
+                    raise ValueError("negative content length")
+            except ValueError:
+                raise RequestError(400, "malformed request")
+            route = '%s %s' % (method, target.split('?')[0])
+            if length > MAX_BODY:
+                raise RequestError(413, "body larger than %d bytes" %
+                                   MAX_BODY)
+            try:
+                body = await reader.readexactly(length)
+            except asyncio.IncompleteReadError as e:
+                raise RequestError(400, "body shorter than %d bytes" %
+                                   length) from e
+            status, contentType, payload = await self.dispatch(
+                method, target.split('?')[0], body)
+        except RequestError as e:
+            status, contentType = e.status, 'application/json'
+            payload = json.dumps(dict(error=str(e))).encode()
+        except Exception as e:
+            status, contentType = 500, 'application/json'
+            payload = json.dumps(dict(error="%s: %s" % (
+                type(e).__name__, e))).encode()
+        finally:
+            self.inFlight -= 1
+        elapsed = time.perf_counter() - start
+        if route is not None:
+            self.counts[route] += 1
+            self.latencies[route].append(elapsed)
+            if status != 200:
+                self.errors[route] += 1
+        try:
+            writer.write(('HTTP/1.1 %d %s\r\nContent-Type: %s\r\n'
+                          'Content-Length: %d\r\nX-Elapsed: %.6f\r\n'
+                          'Connection: close\r\n\r\n' % (
+                              status, REASONS[status], contentType,
+                              len(payload), elapsed)).encode('latin-1'))
+            writer.write(payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        '''Starts listening. Returns the port, useful with port 0'''
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serveForever(self, host='127.0.0.1', port=8080):
+        port = await self.start(host, port)
+        print("Serving %d roads, %d models and %d buildings on http://%s:%d" %
+              (len(self.region.roads), len(self.region.models),
+               len(self.region.buildings), host, port))
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(wait=False)
+
+
+def main(argv=None):
+    '''gz_osm_server command line. Returns the exit status'''
+    parser = argparse.ArgumentParser(
+        description='Serves gazebo worlds of boxes inside a region')
+    parser.add_argument('-O', '--inputOsmFile',
+                        help='Osm file of the region', type=str, default='')
+    parser.add_argument('-B', '--boundingbox',
+                        help=('Bounding box of the region to download, ' +
+                              'MinLon MinLat MaxLon MaxLat'),
+                        nargs=4, type=float, default=None)
+    parser.add_argument('-o', '--osmFile',
+                        help='File the downloaded region is stored in',
+                        type=str, default='region.osm')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=8080)
+    parser.add_argument('--threads',
+                        help='Requests handled at the same time',
+                        type=int, default=4)
+    parser.add_argument('-j', '--jobs',
+                        help='Worker processes building the tiles of a world',
+                        type=int, default=1)
+    parser.add_argument('--cacheDir',
+                        help='Directory of the serialized fragment cache',
+                        type=str, default=None)
+    parser.add_argument('--modelSource',
+                        help=('Uri of the included models: Gazebo Fuel, or ' +
+                              'local models by path or model:// uri'),
+                        choices=SOURCES, default='fuel')
+    parser.add_argument('--modelPath',
+                        help='Model directories searched first',
+                        nargs='+', default=None)
+    parser.add_argument('--missingModels',
+                        help=('Models not found locally: include (fetched ' +
+                              'online), skip (default) or error'),
+                        choices=MISSING, default=None)
+    args = parser.parse_args(argv)
+    if bool(args.inputOsmFile) == bool(args.boundingbox):
+        parser.error("give either --inputOsmFile or --boundingbox")
+
+    osmFile = args.inputOsmFile
+    if not osmFile:
+        print("Downloading the osm data ... ")
+        downloadOsmFile(args.boundingbox, args.osmFile)
+        osmFile = args.osmFile
+    print("Loading the region ... ")
+    region = Region(osmFile, args.boundingbox)
+    print("Loaded in %.2f seconds" % region.loadTime)
+    modelResolver = ModelResolver(args.modelSource, args.modelPath,
+                                  args.missingModels)
+    try:
+        missing = modelResolver.check(['sun'] + [
+            model['mainModel'] for model in region.models.values()])
+    except LookupError as e:
+        print("Error: %s" % e)
+        return 1
+    if missing:
+        print("Warning: models not found locally: %s" % ', '.join(missing))
+    server = WorldServer(region, args.threads, args.jobs, args.cacheDir,
+                         modelResolver)
+    try:
+        asyncio.run(server.serveForever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,322 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: GridIndex() class and bounding box clipping
+#             Uniform grid spatial index over feature bounding boxes, and
+#             culling/clipping of the extracted roads, buildings and models
+#             to the requested bounding box, their selection as in an osm
+#             download of a box, and their affine mapping between the frames
+#             of two origins
+##############################################################################
+
+import numpy as np
+
+
+def pointsBBox(points):
+    '''Bounding box [minX, minY, maxX, maxY] of a (2+, N) point array'''
+    return [np.min(points[0, :]), np.min(points[1, :]),
+            np.max(points[0, :]), np.max(points[1, :])]
+
+
+def bboxInside(inner, outer):
+    '''True if the bounding box inner lies completely inside outer'''
+    return (inner[0] >= outer[0] and inner[1] >= outer[1] and
+            inner[2] <= outer[2] and inner[3] <= outer[3])
+
+
+def pointsInPolygon(points, ring):
+    '''Even-odd test of the points (M, 2) against the polygon ring (N, 2).
+       Returns a boolean array of length M'''
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    ring = np.asarray(ring, dtype=float)
+    start = ring[:, None, :]
+    end = np.roll(ring, -1, axis=0)[:, None, :]
+    px, py = points[None, :, 0], points[None, :, 1]
+    straddles = (start[..., 1] > py) != (end[..., 1] > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossX = (start[..., 0] + (py - start[..., 1]) *
+                  (end[..., 0] - start[..., 0]) /
+                  (end[..., 1] - start[..., 1]))
+    crossings = np.sum(straddles & (px < crossX), axis=0)
+    return crossings % 2 == 1
+
+
+class GridIndex:
+    '''Uniform grid over the bounding boxes of named features.
+       Feature boxes extending beyond the grid are clamped to the
+       border cells, so the grid only needs to cover the area of interest'''
+
+    def __init__(self, bbox, cellSize=100.0):
+        self.bbox = bbox
+        self.cellSize = float(cellSize)
+        self.nx = max(1, int(np.ceil((bbox[2] - bbox[0]) / self.cellSize)))
+        self.ny = max(1, int(np.ceil((bbox[3] - bbox[1]) / self.cellSize)))
+        self.cells = dict()
+        self.names = []
+        self.boxList = []
+        self.boxes = np.zeros((0, 4))
+
+    def cellRange(self, box):
+        '''Clamped (i0, j0, i1, j1) cell range covered by box'''
+        i0, i1 = np.clip(np.floor((np.array([box[0], box[2]]) -
+                                   self.bbox[0]) / self.cellSize),
+                         0, self.nx - 1).astype(int)
+        j0, j1 = np.clip(np.floor((np.array([box[1], box[3]]) -
+                                   self.bbox[1]) / self.cellSize),
+                         0, self.ny - 1).astype(int)
+        return i0, j0, i1, j1
+
+    def insert(self, name, box):
+        '''Add the feature name with bounding box [minX, minY, maxX, maxY]'''
+        idx = len(self.names)
+        self.names.append(name)
+        self.boxList.append(box)
+        i0, j0, i1, j1 = self.cellRange(box)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self.cells.setdefault((i, j), []).append(idx)
+
+    def queryIndices(self, box):
+        '''Indices of the features whose bounding box intersects box,
+           in insertion order'''
+        if len(self.boxList) != len(self.boxes):
+            self.boxes = np.asarray(self.boxList, dtype=float).reshape(-1, 4)
+        i0, j0, i1, j1 = self.cellRange(box)
+        candidates = [self.cells.get((i, j), [])
+                      for i in range(i0, i1 + 1)
+                      for j in range(j0, j1 + 1)]
+        if not candidates:
+            return np.zeros(0, dtype=int)
+        candidates = np.unique(np.concatenate(
+            [np.asarray(c, dtype=int) for c in candidates]))
+        cboxes = self.boxes[candidates]
+        hit = ((cboxes[:, 0] <= box[2]) & (cboxes[:, 2] >= box[0]) &
+               (cboxes[:, 1] <= box[3]) & (cboxes[:, 3] >= box[1]))
+        return candidates[hit]
+
+    def query(self, box):
+        '''Names of the features whose bounding box intersects box'''
+        return [self.names[i] for i in self.queryIndices(box)]
+
+
+def clipPolygon(points, bbox):
+    '''Sutherland-Hodgman clipping of the polygon ring points (N, 2) against
+       bbox. Each clip edge is applied to all vertices at once. Further
+       columns, such as z, are interpolated along the cut edges.
+       Returns the clipped ring (M, 2), without a repeated closing point'''
+    poly = np.asarray(points, dtype=float)
+    if len(poly) > 1 and np.all(poly[0] == poly[-1]):
+        poly = poly[:-1]
+    # (axis, sign, boundary): inside if sign * (p[axis] - boundary) >= 0
+    for axis, sign, bound in ((0, 1, bbox[0]), (0, -1, bbox[2]),
+                              (1, 1, bbox[1]), (1, -1, bbox[3])):
+        if not len(poly):
+            break
+        prev = np.roll(poly, 1, axis=0)
+        dist = sign * (poly[:, axis] - bound)
+        prevDist = sign * (prev[:, axis] - bound)
+        inside = dist >= 0
+        crossing = inside != (prevDist >= 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(crossing, prevDist / (prevDist - dist), 0)
+        intersection = prev + t[:, None] * (poly - prev)
+        # For every vertex emit [intersection, vertex] as selected by mask
+        candidates = np.stack((intersection, poly), axis=1).reshape(
+            -1, poly.shape[1])
+        mask = np.stack((crossing, inside), axis=1).reshape(-1)
+        poly = candidates[mask]
+    return poly
+
+
+def clipPolyline(points, bbox):
+    '''Liang-Barsky clipping of the open polyline points (N, 2) against
+       bbox, all segments at once. Further columns, such as z, are
+       interpolated along the cut segments. Returns the list of (M, 2)
+       pieces that lie inside bbox'''
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2:
+        return []
+    start = points[:-1]
+    delta = points[1:] - start
+    t0 = np.zeros(len(start))
+    t1 = np.ones(len(start))
+    visible = np.ones(len(start), dtype=bool)
+    for p, q in ((-delta[:, 0], start[:, 0] - bbox[0]),
+                 (delta[:, 0], bbox[2] - start[:, 0]),
+                 (-delta[:, 1], start[:, 1] - bbox[1]),
+                 (delta[:, 1], bbox[3] - start[:, 1])):
+        parallel = p == 0
+        visible &= ~(parallel & (q < 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = q / p
+        t0 = np.where(~parallel & (p < 0), np.maximum(t0, r), t0)
+        t1 = np.where(~parallel & (p > 0), np.minimum(t1, r), t1)
+    visible &= t1 - t0 > 1e-9
+    if not np.any(visible):
+        return []
+    segStart = start + t0[:, None] * delta
+    segEnd = start + t1[:, None] * delta
+    # A new piece starts wherever the previous segment was cut or hidden
+    prevVisible = np.concatenate(([False], visible[:-1]))
+    prevEnds = np.concatenate(([False], t1[:-1] >= 1))
+    startsPiece = visible & ~(prevVisible & prevEnds & (t0 <= 0))
+    pieceId = np.cumsum(startsPiece)[visible]
+    segStart, segEnd = segStart[visible], segEnd[visible]
+    pieces = []
+    for pid in np.unique(pieceId):
+        sel = pieceId == pid
+        pieces.append(np.vstack((segStart[sel][:1], segEnd[sel])))
+    return pieces
+
+
+def toXYZ(points):
+    '''Converts a (M, 2) or (M, 3) array into the (3, M) layout used by
+       Osm2Dict, with z = 0 when there is no z column'''
+    if points.shape[1] == 3:
+        return points.T
+    return np.vstack((points.T, np.zeros((1, len(points)))))
+
+
+def featureIndex(bbox, roadPointWidthMap, modelPoseMap, buildingLocationMap,
+                 cellSize=100.0):
+    '''GridIndex over all extracted features. Names are (kind, name) pairs
+       with kind one of "road", "building" or "model"'''
+    index = GridIndex(bbox, cellSize)
+    for kind, features in (("model", modelPoseMap),
+                           ("building", buildingLocationMap),
+                           ("road", roadPointWidthMap)):
+        for name, feature in features.items():
+            points = feature['points']
+            if len(points) and np.size(points, 1):
+                index.insert((kind, name), pointsBBox(points))
+    return index
+
+
+def cropFeatures(bbox, roadPointWidthMap, modelPoseMap, buildingLocationMap,
+                 cellSize=100.0, index=None):
+    '''Culls the features lying completely outside bbox and clips the ones
+       crossing its edge. Returns new road, model and building dictionaries
+       in the same layout as Osm2Dict.getMapDetails()'''
+    if index is None:
+        index = featureIndex(bbox, roadPointWidthMap, modelPoseMap,
+                             buildingLocationMap, cellSize)
+    selected = set(index.query(bbox))
+    roads = dict()
+    models = dict()
+    buildings = dict()
+
+    for name, model in modelPoseMap.items():
+        if ("model", name) not in selected:
+            continue
+        points = model['points']
+        if (bbox[0] <= points[0, 0] <= bbox[2] and
+                bbox[1] <= points[1, 0] <= bbox[3]):
+            models[name] = model
+
+    for name, building in buildingLocationMap.items():
+        if ("building", name) not in selected:
+            continue
+        points = building['points']
+        if bboxInside(pointsBBox(points), bbox):
+            buildings[name] = building
+            continue
+        ring = clipPolygon(points[:3, :].T, bbox)
+        if len(ring) < 3:
+            continue
+        location = toXYZ(np.vstack((ring, ring[:1])))
+        buildings[name] = dict(building, points=location,
+                               mean=np.mean(location, axis=1)[:, None])
+        if "holes" in building:
+            holes = [clipPolygon(hole[:3, :].T, bbox)
+                     for hole in building["holes"]]
+            buildings[name]["holes"] = [toXYZ(np.vstack((h, h[:1])))
+                                        for h in holes if len(h) >= 3]
+
+    for name, road in roadPointWidthMap.items():
+        if ("road", name) not in selected:
+            continue
+        points = road['points']
+        if bboxInside(pointsBBox(points), bbox):
+            roads[name] = road
+            continue
+        if np.all(points[:2, 0] == points[:2, -1]):
+            ring = clipPolygon(points[:3, :].T, bbox)
+            pieces = [np.vstack((ring, ring[:1]))] if len(ring) >= 3 else []
+        else:
+            pieces = clipPolyline(points[:3, :].T, bbox)
+        for i, piece in enumerate(pieces):
+            pieceName = name if len(pieces) == 1 else name + "_c%d" % i
+            roads[pieceName] = dict(road, points=toXYZ(piece))
+            # The node ids no longer match the clipped points
+            roads[pieceName].pop('nodes', None)
+
+    return roads, models, buildings
+
+
+def touchingFeatures(bbox, roadPointWidthMap, modelPoseMap,
+                     buildingLocationMap, cellSize=100.0):
+    '''Keeps the features with a point inside bbox, whole, as the OSM API
+       returns the ways with a node inside a download box. Returns new
+       road, model and building dictionaries'''
+    index = featureIndex(bbox, roadPointWidthMap, modelPoseMap,
+                         buildingLocationMap, cellSize)
+    selected = set(index.query(bbox))
+    kept = []
+    for kind, features in (("road", roadPointWidthMap),
+                           ("model", modelPoseMap),
+                           ("building", buildingLocationMap)):
+        touching = dict()
+        for name, feature in features.items():
+            if (kind, name) not in selected:
+                continue
+            points = feature['points']
+            if np.any((bbox[0] <= points[0]) & (points[0] <= bbox[2]) &
+                      (bbox[1] <= points[1]) & (points[1] <= bbox[3])):
+                touching[name] = feature
+        kept.append(touching)
+    return kept
+
+
+def frameTransform(source, target, box, samples=3):
+    '''(3, 2) affine transform taking x, y in the frame of the Osm2Dict
+       source to the frame of the Osm2Dict target, fitted on a grid of
+       samples x samples points of the lon/lat box, and its largest error
+       in meters on a grid twice as fine'''
+    def grid(count):
+        return np.array([[lon, lat]
+                         for lon in np.linspace(box[0], box[2], count)
+                         for lat in np.linspace(box[1], box[3], count)])
+
+    def affine(lonLat):
+        points = source.getPoints(lonLat)[:2].T
+        return np.hstack((points, np.ones((len(points), 1))))
+    lonLat = grid(samples)
+    transform = np.linalg.lstsq(affine(lonLat),
+                                target.getPoints(lonLat)[:2].T,
+                                rcond=None)[0]
+    lonLat = grid(2 * samples - 1)
+    error = np.abs(affine(lonLat).dot(transform) -
+                   target.getPoints(lonLat)[:2].T).max()
+    return transform, error
+
+
+def transformFeatures(features, transform):
+    '''Copies of the road, model or building dictionaries with the x, y of
+       their points mapped by the (3, 2) affine transform'''
+    def apply(points):
+        if not isinstance(points, np.ndarray) or not points.size:
+            return points
+        xy = np.vstack((points[:2], np.ones(points.shape[1]))).T.dot(
+            transform)
+        return np.vstack((xy.T, points[2:]))
+
+    transformed = dict()
+    for name, feature in features.items():
+        feature = dict(feature)
+        for key in ('points', 'mean'):
+            if key in feature:
+                feature[key] = apply(feature[key])
+        if 'holes' in feature:
+            feature['holes'] = [apply(hole) for hole in feature['holes']]
+        transformed[name] = feature
+    return transformed
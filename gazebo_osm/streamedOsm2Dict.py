@@ -0,0 +1,140 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: StreamedOsm2Dict class
+#             Osm2Dict reading the .osm file one element at a time. Node
+#             coordinates and way node lists go to columns of a
+#             MemoryBudget instead of dictionaries, and only the elements
+#             that become models or buildings are kept whole, so the parsed
+#             document, the osmapi dictionaries and the node and way
+#             dictionaries never coexist. Gives the same features as
+#             Osm2Dict on the parsed file
+##############################################################################
+
+import numpy as np
+
+from .getOsmFile import streamOsmFile
+from .osm2dict import Osm2Dict
+
+
+def sortedIndex(ids):
+    '''Ids in increasing order and the permutation giving them, None when
+       they already are, as in osm files'''
+    if len(ids) < 2 or np.all(ids[1:] > ids[:-1]):
+        return ids, None
+    order = np.argsort(ids, kind='stable')
+    return ids[order], order
+
+
+class NodeTable:
+    '''Longitudes and latitudes of the nodes by id'''
+
+    def __init__(self, ids, lon, lat):
+        self.ids, self.order = sortedIndex(ids)
+        self.lon = lon
+        self.lat = lat
+
+    def index(self, refs):
+        '''Rows of the node ids refs, KeyError for missing ones'''
+        refs = np.asarray(refs, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.ids, refs),
+                          max(len(self.ids) - 1, 0))
+        if not len(self.ids) or np.any(self.ids[rows] != refs):
+            missing = refs[self.ids[rows] != refs] if len(self.ids) else refs
+            raise KeyError(int(missing[0]))
+        return rows if self.order is None else self.order[rows]
+
+    def lonLat(self, refs):
+        '''(N, 2) longitudes and latitudes of the node ids refs'''
+        if not len(refs):
+            return np.asarray([])
+        rows = self.index(refs)
+        return np.column_stack((self.lon[rows], self.lat[rows]))
+
+
+class WayTable:
+    '''Node lists of the ways by id, with the tags of the highways, as the
+       way dictionaries of Osm2Dict'''
+
+    def __init__(self, ids, starts, nodes, tags):
+        self.documentIds = ids
+        self.ids, self.order = sortedIndex(ids)
+        self.starts = starts
+        self.nodes = nodes
+        self.tags = tags
+
+    def row(self, way):
+        row = np.searchsorted(self.ids, way)
+        if row >= len(self.ids) or self.ids[row] != way:
+            raise KeyError(way)
+        return row if self.order is None else self.order[row]
+
+    def __contains__(self, way):
+        try:
+            self.row(way)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, way):
+        row = self.row(way)
+        end = (self.starts[row + 1] if row + 1 < len(self.starts)
+               else len(self.nodes))
+        return dict(id=way, nd=self.nodes[self.starts[row]:end].tolist(),
+                    tag=self.tags.get(way, {}))
+
+    def keys(self):
+        '''Way ids in document order'''
+        for start in range(0, len(self.documentIds), 1 << 16):
+            yield from self.documentIds[start:start + (1 << 16)].tolist()
+
+
+class StreamedOsm2Dict(Osm2Dict):
+
+    def __init__(self, lonStart, latStart, osmFile, budget, flags=['a'],
+                 elevation=None):
+        Osm2Dict.__init__(self, lonStart, latStart, [], flags, elevation)
+        self.counts = dict(node=0, way=0, relation=0)
+        self.columns = [budget.column(code)
+                        for code in ('q', 'd', 'd', 'q', 'q', 'q')]
+        nodeIds, lon, lat, wayIds, starts, nodes = self.columns
+        tags = dict()
+        size = 0
+        for element in streamOsmFile(osmFile):
+            kind = element['type']
+            data = element['data']
+            self.counts[kind] += 1
+            if kind == 'node':
+                nodeIds.append(data['id'])
+                lon.append(data['lon'])
+                lat.append(data['lat'])
+            elif kind == 'way':
+                wayIds.append(data['id'])
+                starts.append(size)
+                nodes.extend(data['nd'])
+                size += len(data['nd'])
+                if 'highway' in data['tag']:
+                    tags[data['id']] = data['tag']
+            if self.isFeature(kind, data['tag']):
+                self.data.append(element)
+        self.node = NodeTable(nodeIds.array(), lon.array(), lat.array())
+        self.ways = WayTable(wayIds.array(), starts.array(), nodes.array(),
+                             tags)
+
+    def isFeature(self, kind, tag):
+        '''Whether getModelDetails() or getBuildingDetails() use the element'''
+        return (any(value in self.addModel for value in tag.values()) or
+                ('building' in tag and kind in ('way', 'relation')) or
+                tag.get('amenity') in self.amenityList or
+                tag.get('landuse') in self.landuseList)
+
+    def latLonToPoints(self, node_ref):
+        '''Points in the gazebo frame of the nodes in the list, looked up
+           in the node table'''
+        return self.getPoints(self.node.lonLat(node_ref))
+
+    def drop(self):
+        '''Frees the osm data once the features are extracted'''
+        self.data = self.node = self.ways = None
+        for column in self.columns:
+            column.close()
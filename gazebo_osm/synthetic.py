@@ -0,0 +1,255 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: generateOsm()
+#             Deterministic synthetic city written as OSM XML, for scaling
+#             tests at sizes that cannot be downloaded. A grid of streets
+#             cycling through every highway type Osm2Dict simulates, with
+#             blocks of building footprints, courtyard multipolygons,
+#             amenities, grass and the point features Osm2Dict turns into
+#             models. The file is streamed block by block, so memory does
+#             not grow with the area. Only XML is written; PBF would need a
+#             protobuf dependency the package does not have
+##############################################################################
+
+import numpy as np
+
+from .osm2dict import Osm2Dict
+
+#Street spacing in meters
+BLOCK_SIZE = 100.0
+#Distance in meters between a street center line and what is built beside
+SETBACK = 12.0
+#Blocks of a street between the ends of its ways
+WAY_BLOCKS = 4
+#Longitude and latitude of the south west corner
+ORIGIN = (-68.6712560, 44.8978660)
+#Ids reserved per block for its nodes, ways and relations
+BLOCK_IDS = dict(node=100, way=20, relation=4)
+#Key under which Osm2Dict finds every model value
+MODEL_KEYS = {'fuel': 'amenity', 'fire hydrant': 'emergency'}
+#Block kinds and their probabilities
+BLOCK_KINDS = (('buildings', 0.55), ('courtyard', 0.1), ('amenity', 0.15),
+               ('grass', 0.1), ('park', 0.05), ('empty', 0.05))
+
+
+def rectangle(x0, y0, x1, y1):
+    '''Corners of a counter clockwise rectangle'''
+    return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+
+
+class SyntheticCity:
+    '''Square city of about area km^2 with streets every blockSize meters.
+       Every block is drawn from its own generator seeded with (seed, i, j),
+       so any block can be regenerated without the others'''
+
+    def __init__(self, area=1.0, seed=0, blockSize=BLOCK_SIZE,
+                 origin=ORIGIN):
+        self.seed = seed
+        self.blockSize = blockSize
+        self.origin = origin
+        self.blocks = max(1, int(round(np.sqrt(area) * 1000 / blockSize)))
+        # The feature classes Osm2Dict knows about
+        osm = Osm2Dict(origin[0], origin[1], [])
+        self.highways = sorted(osm.highwayType)
+        self.amenities = sorted(osm.amenityList)
+        self.models = sorted(osm.addModel)
+        self.R = osm.R
+        lines = self.blocks + 1
+        self.waysPerLine = -(-self.blocks // WAY_BLOCKS)
+        # Id ranges: intersections and streets first, then block by block
+        self.base = dict(node=lines * lines + 1,
+                         way=2 * lines * self.waysPerLine + 1,
+                         relation=1)
+        self.counts = dict(node=0, way=0, relation=0)
+
+    def bounds(self):
+        '''[minLon, minLat, maxLon, maxLat] of the city'''
+        side = self.blocks * self.blockSize
+        return list(self.toLonLat(0, 0)) + list(self.toLonLat(side, side))
+
+    def toLonLat(self, x, y):
+        '''lon, lat of the point x meters east and y meters north of the
+           origin'''
+        lat = self.origin[1] + np.degrees(y / self.R)
+        lon = self.origin[0] + np.degrees(
+            x / (self.R * np.cos(np.radians(self.origin[1]))))
+        return lon, lat
+
+    def intersectionId(self, i, j):
+        return 1 + i * (self.blocks + 1) + j
+
+    def intersections(self):
+        '''Yields the street crossings as (id, x, y, tags) nodes'''
+        for i in range(self.blocks + 1):
+            for j in range(self.blocks + 1):
+                tags = dict()
+                if (i + j) % 7 == 3:
+                    tags['highway'] = 'traffic_signals'
+                elif (i * j) % 11 == 5:
+                    tags['highway'] = 'stop'
+                yield (self.intersectionId(i, j), i * self.blockSize,
+                       j * self.blockSize, tags)
+
+    def streets(self):
+        '''Yields the street ways as (id, node ids, tags). Streets running
+           east-west and north-south take turns through the highway types'''
+        wayId = 1
+        for direction in range(2):
+            for line in range(self.blocks + 1):
+                highway = self.highways[(2 * line + direction) %
+                                        len(self.highways)]
+                for start in range(0, self.blocks, WAY_BLOCKS):
+                    stops = range(start, min(start + WAY_BLOCKS,
+                                             self.blocks) + 1)
+                    nodes = [self.intersectionId(k, line) if direction == 0
+                             else self.intersectionId(line, k)
+                             for k in stops]
+                    tags = dict(highway=highway,
+                                name='%s %d' % (('Street', 'Avenue')
+                                                [direction], line))
+                    yield wayId, nodes, tags
+                    wayId += 1
+
+    def block(self, i, j):
+        '''Nodes (id, x, y, tags), ways (id, node ids, tags) and relations
+           (id, members, tags) of block (i, j), members being
+           (type, ref, role) tuples'''
+        rng = np.random.default_rng([self.seed, i, j])
+        index = i * self.blocks + j
+        ids = {kind: self.base[kind] + index * count
+               for kind, count in BLOCK_IDS.items()}
+        nodes, ways, relations = [], [], []
+
+        def addWay(corners, tags):
+            ring = []
+            for x, y in corners:
+                ring.append(ids['node'] + len(nodes))
+                nodes.append((ring[-1], x, y, dict()))
+            ways.append((ids['way'] + len(ways), ring + ring[:1], tags))
+            return ways[-1][0]
+
+        x0 = i * self.blockSize + SETBACK
+        y0 = j * self.blockSize + SETBACK
+        inner = self.blockSize - 2 * SETBACK
+        kinds, weights = zip(*BLOCK_KINDS)
+        kind = kinds[rng.choice(len(kinds), p=weights)]
+        if kind == 'buildings':
+            lot = inner / 2
+            for a in range(2):
+                for b in range(2):
+                    if rng.random() > 0.8:
+                        continue
+                    w, h = rng.uniform(0.4, 0.9, 2) * lot
+                    x = x0 + a * lot + rng.uniform(0, lot - w)
+                    y = y0 + b * lot + rng.uniform(0, lot - h)
+                    tags = dict(building=('yes', 'residential')
+                                [int(rng.integers(2))])
+                    if rng.random() < 0.3:
+                        tags['name'] = 'House %d-%d-%d' % (i, j, 2 * a + b)
+                    addWay(rectangle(x, y, x + w, y + h), tags)
+        elif kind == 'courtyard':
+            margin = rng.uniform(0.25, 0.35) * inner
+            outer = addWay(rectangle(x0, y0, x0 + inner, y0 + inner), dict())
+            hole = addWay(rectangle(x0 + margin, y0 + margin,
+                                    x0 + inner - margin,
+                                    y0 + inner - margin), dict())
+            relations.append((ids['relation'],
+                              [('way', outer, 'outer'),
+                               ('way', hole, 'inner')],
+                              dict(type='multipolygon', building='yes',
+                                   name='Hall %d-%d' % (i, j))))
+        elif kind == 'amenity':
+            amenity = self.amenities[index % len(self.amenities)]
+            size = rng.uniform(0.5, 1.0) * inner
+            addWay(rectangle(x0, y0, x0 + size, y0 + size),
+                   dict(amenity=amenity, name='%s %d-%d' % (amenity, i, j)))
+        elif kind == 'grass':
+            addWay(rectangle(x0, y0, x0 + inner, y0 + inner),
+                   dict(landuse='grass'))
+        elif kind == 'park':
+            half = inner / 2
+            west = addWay(rectangle(x0, y0, x0 + half - 1, y0 + inner),
+                          dict())
+            east = addWay(rectangle(x0 + half + 1, y0, x0 + inner,
+                                    y0 + inner), dict())
+            relations.append((ids['relation'],
+                              [('way', west, 'outer'),
+                               ('way', east, 'outer')],
+                              dict(type='multipolygon', landuse='grass',
+                                   name='Park %d-%d' % (i, j))))
+        if rng.random() < 0.4:
+            model = self.models[int(rng.integers(len(self.models)))]
+            nodes.append((ids['node'] + len(nodes), x0 - SETBACK / 2,
+                          y0 - SETBACK / 2,
+                          {MODEL_KEYS.get(model, 'highway'): model}))
+        return nodes, ways, relations
+
+    def blockIndices(self):
+        for i in range(self.blocks):
+            for j in range(self.blocks):
+                yield i, j
+
+    def write(self, osm):
+        '''Writes the city to the text file osm: all nodes, then all ways,
+           then all relations, regenerating the blocks for every pass'''
+        osm.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<osm version="0.6" generator="gazebo_osm synthetic">\n')
+        osm.write(' <bounds minlon="%.7f" minlat="%.7f" maxlon="%.7f" '
+                  'maxlat="%.7f"/>\n' % tuple(self.bounds()))
+        self.writeNodes(osm, self.intersections())
+        for i, j in self.blockIndices():
+            self.writeNodes(osm, self.block(i, j)[0])
+        self.writeWays(osm, self.streets())
+        for i, j in self.blockIndices():
+            self.writeWays(osm, self.block(i, j)[1])
+        for i, j in self.blockIndices():
+            self.writeRelations(osm, self.block(i, j)[2])
+        osm.write('</osm>\n')
+
+    def writeNodes(self, osm, nodes):
+        for nodeId, x, y, tags in nodes:
+            lon, lat = self.toLonLat(x, y)
+            attributes = ('id="%d" visible="true" version="1" '
+                          'lat="%.7f" lon="%.7f"' % (nodeId, lat, lon))
+            if tags:
+                osm.write(' <node %s>\n%s </node>\n' % (attributes,
+                                                        tagLines(tags)))
+            else:
+                osm.write(' <node %s/>\n' % attributes)
+            self.counts['node'] += 1
+
+    def writeWays(self, osm, ways):
+        for wayId, nodes, tags in ways:
+            osm.write(' <way id="%d" visible="true" version="1">\n%s%s'
+                      ' </way>\n' % (wayId,
+                                     ''.join('  <nd ref="%d"/>\n' % node
+                                             for node in nodes),
+                                     tagLines(tags)))
+            self.counts['way'] += 1
+
+    def writeRelations(self, osm, relations):
+        for relationId, members, tags in relations:
+            osm.write(' <relation id="%d" visible="true" version="1">\n%s%s'
+                      ' </relation>\n' % (
+                          relationId,
+                          ''.join('  <member type="%s" ref="%d" role="%s"/>\n'
+                                  % member for member in members),
+                          tagLines(tags)))
+            self.counts['relation'] += 1
+
+
+def tagLines(tags):
+    return ''.join('  <tag k="%s" v="%s"/>\n' % item
+                   for item in sorted(tags.items()))
+
+
+def generateOsm(filename, area=1.0, seed=0, blockSize=BLOCK_SIZE,
+                origin=ORIGIN):
+    '''Writes a synthetic city of about area km^2 as the OSM XML file
+       filename. The same arguments always give the same file. Returns the
+       number of nodes, ways and relations written'''
+    city = SyntheticCity(area, seed, blockSize, origin)
+    with open(filename, 'w') as osm:
+        city.write(osm)
+    return city.counts
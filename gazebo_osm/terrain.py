@@ -0,0 +1,316 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: DEM and Terrain classes
+#             Elevation rasters in longitude and latitude read from SRTM
+#             .hgt tiles, uncompressed GeoTIFFs and ESRI ASCII grids. The
+#             binary formats are memory mapped and the ASCII grids indexed
+#             by line, so sampling only reads the window of rows and columns
+#             around the points. Bilinear sampling is vectorized over all
+#             points; the Terrain of a world gives the heights of its nodes
+#             and the 16 bit heightmap that replaces the ground plane
+##############################################################################
+
+import os
+import re
+import struct
+
+import numpy as np
+
+from .rasterize import writePng
+
+#Largest heightmap, in pixels per side
+MAX_HEIGHTMAP = 4097
+#Sample types of the TIFF SampleFormat (1 unsigned, 2 signed, 3 float) and
+#BitsPerSample tags
+TIFF_TYPES = {(1, 8): 'u1', (1, 16): 'u2', (1, 32): 'u4',
+              (2, 8): 'i1', (2, 16): 'i2', (2, 32): 'i4',
+              (3, 32): 'f4', (3, 64): 'f8'}
+#struct formats and sizes of the TIFF field types
+TIFF_FIELDS = {1: ('B', 1), 2: ('c', 1), 3: ('H', 2), 4: ('I', 4),
+               6: ('b', 1), 7: ('B', 1), 8: ('h', 2), 9: ('i', 4),
+               11: ('f', 4), 12: ('d', 8)}
+
+
+class DEM:
+    '''Elevation raster with sample [0, 0] at lon0, lat0, its north west
+       corner, and rows going south by dlat and columns east by dlon
+       degrees. data is anything sliceable as data[rows, columns], usually
+       a numpy memmap. Samples equal to nodata are missing'''
+
+    def __init__(self, data, lon0, lat0, dlon, dlat, nodata=None):
+        self.data = data
+        self.shape = data.shape
+        self.lon0 = lon0
+        self.lat0 = lat0
+        self.dlon = dlon
+        self.dlat = dlat
+        self.nodata = nodata
+
+    def bounds(self):
+        '''[minLon, minLat, maxLon, maxLat] of the sample centers'''
+        return [self.lon0, self.lat0 - (self.shape[0] - 1) * self.dlat,
+                self.lon0 + (self.shape[1] - 1) * self.dlon, self.lat0]
+
+    def sample(self, lon, lat):
+        '''Bilinear elevations at the lon, lat arrays, NaN outside the
+           raster. Missing samples are left out of the interpolation'''
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        col = (lon - self.lon0) / self.dlon
+        row = (self.lat0 - lat) / self.dlat
+        heights = np.full(np.broadcast(col, row).shape, np.nan)
+        inside = ((col >= 0) & (col <= self.shape[1] - 1) &
+                  (row >= 0) & (row <= self.shape[0] - 1))
+        if not inside.any():
+            return heights
+        row = row[inside]
+        col = col[inside]
+        # Only the window around the points is read
+        r0 = int(np.floor(row.min()))
+        c0 = int(np.floor(col.min()))
+        r1 = min(int(np.floor(row.max())) + 2, self.shape[0])
+        c1 = min(int(np.floor(col.max())) + 2, self.shape[1])
+        window = np.array(self.data[r0:r1, c0:c1], dtype=float)
+        if self.nodata is not None:
+            window[window == self.nodata] = np.nan
+        row -= r0
+        col -= c0
+        i = np.clip(np.floor(row).astype(int), 0, max(window.shape[0] - 2, 0))
+        j = np.clip(np.floor(col).astype(int), 0, max(window.shape[1] - 2, 0))
+        fi = np.clip(row - i, 0, 1)
+        fj = np.clip(col - j, 0, 1)
+        i1 = np.minimum(i + 1, window.shape[0] - 1)
+        j1 = np.minimum(j + 1, window.shape[1] - 1)
+        total = np.zeros(len(row))
+        weights = np.zeros(len(row))
+        for values, weight in ((window[i, j], (1 - fi) * (1 - fj)),
+                               (window[i, j1], (1 - fi) * fj),
+                               (window[i1, j], fi * (1 - fj)),
+                               (window[i1, j1], fi * fj)):
+            valid = ~np.isnan(values)
+            total[valid] += values[valid] * weight[valid]
+            weights[valid] += weight[valid]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            heights[inside] = np.where(weights > 0, total / weights, np.nan)
+        return heights
+
+
+def readHgt(filename):
+    '''DEM of an SRTM .hgt tile, named after its south west corner like
+       N44W069.hgt: 1201 or 3601 big endian int16 samples per side'''
+    match = re.match(r'([NS])(\d+)([EW])(\d+)',
+                     os.path.basename(filename).upper())
+    if match is None:
+        raise ValueError("%s is not named like N44W069.hgt" % filename)
+    lat = int(match.group(2)) * (1 if match.group(1) == 'N' else -1)
+    lon = int(match.group(4)) * (1 if match.group(3) == 'E' else -1)
+    side = int(round(np.sqrt(os.path.getsize(filename) / 2)))
+    if side * side * 2 != os.path.getsize(filename):
+        raise ValueError("%s is not a square .hgt tile" % filename)
+    data = np.memmap(filename, dtype='>i2', mode='r', shape=(side, side))
+    return DEM(data, lon, lat + 1, 1.0 / (side - 1), 1.0 / (side - 1),
+               -32768)
+
+
+class AsciiRows:
+    '''Rows of an ESRI ASCII grid read on demand: the offset of every line
+       is found once, then only the sliced rows are parsed'''
+
+    def __init__(self, filename, start, shape):
+        self.filename = filename
+        self.shape = shape
+        self.offsets = []
+        with open(filename, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if line.strip():
+                    self.offsets.append(offset)
+                offset += len(line)
+        if len(self.offsets) < shape[0]:
+            raise ValueError("%s has %d of %d rows" % (
+                filename, len(self.offsets), shape[0]))
+
+    def __getitem__(self, index):
+        rows, cols = index
+        values = []
+        with open(self.filename, 'rb') as f:
+            for offset in self.offsets[rows]:
+                f.seek(offset)
+                values.append(np.array(f.readline().split()[cols],
+                                       dtype=float))
+        return np.array(values).reshape(-1, len(range(*cols.indices(
+            self.shape[1]))))
+
+
+def readAsciiGrid(filename):
+    '''DEM of an ESRI ASCII grid (.asc) in longitude and latitude'''
+    header = dict()
+    with open(filename, 'rb') as f:
+        while True:
+            start = f.tell()
+            line = f.readline()
+            fields = line.split()
+            if not fields or not re.match(rb'[a-zA-Z_]', fields[0]):
+                break
+            header[fields[0].decode().lower()] = float(fields[1])
+    try:
+        shape = (int(header['nrows']), int(header['ncols']))
+        size = header['cellsize']
+        if 'xllcenter' in header:
+            lon0 = header['xllcenter']
+            lat0 = header['yllcenter'] + (shape[0] - 1) * size
+        else:
+            lon0 = header['xllcorner'] + size / 2
+            lat0 = header['yllcorner'] + (shape[0] - 0.5) * size
+    except KeyError as e:
+        raise ValueError("%s misses the %s header" % (filename, e))
+    return DEM(AsciiRows(filename, start, shape), lon0, lat0, size, size,
+               header.get('nodata_value'))
+
+
+def tiffTags(f):
+    '''Byte order and {tag: values} of the first image of a TIFF file'''
+    order = {b'II': '<', b'MM': '>'}.get(f.read(2))
+    if order is None:
+        raise ValueError("not a TIFF file")
+    magic, offset = struct.unpack(order + 'HI', f.read(6))
+    if magic != 42:
+        raise ValueError("only classic TIFF files are supported, not BigTIFF")
+    f.seek(offset)
+    count, = struct.unpack(order + 'H', f.read(2))
+    entries = [struct.unpack(order + 'HHI4s', f.read(12))
+               for k in range(count)]
+    tags = dict()
+    for tag, kind, number, value in entries:
+        if kind not in TIFF_FIELDS:
+            continue
+        code, size = TIFF_FIELDS[kind]
+        if size * number > 4:
+            f.seek(struct.unpack(order + 'I', value)[0])
+            value = f.read(size * number)
+        values = struct.unpack(order + code * number, value[:size * number])
+        tags[tag] = (b''.join(values).decode('latin-1').rstrip('\0')
+                     if kind == 2 else values)
+    return order, tags
+
+
+def readGeoTiff(filename):
+    '''DEM of a single band, uncompressed and stripped GeoTIFF in longitude
+       and latitude, memory mapped when its strips are contiguous'''
+    with open(filename, 'rb') as f:
+        order, tags = tiffTags(f)
+    if tags.get(259, (1,))[0] != 1 or 322 in tags:
+        raise ValueError("%s: only uncompressed, stripped GeoTIFFs are "
+                         "supported, convert it with gdal_translate -co "
+                         "COMPRESS=NONE -co TILED=NO" % filename)
+    if tags.get(277, (1,))[0] != 1:
+        raise ValueError("%s has more than one band" % filename)
+    dtype = TIFF_TYPES.get((tags.get(339, (1,))[0], tags[258][0]))
+    if dtype is None:
+        raise ValueError("%s: unsupported sample type" % filename)
+    dtype = np.dtype(order + dtype)
+    shape = (tags[257][0], tags[256][0])
+    offsets, counts = tags[273], tags[279]
+    if any(offsets[k] + counts[k] != offsets[k + 1]
+           for k in range(len(offsets) - 1)):
+        raise ValueError("%s: the strips are not contiguous" % filename)
+    if 33550 not in tags or 33922 not in tags:
+        raise ValueError("%s has no GeoTIFF georeferencing" % filename)
+    keys = tags.get(34735, ())
+    geoKeys = {keys[k]: keys[k + 3] for k in range(4, len(keys), 4)
+               if keys[k + 1] == 0}
+    if geoKeys.get(1024, 2) != 2:
+        raise ValueError("%s is not in longitude and latitude" % filename)
+    scaleX, scaleY = tags[33550][:2]
+    i, j, k, x, y, z = tags[33922][:6]
+    lon0 = x - i * scaleX
+    lat0 = y + j * scaleY
+    # Pixel is area by default: the tie point is the pixel corner
+    if geoKeys.get(1025, 1) == 1:
+        lon0 += scaleX / 2
+        lat0 -= scaleY / 2
+    nodata = tags.get(42113)
+    data = np.memmap(filename, dtype=dtype, mode='r', offset=offsets[0],
+                     shape=shape)
+    return DEM(data, lon0, lat0, scaleX, scaleY,
+               float(nodata) if nodata else None)
+
+
+def openDem(filename):
+    '''DEM of a .hgt, .tif/.tiff or .asc file'''
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.hgt':
+        return readHgt(filename)
+    if extension in ('.tif', '.tiff'):
+        return readGeoTiff(filename)
+    if extension in ('.asc', '.grd'):
+        return readAsciiGrid(filename)
+    raise ValueError("%s: unknown DEM format, use .hgt, .tif or .asc" %
+                     filename)
+
+
+class Terrain:
+    '''Heights above datum from a list of DEMs, the first DEM covering a
+       point giving its elevation. Points no DEM covers are at the datum.
+       Called with lon, lat arrays it returns their heights, as expected by
+       the elevation argument of Osm2Dict'''
+
+    def __init__(self, dems, datum=0.0):
+        self.dems = dems
+        self.datum = datum
+
+    def elevation(self, lon, lat):
+        '''Elevations of the lon, lat arrays, NaN where no DEM covers them'''
+        heights = np.full(np.broadcast(np.asarray(lon),
+                                       np.asarray(lat)).shape, np.nan)
+        for dem in self.dems:
+            missing = np.isnan(heights)
+            if not missing.any():
+                break
+            heights[missing] = dem.sample(np.broadcast_to(lon, missing.shape)
+                                          [missing],
+                                          np.broadcast_to(lat, missing.shape)
+                                          [missing])
+        return heights
+
+    def __call__(self, lon, lat):
+        heights = self.elevation(lon, lat) - self.datum
+        return np.where(np.isnan(heights), 0.0, heights)
+
+    def heightmap(self, project, box, bbox, resolution):
+        '''Elevations on the square grid of 2^n + 1 samples per side that
+           covers bbox, the projection of the lon/lat box, at resolution
+           meters or finer. project maps (N, 2) lon, lat to (3, N) points.
+           Row 0 is the largest y and column 0 the smallest x, as in a
+           Gazebo heightmap image'''
+        extent = max(bbox[2] - bbox[0], bbox[3] - bbox[1])
+        side = 2
+        while side + 1 < MAX_HEIGHTMAP and side < extent / resolution:
+            side *= 2
+        side += 1
+        # The projection is close to affine over a world: fit it on a few
+        # points and invert it
+        lonLat = np.array([[lon, lat]
+                           for lon in np.linspace(box[0], box[2], 3)
+                           for lat in np.linspace(box[1], box[3], 3)])
+        xy = project(lonLat)[:2].T
+        transform = np.linalg.lstsq(np.hstack((xy, np.ones((9, 1)))),
+                                    lonLat, rcond=None)[0]
+        x, y = np.meshgrid(np.linspace(bbox[0], bbox[2], side),
+                           np.linspace(bbox[3], bbox[1], side))
+        grid = np.stack((x.ravel(), y.ravel(), np.ones(x.size)), axis=1)
+        lonLat = grid.dot(transform)
+        return self.elevation(lonLat[:, 0], lonLat[:, 1]).reshape(side, side)
+
+
+def writeHeightmap(filename, heights):
+    '''Writes the heights as a 16 bit gray PNG spanning their range. Missing
+       heights are at the bottom. Returns the lowest height and the range'''
+    low = np.nanmin(heights) if not np.all(np.isnan(heights)) else 0.0
+    span = (np.nanmax(heights) - low) if not np.all(np.isnan(heights)) \
+        else 0.0
+    scaled = np.nan_to_num((heights - low) / (span or 1.0) * 65535)
+    writePng(filename, np.round(scaled).astype(np.uint16))
+    return float(low), float(span)
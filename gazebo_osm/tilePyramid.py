@@ -0,0 +1,162 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: writeTilePyramid()
+#             XYZ (slippy map) PNG tiles of the generated world: the dilated
+#             roads and the building footprints as they end up in the sdf
+#             file, for web map viewers. Polygons are picked per tile from
+#             the feature grid index, tiles are rendered across worker
+#             processes and tiles without any geometry are not written
+##############################################################################
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .meshExport import roadPolygons
+from .rasterize import RGBACOLORS, polygonMask, writePng
+from .spatialIndex import GridIndex
+
+#Web mercator latitude limit of the tile pyramid, in degrees
+MAX_LATITUDE = 85.0511287798
+TILE_PIXELS = 256
+#Tiles per worker task
+TILE_CHUNK = 16
+
+
+def lonLatToTile(lon, lat, zoom):
+    '''Fractional XYZ tile coordinates (x, y) of lon, lat at zoom'''
+    n = 2.0 ** zoom
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    return ((np.asarray(lon) + 180.0) / 360.0 * n,
+            (1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n)
+
+
+def tileToLonLat(x, y, zoom):
+    '''lon, lat of the fractional XYZ tile coordinates (x, y) at zoom'''
+    n = 2.0 ** zoom
+    return (np.asarray(x) / n * 360.0 - 180.0,
+            np.degrees(np.arctan(np.sinh(
+                np.pi * (1 - 2 * np.asarray(y) / n)))))
+
+
+def tileRange(lonLatBBox, zoom):
+    '''Yields the (x, y) tiles at zoom covering the bounding box
+       [minLon, minLat, maxLon, maxLat]'''
+    x0, y1 = lonLatToTile(lonLatBBox[0], lonLatBBox[1], zoom)
+    x1, y0 = lonLatToTile(lonLatBBox[2], lonLatBBox[3], zoom)
+    last = 2 ** zoom - 1
+    for x in range(int(np.clip(x0, 0, last)), int(np.clip(x1, 0, last)) + 1):
+        for y in range(int(np.clip(y0, 0, last)),
+                       int(np.clip(y1, 0, last)) + 1):
+            yield x, y
+
+
+def tileTransform(project, x, y, zoom, tilePixels=TILE_PIXELS):
+    '''Affine map (3, 2) from world points [x y 1] to the pixels of tile
+       (x, y), fitted through its projected corners, and the world bounding
+       box of the tile. project maps (N, 2) lon, lat to (3, N) world points
+       as Osm2Dict.getPoints() does'''
+    corners = np.array([[0, 0], [1, 0], [0, 1], [1, 1]], dtype=float)
+    lon, lat = tileToLonLat(x + corners[:, 0], y + corners[:, 1], zoom)
+    world = np.asarray(project(np.stack((lon, lat), axis=1)))[:2].T
+    design = np.hstack((world, np.ones((4, 1))))
+    affine = np.linalg.lstsq(design, corners * tilePixels, rcond=None)[0]
+    return affine, [world[:, 0].min(), world[:, 1].min(),
+                    world[:, 0].max(), world[:, 1].max()]
+
+
+def featurePolygons(roadPointWidthMap, buildingLocationMap):
+    '''The drawing groups of RasterMap: a list of (color, polygons) with
+       every polygon a list of (N, 2) world rings, buildings under roads'''
+    groups = dict()
+    for building in buildingLocationMap.values():
+        groups.setdefault(('building', building['color']), []).append(
+            [building['points'][:2, :].T] +
+            [hole[:2, :].T for hole in building.get('holes', [])])
+    for road_name, road_data in roadPointWidthMap.items():
+        for polygon in roadPolygons(road_name, road_data['width'],
+                                    road_data['points']):
+            groups.setdefault(('road', 'GroundGray'), []).append([polygon])
+    return [(color, polygons) for (kind, color), polygons in groups.items()]
+
+
+def renderTiles(tasks):
+    '''Worker of writeTilePyramid(): renders and writes a chunk of tiles.
+       Every task is (filename, tilePixels, affine, palette, groups) with
+       groups a list of (palette index, polygons). Returns the number of tiles
+       written, tiles whose polygons cover no pixel are skipped'''
+    written = 0
+    for filename, tilePixels, affine, palette, groups in tasks:
+        index = np.zeros((tilePixels, tilePixels), dtype=np.uint8)
+        for value, polygons in groups:
+            box = polygonMask(index.shape,
+                              [[np.hstack((ring, np.ones((len(ring), 1))))
+                                .dot(affine) for ring in polygon]
+                               for polygon in polygons])
+            if box is not None:
+                top, left, inside = box
+                index[top:top + inside.shape[0],
+                      left:left + inside.shape[1]][inside] = value
+        if not index.any():
+            continue
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        writePng(filename, index, palette)
+        written += 1
+    return written
+
+
+def writeTilePyramid(directory, project, lonLatBBox, zooms,
+                     roadPointWidthMap, buildingLocationMap, jobs=None,
+                     tilePixels=TILE_PIXELS):
+    '''Writes directory/z/x/y.png for every zoom in zooms and every tile
+       over lonLatBBox holding roads or buildings, on a transparent
+       background. project maps lon, lat to world points, see
+       tileTransform(). Returns the (written, skipped) tile counts'''
+    groups = featurePolygons(roadPointWidthMap, buildingLocationMap)
+    palette = np.round(np.asarray([[0, 0, 0, 0]] +
+                                  [RGBACOLORS[color] for color, polygons
+                                   in groups]) * 255).astype(np.uint8)
+    polygons = [(value, polygon)
+                for value, (color, members) in enumerate(groups, 1)
+                for polygon in members]
+    if not polygons:
+        return 0, sum(len(list(tileRange(lonLatBBox, z))) for z in zooms)
+    boxes = [[polygon[0][:, 0].min(), polygon[0][:, 1].min(),
+              polygon[0][:, 0].max(), polygon[0][:, 1].max()]
+             for value, polygon in polygons]
+    bbox = np.concatenate((np.min(boxes, axis=0)[:2],
+                           np.max(boxes, axis=0)[2:]))
+    index = GridIndex(bbox, max(bbox[2] - bbox[0], bbox[3] - bbox[1]) / 32)
+    for k, box in enumerate(boxes):
+        index.insert(k, box)
+
+    tasks = []
+    skipped = 0
+    for zoom in zooms:
+        for x, y in tileRange(lonLatBBox, zoom):
+            affine, tileBBox = tileTransform(project, x, y, zoom, tilePixels)
+            selected = index.queryIndices(tileBBox)
+            if not len(selected):
+                skipped += 1
+                continue
+            tileGroups = dict()
+            for k in selected:
+                value, polygon = polygons[k]
+                tileGroups.setdefault(value, []).append(polygon)
+            tasks.append((os.path.join(directory, str(zoom), str(x),
+                                       '%d.png' % y),
+                          tilePixels, affine, palette,
+                          sorted(tileGroups.items())))
+
+    chunks = [tasks[start:start + TILE_CHUNK]
+              for start in range(0, len(tasks), TILE_CHUNK)]
+    if len(chunks) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            written = sum(executor.map(renderTiles, chunks))
+    else:
+        written = sum(renderTiles(chunk) for chunk in chunks)
+    return written, skipped + len(tasks) - written
@@ -0,0 +1,162 @@
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: writeTiles()
+#             Splits the extracted features into a grid of tile models, each
+#             a model directory with its own model.sdf and model.config,
+#             included from a small world file. Tiles are built in parallel
+#             and only rewritten when their content changes
+##############################################################################
+
+import hashlib
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .compactFeatures import packFeatures, unpackFeatures
+from .dict2sdf import GetSDF, fileUri
+from .spatialIndex import featureIndex, cropFeatures
+
+TILE_NAME = re.compile(r'^tile_\d+_\d+$')
+#Uris of the tiles included by the world: absolute file:// uris, or
+#model://tile_i_j for a tile directory put on the model resource path
+TILE_URIS = ('file', 'model')
+
+MODEL_CONFIG = '''<?xml version="1.0"?>
+<model>
+  <name>%s</name>
+  <version>1.0</version>
+  <sdf version="1.5">model.sdf</sdf>
+  <description>gazebo_osm tile %d %d</description>
+</model>
+'''
+
+
+def tileGrid(bbox, tileSize):
+    '''Yields (i, j, tileBBox) for the tiles of tileSize meters covering
+       bbox'''
+    nx = max(1, int(np.ceil((bbox[2] - bbox[0]) / tileSize)))
+    ny = max(1, int(np.ceil((bbox[3] - bbox[1]) / tileSize)))
+    for i in range(nx):
+        for j in range(ny):
+            yield i, j, [bbox[0] + i * tileSize, bbox[1] + j * tileSize,
+                         min(bbox[0] + (i + 1) * tileSize, bbox[2]),
+                         min(bbox[1] + (j + 1) * tileSize, bbox[3])]
+
+
+def tileOf(point, bbox, tileSize, shape):
+    '''(i, j) of the tile containing point, clamped to the grid'''
+    return (int(np.clip((point[0] - bbox[0]) // tileSize, 0, shape[0] - 1)),
+            int(np.clip((point[1] - bbox[1]) // tileSize, 0, shape[1] - 1)))
+
+
+def splitFeatures(bbox, tileSize, roadPointWidthMap, modelPoseMap,
+                  buildingLocationMap):
+    '''Distributes the features over the tiles. Roads are clipped at the
+       tile edges, buildings and models go whole to the tile holding their
+       mean point. Returns {(i, j): (tileBBox, roads, models, buildings)}'''
+    tiles = {(i, j): (tileBBox, dict(), dict(), dict())
+             for i, j, tileBBox in tileGrid(bbox, tileSize)}
+    shape = max(tiles)[0] + 1, max(tiles)[1] + 1
+
+    for name, model in modelPoseMap.items():
+        if len(model['points']):
+            tiles[tileOf(model['points'][:2, 0], bbox, tileSize,
+                         shape)][2][name] = model
+    for name, building in buildingLocationMap.items():
+        tiles[tileOf(building['mean'][:2, 0], bbox, tileSize,
+                     shape)][3][name] = building
+
+    index = featureIndex(bbox, roadPointWidthMap, {}, {}, tileSize)
+    for key, (tileBBox, roads, models, buildings) in tiles.items():
+        i, j = key
+        # Roads leaving the grid are kept whole in the border tiles
+        outer = [-np.inf if i == 0 else tileBBox[0],
+                 -np.inf if j == 0 else tileBBox[1],
+                 np.inf if i == shape[0] - 1 else tileBBox[2],
+                 np.inf if j == shape[1] - 1 else tileBBox[3]]
+        roads.update(cropFeatures(outer, roadPointWidthMap, {}, {},
+                                  index=index)[0])
+    return tiles
+
+
+def writeIfChanged(filename, content):
+    '''Writes content unless filename already holds the same bytes.
+       Returns True if the file was written'''
+    if os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            if (hashlib.sha256(f.read()).digest() ==
+                    hashlib.sha256(content).digest()):
+                return False
+    with open(filename, 'wb') as f:
+        f.write(content)
+    return True
+
+
+def buildTile(task):
+    '''Builds and writes the model directory of one tile.
+       Returns the tile name and whether its model.sdf changed'''
+    directory, name, i, j, features, sdfOptions = task
+    if isinstance(features, bytes):
+        features = unpackFeatures(features)[1]
+    sdfFile = GetSDF(**sdfOptions)
+    sdfFile.addFeatures(*features)
+    tileDirectory = os.path.join(directory, name)
+    if not os.path.exists(tileDirectory):
+        os.makedirs(tileDirectory)
+    writeIfChanged(os.path.join(tileDirectory, 'model.config'),
+                   (MODEL_CONFIG % (name, i, j)).encode())
+    changed = writeIfChanged(os.path.join(tileDirectory, 'model.sdf'),
+                             sdfFile.modelString(name))
+    return name, changed
+
+
+def writeTiles(worldFile, tileDirectory, lat, lon, bbox, tileSize,
+               roadPointWidthMap, modelPoseMap, buildingLocationMap,
+               jobs=None, sdfOptions=None, heightmap=None, elevation=0.0,
+               tileUris='file'):
+    '''Writes one model directory per non empty tile into tileDirectory and
+       a world file including them, and removes the tiles of earlier runs
+       that are no longer included. tileUris is one of TILE_URIS. heightmap
+       is the (uri, low, span) of a terrain replacing the ground plane,
+       elevation the altitude of the origin. The features of a tile go to
+       its worker in the format of compactFeatures with the compactShards
+       sdf option. Returns the (written, unchanged) counts'''
+    if tileUris not in TILE_URIS:
+        raise ValueError("Unknown tile uri mode %r [Valid values : %s]"
+                         % (tileUris, ", ".join(TILE_URIS)))
+    sdfOptions = sdfOptions or {}
+    tiles = splitFeatures(bbox, tileSize, roadPointWidthMap, modelPoseMap,
+                          buildingLocationMap)
+    tasks = [(tileDirectory, 'tile_%d_%d' % (i, j), i, j,
+              packFeatures(features) if sdfOptions.get('compactShards')
+              else features, sdfOptions)
+             for (i, j), (tileBBox, *features) in tiles.items()
+             if any(features)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(buildTile, tasks))
+
+    world = GetSDF(modelResolver=sdfOptions.get('modelResolver'))
+    world.addSphericalCoords(lat, lon, elevation)
+    world.includeModel("sun")
+    if heightmap is None:
+        world.addGroundPlane(bbox)
+    else:
+        world.addHeightmap(heightmap[0], bbox, *heightmap[1:])
+    for name, changed in results:
+        world.addInclude(fileUri(os.path.join(tileDirectory, name))
+                         if tileUris == 'file' else 'model://' + name, name)
+    world.writeToFile(worldFile)
+
+    included = {name for name, changed in results}
+    for entry in (os.listdir(tileDirectory)
+                  if os.path.isdir(tileDirectory) else []):
+        if TILE_NAME.match(entry) and entry not in included:
+            shutil.rmtree(os.path.join(tileDirectory, entry))
+
+    written = sum(changed for name, changed in results)
+    return written, len(results) - written
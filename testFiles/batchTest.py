@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for runBatch()
+#             Reads manifests, groups their jobs and runs them offline on a
+#             local osm file
+##############################################################################
+
+import contextlib
+import filecmp
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+import numpy as np
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.batch import (SourceCache, boxArea, cachedDownload,
+                              groupJobs, readManifest, runBatch, splitGroups)
+from gazebo_osm.cli import main
+from gazebo_osm.osm2dict import Osm2Dict
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.osmFile = os.path.join(self.directory, 'umaine.osm')
+        shutil.copy('umaine.osm', self.osmFile)
+        self.box = [-68.6712560, 44.8978660, -68.6653980, 44.9038770]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def writeManifest(self, name, text):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w') as f:
+            f.write(text)
+        return filename
+
+    def testReadManifest(self):
+        '''tests JSON and CSV manifests and their validation'''
+        jobs = readManifest(self.writeManifest('m.json', json.dumps(dict(
+            defaults=dict(flags='-a --clip'),
+            jobs=[dict(name='a', inputOsmFile='umaine.osm',
+                       flags=['--imageFile', 'map.png']),
+                  dict(bbox='-68.67 44.89 -68.66 44.90')]))))
+        self.assertEqual(jobs[0]['flags'],
+                         ['-a', '--clip', '--imageFile', 'map.png'])
+        self.assertEqual(jobs[0]['inputOsmFile'], self.osmFile)
+        self.assertEqual(jobs[0]['directory'],
+                         os.path.join(self.directory, 'a'))
+        self.assertEqual(jobs[1]['name'], 'job1')
+        self.assertEqual(jobs[1]['bbox'], [-68.67, 44.89, -68.66, 44.90])
+
+        jobs = readManifest(self.writeManifest(
+            'm.csv', 'name,bbox,inputOsmFile,flags\n'
+                     'a,,umaine.osm,-r --mergeRoads\n'
+                     'b,"-68.67,44.89,-68.66,44.90",,\n'))
+        self.assertEqual(jobs[0]['flags'], ['-r', '--mergeRoads'])
+        self.assertIsNone(jobs[0]['bbox'])
+        self.assertEqual(jobs[1]['flags'], [])
+
+        for text in ('[{"name": "a"}]',
+                     '[{"bbox": [1, 2, 0, 3]}]',
+                     '[{"inputOsmFile": "x.osm", "size": 1}]',
+                     '[{"name": "a", "inputOsmFile": "x.osm"},'
+                     ' {"name": "a", "inputOsmFile": "y.osm"}]'):
+            with self.assertRaises(ValueError):
+                readManifest(self.writeManifest('bad.json', text))
+
+    def testGroupJobs(self):
+        '''tests that overlapping boxes and equal files share a group'''
+        def job(name, bbox=None, osmFile=None):
+            return dict(name=name, bbox=bbox, inputOsmFile=osmFile)
+        groups = groupJobs([job('a', [0, 0, 0.02, 0.02]),
+                            job('f', None, 'x.osm'),
+                            job('b', [0.05, 0.05, 0.06, 0.06]),
+                            job('c', [0.01, 0.01, 0.03, 0.03]),
+                            job('d', [0.02, 0.02, 0.055, 0.055]),
+                            job('g', None, 'x.osm'),
+                            job('e', [0.1, 0.1, 0.11, 0.11])])
+        members = sorted(sorted(j['name'] for j in group['jobs'])
+                         for group in groups)
+        self.assertEqual(members, [['a', 'b', 'c', 'd'], ['e'], ['f', 'g']])
+        boxes = [group['box'] for group in groups]
+        self.assertIn([0, 0, 0.06, 0.06], boxes)
+        self.assertIn(None, boxes)
+
+    def testUnionLimits(self):
+        '''tests that union boxes stay within the API area and close to the
+           area of their boxes, and that split groups get their own box'''
+        def job(name, bbox):
+            return dict(name=name, bbox=bbox, inputOsmFile=None)
+        # A diagonal chain, whose union grows as the square of its length
+        chain = [job(str(k), [k * 0.01, k * 0.01, k * 0.01 + 0.015,
+                              k * 0.01 + 0.015]) for k in range(10)]
+        groups = groupJobs(chain)
+        self.assertGreater(len(groups), 1)
+        for group in groups:
+            self.assertLessEqual(boxArea(group['box']), 2 * sum(
+                boxArea(j['bbox']) for j in group['jobs']) + 1e-12)
+        large = groupJobs([job('a', [0, 0, 0.4, 0.4]),
+                           job('b', [0.2, 0.2, 0.6, 0.6])])
+        self.assertEqual(len(large), 2)
+        halves = splitGroups([dict(osmFile=None, box=[0, 0, 0.04, 0.01],
+                                   jobs=[job('a', [0, 0, 0.015, 0.01]),
+                                         job('b', [0.025, 0, 0.04, 0.01]),
+                                         job('c', [0.01, 0, 0.03, 0.01])])],
+                             2)
+        self.assertEqual(sorted(sorted(j['name'] for j in half['jobs'])
+                                for half in halves), [['a'], ['b', 'c']])
+        self.assertIn([0.01, 0, 0.04, 0.01],
+                      [half['box'] for half in halves])
+
+    def testSourceCache(self):
+        '''tests that a file is parsed and extracted once'''
+        cache = SourceCache()
+        osmDict = cache.parse(self.osmFile)
+        self.assertIs(cache.parse(os.path.join(self.directory, '.',
+                                               'umaine.osm')), osmDict)
+        first = cache.extract(self.osmFile, self.box[:2], ['a'])
+        self.assertIs(cache.extract(self.osmFile, self.box[:2], ['a']),
+                      first)
+        self.assertIsNot(cache.extract(self.osmFile, self.box[:2], ['r']),
+                         first)
+        # Mapped from the first extraction instead of extracted again
+        origin = [-68.6690, 44.9000]
+        with unittest.mock.patch('gazebo_osm.batch.Osm2Dict.getMapDetails',
+                                 side_effect=AssertionError):
+            mapped = cache.extract(self.osmFile, origin, ['a'])
+        expected = Osm2Dict(origin[0], origin[1], cache.parse(self.osmFile),
+                            ['a']).getMapDetails()
+        for found, wanted in zip(mapped[1:], expected):
+            self.assertEqual(sorted(found), sorted(wanted))
+            for name in wanted:
+                if len(wanted[name]['points']):
+                    self.assertLess(np.abs(found[name]['points'] -
+                                           wanted[name]['points']).max(),
+                                    1e-3)
+
+    def testRunBatch(self):
+        '''tests that batch jobs write the same worlds as separate runs'''
+        manifest = self.writeManifest('m.json', json.dumps([
+            dict(name='plain', inputOsmFile='umaine.osm'),
+            dict(name='merged', inputOsmFile='umaine.osm',
+                 flags='--merge class --imageFile map.png'),
+            dict(name='failing', inputOsmFile='umaine.osm',
+                 flags='--merge none')]))
+        results = runBatch(readManifest(manifest), 1)
+        self.assertEqual([result[:2] for result in results],
+                         [('plain', 0), ('merged', 0), ('failing', 2)])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, 'merged', 'map.png')))
+        for name, flags in (('plain', []), ('merged', ['--merge', 'class'])):
+            reference = os.path.join(self.directory, 'reference', '')
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(['-d', reference, '-O', self.osmFile] + flags)
+            self.assertTrue(filecmp.cmp(
+                os.path.join(self.directory, name, 'outFile.sdf'),
+                os.path.join(reference, 'outFile.sdf'), shallow=False))
+
+    def testSharedDownload(self):
+        '''tests that overlapping boxes are read from one cached download
+           and keep the features touching their own box, whatever their
+           group'''
+        downloads = os.path.join(self.directory, 'downloads')
+        os.makedirs(downloads)
+        # Cached by an earlier run, so nothing is downloaded
+        shutil.copy(self.osmFile, os.path.join(
+            downloads, 'osm_%.7f_%.7f_%.7f_%.7f.osm' % tuple(self.box)))
+        self.assertEqual(cachedDownload(self.box, downloads),
+                         os.path.join(downloads, os.listdir(downloads)[0]))
+        west = [self.box[0], self.box[1], -68.668, self.box[3]]
+        manifest = self.writeManifest('m.json', json.dumps([
+            dict(name='whole', bbox=self.box), dict(name='west', bbox=west)]))
+        results = runBatch(readManifest(manifest), 2, downloads)
+        self.assertEqual([result[1] for result in results], [0, 0])
+        self.assertLess(
+            os.path.getsize(os.path.join(self.directory, 'west',
+                                         'outFile.sdf')),
+            os.path.getsize(os.path.join(self.directory, 'whole',
+                                         'outFile.sdf')))
+        # Alone, with a download of its own box, the job writes the same
+        # world as when it shared the larger download
+        own = os.path.join(self.directory, 'own')
+        os.makedirs(own)
+        shutil.copy(self.osmFile, os.path.join(
+            own, 'osm_%.7f_%.7f_%.7f_%.7f.osm' % tuple(west)))
+        manifest = self.writeManifest('alone.json', json.dumps([
+            dict(name='alone', bbox=west)]))
+        self.assertEqual(runBatch(readManifest(manifest), 1, own)[0][1], 0)
+        self.assertTrue(filecmp.cmp(
+            os.path.join(self.directory, 'west', 'outFile.sdf'),
+            os.path.join(self.directory, 'alone', 'outFile.sdf'),
+            shallow=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for convexHull() and orientedBoundingBox()
+#             and the simplified collision modes of GetSDF()
+##############################################################################
+
+import numpy as np
+import unittest
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.collisionShapes import convexHull, orientedBoundingBox
+from gazebo_osm.dict2sdf import GetSDF
+
+
+class CollisionShapesTest(unittest.TestCase):
+
+    def setUp(self):
+        yaw = 0.3
+        rotation = np.array([[np.cos(yaw), -np.sin(yaw)],
+                             [np.sin(yaw), np.cos(yaw)]])
+        corners = np.array([[-4, -1], [4, -1], [4, 1], [0, 0.5], [-4, 1],
+                            [-4, -1]])
+        self.footprint = corners @ rotation.T + [10, 20]
+        self.yaw = yaw
+
+    def testConvexHull(self):
+        '''tests that the concave and repeated points are dropped'''
+        hull = convexHull(self.footprint)
+        self.assertEqual(len(hull), 4)
+
+    def testOrientedBoundingBox(self):
+        '''tests that the rotated rectangle is recovered'''
+        center, size, yaw = orientedBoundingBox(self.footprint)
+        self.assertTrue(np.allclose(center, [10, 20]))
+        self.assertTrue(np.allclose(sorted(size), [2, 8]))
+        self.assertAlmostEqual(np.mod(yaw, np.pi / 2),
+                               np.mod(self.yaw, np.pi / 2))
+
+    def testSdfModes(self):
+        '''tests the collision elements written for each mode'''
+        points = np.vstack((self.footprint.T, np.zeros((1, 6))))
+        road = np.array([[0, 10, 20], [0, 0, 5], [0, 0, 0]], dtype=float)
+        sdfFile = GetSDF(buildingCollision='obb', roadCollision='patch')
+        sdfFile.addBuilding(None, points, 'building', 'Red', 15)
+        sdfFile.addRoad('road', 4, road)
+        world = sdfFile.world
+        self.assertIsNotNone(world.find('model/link/collision/geometry/box'))
+        self.assertEqual(len(world.findall('model/link/collision')), 2)
+        self.assertEqual(world.findall('model')[-1].get('name'),
+                         'road_collision_patch')
+        self.assertEqual(world.find('model/link/visual/geometry/polyline')
+                         .findall('point')[0].text, "%f %f" %
+                         tuple(self.footprint[0]))
+        sdfFile = GetSDF(buildingCollision='hull', roadCollision='none')
+        sdfFile.addBuilding(None, points, 'building', 'Red', 15)
+        sdfFile.addRoad('road', 4, road)
+        self.assertEqual(len(sdfFile.world.findall('model/link/collision')),
+                         1)
+        self.assertEqual(len(sdfFile.world.findall(
+            'model/link/collision/geometry/polyline/point')), 5)
+        self.assertRaises(ValueError, GetSDF, None, 200, 'sphere')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for packFeatures() and unpackFeatures()
+#             Round trips the umaine features through the compact format and
+#             compares the worlds of --compact, --saveFeatures and
+#             --loadFeatures runs
+##############################################################################
+
+import contextlib
+import filecmp
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+import lxml.etree as Et
+import numpy as np
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.cli import main
+from gazebo_osm.compactFeatures import (packFeatures, unpackFeatures,
+                                        snapFeatures, quantize, dequantize,
+                                        writeFeatures, RESOLUTION)
+from gazebo_osm.dict2sdf import GetSDF
+from gazebo_osm.getOsmFile import parseOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+
+
+def worldPoints(filename):
+    '''Values of the <point> and <pose> elements of the world file'''
+    root = Et.parse(filename).getroot()
+    return np.array([float(v) for element in root.iter('point', 'pose')
+                     for v in element.text.split()])
+
+
+class CompactFeaturesTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.features = Osm2Dict(-68.6712560, 44.8978660,
+                                parseOsmFile('umaine.osm'),
+                                ['a']).getMapDetails()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testRoundTrip(self):
+        '''tests that packed features keep their fields and their points
+           within half a centimeter'''
+        header, features = unpackFeatures(packFeatures(self.features,
+                                                       dict(flags=['a'])))
+        self.assertEqual(header, dict(flags=['a']))
+        for found, expected in zip(features, self.features):
+            self.assertEqual(list(found), list(expected))
+            for name, feature in expected.items():
+                self.assertEqual(list(found[name]), list(feature))
+                if len(feature['points']):
+                    self.assertLessEqual(np.abs(
+                        found[name]['points'] - feature['points']).max(),
+                        RESOLUTION / 2 + 1e-9)
+        roads = features[0]
+        name = next(iter(roads))
+        self.assertEqual(roads[name]['nodes'],
+                         self.features[0][name]['nodes'])
+        snapped = snapFeatures(*self.features)
+        for found, expected in zip(unpackFeatures(packFeatures(snapped))[1],
+                                   snapped):
+            for name, feature in expected.items():
+                self.assertTrue(np.array_equal(found[name]['points'],
+                                               feature['points']))
+        with self.assertRaises(ValueError):
+            unpackFeatures(b'<osm version="0.6"/>' * 4)
+
+    def testElevation(self):
+        '''tests that the z row is only stored when it is not zero'''
+        flat = np.array([[1.234, -5.0], [2.0, 3.456], [0.0, 0.0]])
+        raised = flat + [[0], [0], [12.345]]
+        self.assertEqual(quantize(flat).shape, (2, 2))
+        self.assertEqual(quantize(raised).shape, (3, 2))
+        self.assertTrue(np.allclose(dequantize(quantize(raised)), raised,
+                                    atol=RESOLUTION))
+        with self.assertRaises(ValueError):
+            quantize(np.array([[1e8], [0.0], [0.0]]))
+
+    def testWriteFeatures(self):
+        '''tests that a written archive gets the umask mode and that a failed
+           write leaves no temporary file'''
+        filename = os.path.join(self.directory, 'umaine.gzf')
+        mask = os.umask(0o022)
+        try:
+            writeFeatures(filename, self.features)
+        finally:
+            os.umask(mask)
+        self.assertEqual(os.stat(filename).st_mode & 0o777, 0o644)
+        with unittest.mock.patch('os.replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                writeFeatures(filename, self.features)
+        self.assertEqual(os.listdir(self.directory), ['umaine.gzf'])
+
+    def testParallel(self):
+        '''tests that compact shards give the serial output'''
+        roads, models, buildings = snapFeatures(*self.features)
+        serial = GetSDF()
+        serial.addFeatures(roads, models, buildings)
+        parallel = GetSDF(compactShards=True)
+        parallel.addFeatures(roads, models, buildings, jobs=2)
+        self.assertEqual(serial.toString(), parallel.toString())
+
+    def testWorld(self):
+        '''tests that a saved world is rebuilt from its features and stays
+           within a centimeter of the default world'''
+        def path(*names):
+            return os.path.join(self.directory, *names)
+        for name, flags in (
+                ('default', ['-O', os.path.abspath('umaine.osm')]),
+                ('saved', ['-O', os.path.abspath('umaine.osm'),
+                           '--saveFeatures', path('umaine.gzf')]),
+                ('loaded', ['--loadFeatures', path('umaine.gzf')])):
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(main(flags + ['-d', path(name, '')]), 0)
+        self.assertTrue(filecmp.cmp(path('saved', 'outFile.sdf'),
+                                    path('loaded', 'outFile.sdf'),
+                                    shallow=False))
+        default = worldPoints(path('default', 'outFile.sdf'))
+        saved = worldPoints(path('saved', 'outFile.sdf'))
+        self.assertEqual(default.shape, saved.shape)
+        self.assertLess(np.abs(default - saved).max(), 2 * RESOLUTION)
+        self.assertLess(os.path.getsize(path('umaine.gzf')),
+                        os.path.getsize('umaine.osm') / 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
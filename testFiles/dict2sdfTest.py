@@ -13,11 +13,11 @@ import unittest
 from lxml import etree
 import os
 import sys
-sys.path.insert(0, '../source')
+sys.path.insert(0, '..')
 
-from getOsmFile import getOsmFile
-from osm2dict import Osm2Dict
-from dict2sdf import GetSDF
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.dict2sdf import GetSDF
 
 
 class GetSDFTest(unittest.TestCase):
@@ -91,5 +91,58 @@ class GetSDFTest(unittest.TestCase):
         self.assertEqual(self.gzCheck(), 0)
 
 
+class GetSDFMergeTest(unittest.TestCase):
+
+    def setUp(self):
+        '''Extract the features of a local osm file'''
+        osmDict = getOsmFile([], '', 'umaine.osm')
+        osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+        (self.roadPointWidthMap,
+         self.modelPoseMap,
+         self.buildingLocationMap) = osmRoads.getMapDetails()
+
+    def buildWorld(self, mergeMode):
+        sdfFile = GetSDF(mergeMode)
+        for building, data in self.buildingLocationMap.items():
+            sdfFile.addBuilding(data['mean'], data['points'], building,
+                                data['color'], data['height'])
+        for road, data in self.roadPointWidthMap.items():
+            sdfFile.addRoad(road, data['width'], data['points'])
+        return sdfFile.world
+
+    def testMergeClass(self):
+        '''tests that class merging keeps every link in two models'''
+        separate = self.buildWorld(None)
+        merged = self.buildWorld('class')
+        self.assertEqual([m.get('name') for m in merged.findall('model')],
+                         ['buildings', 'roads'])
+        self.assertEqual(len(list(merged.iter('link'))),
+                         len(separate.findall('model')))
+
+    def testMergeInvalid(self):
+        '''tests that an unknown merge mode is rejected'''
+        self.assertRaises(ValueError, GetSDF, 'everything')
+
+
+class GetSDFParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        '''Extract the features of a local osm file'''
+        osmDict = getOsmFile([], '', 'umaine.osm')
+        osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+        self.features = osmRoads.getMapDetails()
+
+    def buildWorld(self, jobs, **options):
+        sdfFile = GetSDF(**options)
+        sdfFile.addFeatures(*self.features, jobs=jobs)
+        return sdfFile.toString()
+
+    def testParallelIdentical(self):
+        '''tests that the worker processes give the serial output'''
+        self.assertEqual(self.buildWorld(2), self.buildWorld(1))
+        self.assertEqual(self.buildWorld(2, roadCollision='patch'),
+                         self.buildWorld(1, roadCollision='patch'))
+
+
 if __name__ == '__main__':
     unittest.main()
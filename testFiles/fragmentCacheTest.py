@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for FragmentCache() class
+#             and the cached road and building fragments of GetSDF()
+##############################################################################
+
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.dict2sdf import GetSDF
+from gazebo_osm.fragmentCache import FragmentCache
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+
+
+class FragmentCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testKey(self):
+        '''tests that the key follows the geometry and the options'''
+        cache = FragmentCache(self.directory)
+        points = np.zeros((3, 4))
+        key = cache.key('road', 'name', 3, points, 'full')
+        self.assertEqual(key, cache.key('road', 'name', 3, points.copy(),
+                                        'full'))
+        self.assertNotEqual(key, cache.key('road', 'name', 3, points + 1,
+                                           'full'))
+        self.assertNotEqual(key, cache.key('road', 'name', 3, points, 'none'))
+        self.assertIsNone(cache.get(key))
+        cache.put(key, b'<model/>\n')
+        self.assertEqual(cache.get(key), b'<model/>\n')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def testFailedPut(self):
+        '''tests that a failed write leaves no temporary file'''
+        cache = FragmentCache(self.directory)
+        key = cache.key('road', 'name', 3, np.zeros((3, 4)), 'full')
+        with unittest.mock.patch('os.replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                cache.put(key, b'<model/>\n')
+        directory = os.path.dirname(cache.path(key))
+        self.assertEqual(os.listdir(directory), [])
+        self.assertIsNone(cache.get(key))
+
+    def testSplicedOutput(self):
+        '''tests that cached worlds are byte identical to uncached ones'''
+        osmRoads = Osm2Dict(-68.6712560, 44.8978660,
+                            getOsmFile([], '', 'umaine.osm'))
+        features = osmRoads.getMapDetails()
+
+        def build(**options):
+            sdfFile = GetSDF(**options)
+            sdfFile.addSphericalCoords(osmRoads.getLat(), osmRoads.getLon())
+            sdfFile.includeModel("sun")
+            sdfFile.addFeatures(*features)
+            return sdfFile
+
+        expected = build().toString()
+        first = build(cacheDirectory=self.directory)
+        self.assertEqual(first.toString(), expected)
+        self.assertEqual(first.cache.hits, 0)
+        second = build(cacheDirectory=self.directory)
+        self.assertEqual(second.toString(), expected)
+        self.assertEqual(second.cache.misses, 0)
+        self.assertEqual(second.cache.hits, first.cache.misses)
+
+
+if __name__ == '__main__':
+    unittest.main()
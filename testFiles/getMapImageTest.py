@@ -10,10 +10,13 @@
 #             Stores it in file with the specified name(.png)
 ##############################################################################
 
+import os
 import unittest
 import sys
-sys.path.insert(0, '../source')
-from getMapImage import getMapImage
+sys.path.insert(0, '..')
+from gazebo_osm.getMapImage import getMapImage, MPLBMap
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
 
 
 class MapImageTest(unittest.TestCase):
@@ -26,5 +29,25 @@ class MapImageTest(unittest.TestCase):
         '''tests if no names for input and output files are specifed'''
         self.assertEqual(getMapImage('', ''), -1)
 
+
+class MPLBMapTest(unittest.TestCase):
+
+    def testBatched(self):
+        '''tests that the features are drawn as one collection per kind and
+           color, roads last'''
+        osmDict = getOsmFile([], '', 'umaine.osm')
+        osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+        roads, models, buildings = osmRoads.getMapDetails()
+        mplbmap = MPLBMap(osmRoads.getPointBBox([-68.6712560, 44.8978660,
+                                                 -68.6653980, 44.9038770]))
+        mplbmap.add_buildings(buildings)
+        mplbmap.add_roads(roads)
+        colors = set(b['color'] for b in buildings.values())
+        mplbmap.save_image('umaine_test.png')
+        self.assertEqual(len(mplbmap.ax.collections), len(colors) + 1)
+        self.assertEqual(len(mplbmap.ax.patches), 0)
+        self.assertTrue(os.path.getsize('umaine_test.png') > 0)
+        os.remove('umaine_test.png')
+
 if __name__ == '__main__':
     unittest.main()
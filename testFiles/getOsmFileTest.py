@@ -11,8 +11,8 @@
 
 import unittest
 import sys
-sys.path.insert(0, '../source')
-from getOsmFile import getOsmFile
+sys.path.insert(0, '..')
+from gazebo_osm.getOsmFile import getOsmFile
 
 
 class OsmFileTest(unittest.TestCase):
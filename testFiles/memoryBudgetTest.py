@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for MemoryBudget() and StreamedOsm2Dict()
+#             Spills columns and fragments beyond small budgets and checks
+#             that a run with --maxMemory writes the same world
+##############################################################################
+
+import contextlib
+import filecmp
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.cli import main
+from gazebo_osm.getOsmFile import parseOsmFile, streamOsmFile
+from gazebo_osm.memoryBudget import MemoryBudget, CHUNK
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.streamedOsm2Dict import StreamedOsm2Dict
+
+
+class MemoryBudgetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testSpill(self):
+        '''tests that columns and fragments keep their values in memory and
+           once spilled, and that close() removes the files'''
+        budget = MemoryBudget(4 * CHUNK * 8, self.directory)
+        small, large = budget.column('q'), budget.column('d')
+        small.extend(range(10))
+        large.extend(np.arange(3 * CHUNK, dtype=np.float64))
+        fragments = budget.fragmentStore()
+        for k in range(100):
+            fragments.append(b'<model name="%d"/>' % k * 1000)
+        self.assertNotIsInstance(small.array(), np.memmap)
+        self.assertIsInstance(large.array(), np.memmap)
+        self.assertEqual(small.array().tolist(), list(range(10)))
+        self.assertTrue(np.array_equal(large.array(), np.arange(3 * CHUNK)))
+        self.assertEqual(len(fragments), 100)
+        self.assertEqual(fragments[42], b'<model name="42"/>' * 1000)
+        self.assertGreater(budget.spilled, 3 * CHUNK * 8)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        budget.close()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def testStream(self):
+        '''tests that the streamed elements match the parsed ones'''
+        parsed = parseOsmFile('umaine.osm')
+        streamed = list(streamOsmFile('umaine.osm'))
+        self.assertEqual([e['type'] for e in streamed],
+                         [e['type'] for e in parsed])
+        for element, expected in zip(streamed, parsed):
+            for key, value in element['data'].items():
+                self.assertEqual(value, expected['data'][key])
+
+    def testFeatures(self):
+        '''tests that the streamed extraction gives the features of
+           Osm2Dict, with the node and way columns spilled'''
+        lon, lat = -68.6712560, 44.8978660
+        expected = Osm2Dict(lon, lat, parseOsmFile('umaine.osm'),
+                            ['a']).getMapDetails()
+        budget = MemoryBudget(1 << 16, self.directory)
+        streamed = StreamedOsm2Dict(lon, lat, 'umaine.osm', budget, ['a'])
+        features = streamed.getMapDetails()
+        streamed.drop()
+        self.assertGreater(budget.spilled, 0)
+        budget.spillFeatures(*features)
+        for found, wanted in zip(features, expected):
+            self.assertEqual(list(found), list(wanted))
+            for name in wanted:
+                self.assertEqual(sorted(found[name]), sorted(wanted[name]))
+                self.assertTrue(np.array_equal(found[name]['points'],
+                                               wanted[name]['points']))
+        budget.close()
+
+    def testWorld(self):
+        '''tests that a run with a tiny budget writes the same world'''
+        for name, flags in (('default', []), ('budget', ['--maxMemory', '1'])):
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(main(['-O', os.path.abspath('umaine.osm'),
+                                       '-d', os.path.join(self.directory,
+                                                          name, '')] + flags),
+                                 0)
+        self.assertTrue(filecmp.cmp(
+            os.path.join(self.directory, 'default', 'outFile.sdf'),
+            os.path.join(self.directory, 'budget', 'outFile.sdf'),
+            shallow=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
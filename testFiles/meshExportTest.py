@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for MeshBuilder() class
+#             Triangulation, extrusion and STL export of footprints
+##############################################################################
+
+import contextlib
+import io
+import lxml.etree as Et
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.cli import main
+from gazebo_osm.meshExport import (MeshBuilder, triangulate, prism,
+                                   signedArea, writeStl)
+
+
+def trianglesArea(vertices, triangles):
+    return sum(signedArea(vertices[t]) for t in triangles)
+
+
+class MeshExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.square = np.array([[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+                               dtype=float)
+        self.hole = np.array([[3, 3], [6, 3], [6, 6], [3, 6]], dtype=float)
+
+    def testConcave(self):
+        '''tests that a clockwise L shape is fully covered'''
+        ell = np.array([[0, 0], [0, 4], [1, 4], [1, 1], [4, 1], [4, 0]],
+                       dtype=float)
+        vertices, triangles = triangulate(ell)
+        self.assertEqual(len(triangles), 4)
+        self.assertAlmostEqual(trianglesArea(vertices, triangles), 7)
+
+    def testHole(self):
+        '''tests that the hole area is left out of the triangulation'''
+        vertices, triangles = triangulate(self.square, [self.hole])
+        self.assertAlmostEqual(trianglesArea(vertices, triangles), 91)
+
+    def testPrismVolume(self):
+        '''tests that the extruded prism is closed with the right volume'''
+        soup = prism(self.square, [self.hole], 2.0)
+        volume = np.sum(np.einsum('ij,ij->i', soup[:, 0],
+                                  np.cross(soup[:, 1], soup[:, 2]))) / 6
+        self.assertAlmostEqual(volume, 182)
+
+    def testWriteStl(self):
+        '''tests the binary STL size and the files written per material'''
+        builder = MeshBuilder()
+        points = np.vstack((self.square.T, np.zeros((1, 5))))
+        builder.addBuilding(points, 'Red', 15)
+        builder.addBuilding(points + [[20], [0], [0]], 'Red', 15)
+        builder.addBuilding(points + [[40], [0], [0]], 'Blue', 15)
+        directory = tempfile.mkdtemp()
+        written = builder.write(directory)
+        self.assertEqual([item[2] for item in written],
+                         ['buildings_Red', 'buildings_Blue'])
+        self.assertEqual(len(written[0][4]), 2)
+        # 2 caps x 2 triangles + 4 walls x 2 triangles per building
+        self.assertEqual(os.path.getsize(written[0][3]),
+                         84 + 50 * 2 * 12)
+        writeStl(os.path.join(directory, 'empty.stl'), np.zeros((0, 3, 3)))
+        self.assertEqual(os.path.getsize(os.path.join(directory,
+                                                      'empty.stl')), 84)
+
+    def testCollisions(self):
+        '''tests that --mesh follows --buildingCollision and
+           --roadCollision'''
+        directory = tempfile.mkdtemp()
+        try:
+            worlds = dict()
+            for name, flags in (
+                    ('full', []),
+                    ('boxes', ['--buildingCollision', 'obb',
+                               '--roadCollision', 'patch']),
+                    ('hulls', ['--buildingCollision', 'hull',
+                               '--roadCollision', 'none'])):
+                output = os.path.join(directory, name, '')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(main(['-O', os.path.abspath('umaine.osm'),
+                                           '--mesh', '-d', output] + flags),
+                                     0)
+                worlds[name] = Et.parse(output + 'outFile.sdf').getroot()
+        finally:
+            shutil.rmtree(directory)
+
+        def collisions(world, kind):
+            return [c for model in world.iter('model')
+                    if model.get('name', '').startswith(kind)
+                    for c in model.iter('collision')]
+        for kind in ('roads', 'buildings'):
+            self.assertTrue(all(c.find('geometry/mesh') is not None
+                                for c in collisions(worlds['full'], kind)))
+        self.assertEqual(collisions(worlds['hulls'], 'roads'), [])
+        self.assertEqual(collisions(worlds['boxes'], 'roads'), [])
+        patches = [model for model in worlds['boxes'].iter('model')
+                   if model.get('name') == 'road_collision_patch']
+        self.assertEqual(len(patches), 1)
+        # One collision per mesh in full mode, one per building otherwise
+        meshes = len(collisions(worlds['full'], 'buildings'))
+        boxes = collisions(worlds['boxes'], 'buildings')
+        hulls = collisions(worlds['hulls'], 'buildings')
+        self.assertEqual(len(boxes), len(hulls))
+        self.assertGreater(len(boxes), meshes)
+        self.assertTrue(all(c.find('geometry/box') is not None
+                            for c in boxes))
+        self.assertTrue(all(c.find('geometry/polyline') is not None
+                            for c in hulls))
+
+
+if __name__ == '__main__':
+    unittest.main()
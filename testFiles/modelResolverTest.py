@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for ModelResolver()
+#             Resolves models from a model directory and a Fuel cache laid
+#             out in a temporary home directory
+##############################################################################
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+import lxml.etree as Et
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.cli import main
+from gazebo_osm.dict2sdf import GetSDF
+from gazebo_osm.modelResolver import ModelResolver, FUEL_URL
+
+
+class ModelResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.models = os.path.join(self.directory, 'models')
+        fuel = os.path.join(self.directory, '.gz', 'fuel',
+                            'fuel.gazebosim.org', 'openrobotics', 'models')
+        for model in (os.path.join(self.models, 'sun'),
+                      os.path.join(self.models, 'stop_sign'),
+                      os.path.join(fuel, 'lamp post', '1'),
+                      os.path.join(fuel, 'lamp post', '12')):
+            os.makedirs(model)
+            open(os.path.join(model, 'model.config'), 'w').close()
+        self.fuel = fuel
+        with open(os.path.join(self.models, 'stop_sign', 'model.sdf'),
+                  'w') as f:
+            f.write('<sdf version="1.5"><model name="stop_sign">'
+                    '<pose>0 0 0.5 0 0 0</pose><link name="link">'
+                    '<pose>1 0 0 0 0 1.57</pose><visual name="visual">'
+                    '<geometry><mesh><uri>model://stop_sign/meshes/sign.dae'
+                    '</uri></mesh></geometry></visual></link></model></sdf>')
+        self.environment = unittest.mock.patch.dict(
+            os.environ, dict(HOME=self.directory), clear=True)
+        self.environment.start()
+
+    def tearDown(self):
+        self.environment.stop()
+        shutil.rmtree(self.directory)
+
+    def testSources(self):
+        '''tests the uris of found models in every source'''
+        names = ['sun', 'Stop Sign', 'Lamp Post']
+        self.assertEqual([ModelResolver().uri(name) for name in names],
+                         [FUEL_URL + name for name in names])
+        self.assertEqual(
+            [ModelResolver('uri', [self.models]).uri(name) for name in names],
+            ['model://sun', 'model://stop_sign',
+             'file://' + os.path.join(self.fuel, 'lamp post', '12')])
+        self.assertEqual(
+            [ModelResolver('path', [self.models]).uri(name)
+             for name in names],
+            ['file://' + os.path.join(self.models, 'sun'),
+             'file://' + os.path.join(self.models, 'stop_sign'),
+             'file://' + os.path.join(self.fuel, 'lamp post', '12')])
+
+    def testMissing(self):
+        '''tests that missing models are reported once and included, skipped
+           or refused, and skipped by default'''
+        names = ['sun', 'Fire hydrant', 'Fire hydrant', 'Gas Station']
+        resolver = ModelResolver('uri', [self.models])
+        self.assertEqual(resolver.check(names),
+                         ['Fire hydrant', 'Gas Station'])
+        self.assertIsNone(resolver.uri('Fire hydrant'))
+        self.assertEqual(ModelResolver('uri', [self.models],
+                                       'include').uri('Gas Station'),
+                         'model://gas_station')
+        with self.assertRaises(LookupError):
+            ModelResolver('path', [self.models], 'error').check(names)
+        self.assertEqual(ModelResolver().check(names), [])
+
+    def testInstances(self):
+        '''tests that the models found locally are instanced as links of one
+           model per type and the others included'''
+        sdfFile = GetSDF(modelResolver=ModelResolver('path', [self.models],
+                                                     'include'),
+                         instanceModels=True)
+        for k in range(3):
+            sdfFile.addModel('Stop Sign', 'Stop Sign_%d' % k, [k, 2.0, 0.0])
+        sdfFile.addModel('Fire hydrant', 'Fire hydrant_0', [0.0, 0.0, 0.0])
+        world = Et.fromstring(sdfFile.toString()).find('world')
+        model, = world.findall('model')
+        self.assertEqual(model.get('name'), 'Stop_Sign_instances')
+        links = model.findall('link')
+        self.assertEqual([link.get('name') for link in links],
+                         ['Stop Sign_0', 'Stop Sign_1', 'Stop Sign_2'])
+        self.assertEqual([float(v) for v in links[2].findtext('pose').split()],
+                         [3.0, 2.0, 0.5, 0.0, 0.0, 1.57])
+        self.assertEqual(links[0].findtext('.//mesh/uri'), os.path.join(
+            self.models, 'stop_sign', 'meshes', 'sign.dae'))
+        self.assertEqual(world.find('include').findtext('name'),
+                         'Fire hydrant_0')
+
+    def testWorld(self):
+        '''tests that an offline world includes nothing from the network'''
+        directory = os.path.join(self.directory, 'world', '')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = main(['-O', os.path.abspath('umaine.osm'), '-d',
+                           directory, '--modelSource', 'uri', '--modelPath',
+                           self.models])
+        self.assertEqual(status, 0)
+        self.assertIn('models not found locally', output.getvalue())
+        uris = [uri.text for uri in Et.parse(
+            directory + 'outFile.sdf').getroot().iter('uri')]
+        self.assertIn('model://sun', uris)
+        self.assertFalse([uri for uri in uris if '://' in uri and
+                          not uri.startswith('model://')])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main(['-O', os.path.abspath('umaine.osm'), '-d',
+                                   directory, '--modelSource', 'uri',
+                                   '--missingModels', 'error']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
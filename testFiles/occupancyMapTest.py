@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for OccupancyMap()
+#             Rasterizes a small hand made world and checks the PGM and YAML
+#             files, whole and tiled
+##############################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.occupancyMap import OccupancyMap, OCCUPIED, FREE, UNKNOWN
+
+
+def readPgm(filename):
+    with open(filename, 'rb') as pgm:
+        data = pgm.read()
+    fields = data.split(b'\n', 4)
+    width, height = map(int, fields[2].split())
+    return np.frombuffer(fields[4], dtype=np.uint8).reshape(height, width)
+
+
+def square(x0, y0, x1, y1):
+    return np.array([[x0, x1, x1, x0, x0], [y0, y0, y1, y1, y0],
+                     [0, 0, 0, 0, 0]], dtype=float)
+
+
+class OccupancyMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.occupancyMap = OccupancyMap([0, 0, 10, 8], resolution=0.5,
+                                         bandRows=3)
+        self.occupancyMap.add_roads(
+            {'road': {'points': np.array([[0, 10], [1, 1], [0, 0]],
+                                         dtype=float), 'width': 1.0}})
+        self.occupancyMap.add_buildings(
+            {'house': {'points': square(4, 0, 6, 4), 'height': 15},
+             'grass': {'points': square(7, 5, 9, 7), 'height': 0.01}})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testCells(self):
+        '''tests the occupancy of the road, the building and a flat area'''
+        image = self.occupancyMap.render()
+        self.assertEqual(image.shape, (16, 20))
+        # Row 0 is the top of the map, y = 8
+        self.assertEqual(image[14, 0], FREE)
+        self.assertEqual(image[15, 0], UNKNOWN)
+        self.assertEqual(image[15, 9], OCCUPIED)
+        self.assertEqual(image[10, 9], OCCUPIED)
+        self.assertEqual(image[4, 16], FREE)
+        self.assertEqual(image[0, 0], UNKNOWN)
+        self.assertEqual(np.count_nonzero(image == OCCUPIED), 4 * 8)
+
+    def testFiles(self):
+        '''tests that the tiles add up to the whole map'''
+        filename = os.path.join(self.directory, 'map')
+        self.assertEqual(self.occupancyMap.save(filename),
+                         [filename + '.yaml'])
+        whole = readPgm(filename + '.pgm')
+        self.assertTrue(np.array_equal(whole, self.occupancyMap.render()))
+        with open(filename + '.yaml') as yaml:
+            self.assertIn('image: map.pgm', yaml.read())
+
+        tiles = self.occupancyMap.save(filename, tileSize=4)
+        self.assertEqual(len(tiles), 3 * 2)
+        self.assertTrue(np.array_equal(readPgm(filename + '_1_1.pgm'),
+                                       whole[8:16, 8:16]))
+        with open(filename + '_1_1.yaml') as yaml:
+            self.assertIn('origin: [4.000000, 0.000000, 0.0]', yaml.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
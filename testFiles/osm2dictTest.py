@@ -12,10 +12,10 @@
 import numpy as np
 import unittest
 import sys
-sys.path.insert(0, '../source')
+sys.path.insert(0, '..')
 
-from osm2dict import Osm2Dict
-from getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.getOsmFile import getOsmFile
 
 
 class Osm2DictTest(unittest.TestCase):
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for Profiler()
+##############################################################################
+
+import contextlib
+import filecmp
+import io
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.cli import main
+from gazebo_osm.profiling import Profiler, featureCounts
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def testStages(self):
+        '''tests the metrics and counts recorded for every stage'''
+        profiler = Profiler(enabled=True, verbose=False)
+        with profiler.stage('parse') as counts:
+            osmDict = getOsmFile([], '', 'umaine.osm')
+            counts['elements'] = len(osmDict)
+        with profiler.stage('extract') as counts:
+            osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+            with contextlib.redirect_stdout(io.StringIO()):
+                roads = osmRoads.getMapDetails()[0]
+            counts['roads'] = featureCounts(roads)
+        parse, extract = profiler.stages
+        self.assertEqual([parse['name'], extract['name']],
+                         ['parse', 'extract'])
+        self.assertEqual(parse['counts']['elements'], len(osmDict))
+        self.assertEqual(extract['counts']['roads']['count'], len(roads))
+        self.assertEqual(extract['counts']['roads']['vertices'],
+                         sum(r['points'].shape[1] for r in roads.values()))
+        for stage in profiler.stages:
+            self.assertGreater(stage['wall'], 0)
+            self.assertGreater(stage['peakTraced'], 0)
+            self.assertGreaterEqual(stage['cpu'], 0)
+
+    def testWithoutResetPeak(self):
+        '''tests that the stages are measured on Pythons without
+           tracemalloc.reset_peak()'''
+        resetPeak = tracemalloc.reset_peak
+        del tracemalloc.reset_peak
+        try:
+            profiler = Profiler(enabled=True, verbose=False)
+            for name in ('first', 'second'):
+                with profiler.stage(name):
+                    data = [bytes(1 << 16) for k in range(16)]
+                    del data
+        finally:
+            tracemalloc.reset_peak = resetPeak
+        for stage in profiler.stages:
+            self.assertGreaterEqual(stage['peakTraced'], 1 << 20)
+
+    def testFailingStage(self):
+        '''tests that a stage raising an exception is still recorded'''
+        profiler = Profiler(verbose=False)
+        with self.assertRaises(ValueError):
+            with profiler.stage('broken'):
+                raise ValueError
+        self.assertEqual(profiler.stages[0]['name'], 'broken')
+        self.assertNotIn('peakTraced', profiler.stages[0])
+
+    def testWrite(self):
+        '''tests the JSON report and the cProfile file of every stage'''
+        prefix = os.path.join(self.directory, 'run')
+        profiler = Profiler(enabled=True, statsPrefix=prefix, verbose=False)
+        with profiler.stage('sum'):
+            sum(range(100000))
+        profiler.writeJson(prefix + '.json')
+        with open(prefix + '.json') as f:
+            report = json.load(f)
+        self.assertEqual(report['stages'][0]['stats'], prefix + '_sum.prof')
+        self.assertGreaterEqual(report['wall'], report['stages'][0]['wall'])
+        stats = pstats.Stats(prefix + '_sum.prof')
+        self.assertTrue(any(name == '<built-in method builtins.sum>'
+                            for filename, line, name in stats.stats))
+
+    def testConcurrentStages(self):
+        '''tests that the output stages run in worker processes write the
+           same files as sequential ones and are still profiled'''
+        for mode in ('concurrent', 'sequential'):
+            directory = os.path.join(self.directory, mode, '')
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(['-O', 'umaine.osm', '-d', directory, '-i', 'map.png',
+                      '--occupancyMap', 'occupancy', '--resolution', '0.5',
+                      '--profile', directory + 'profile.json'] +
+                     (['--sequential'] if mode == 'sequential' else []))
+            with open(directory + 'profile.json') as f:
+                stages = json.load(f)['stages']
+            self.assertEqual(sorted(stage['name'] for stage in stages),
+                             ['extract', 'image', 'occupancy', 'parse',
+                              'sdf'])
+            self.assertTrue(all(stage['wall'] > 0 for stage in stages))
+        for filename in ('outFile.sdf', 'map.png', 'occupancy.pgm',
+                         'occupancy.yaml'):
+            self.assertTrue(filecmp.cmp(
+                os.path.join(self.directory, 'concurrent', filename),
+                os.path.join(self.directory, 'sequential', filename),
+                shallow=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
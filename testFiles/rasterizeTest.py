@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for fillPolygons(), writePng() and RasterMap()
+##############################################################################
+
+import os
+import struct
+import unittest
+import zlib
+import numpy as np
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.rasterize import fillPolygons, writePng, RasterMap
+
+
+def readPng(filename):
+    '''Returns the IHDR fields, the palette and the filtered raw rows'''
+    with open(filename, 'rb') as png:
+        data = png.read()
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks = dict()
+    pos = 8
+    while pos < len(data):
+        length, = struct.unpack('>I', data[pos:pos + 4])
+        kind = data[pos + 4:pos + 8]
+        body = data[pos + 8:pos + 8 + length]
+        crc, = struct.unpack('>I', data[pos + 8 + length:pos + 12 + length])
+        assert crc == zlib.crc32(kind + body) & 0xffffffff
+        chunks[kind] = body
+        pos += 12 + length
+    return (struct.unpack('>IIBBBBB', chunks[b'IHDR']), chunks.get(b'PLTE'),
+            zlib.decompress(chunks[b'IDAT']))
+
+
+class RasterizeTest(unittest.TestCase):
+
+    def testSquareWithHole(self):
+        '''tests the even-odd fill of a square with a square hole'''
+        outer = np.array([[2, 2], [12, 2], [12, 12], [2, 12]])
+        hole = np.array([[5, 5], [9, 5], [9, 9], [5, 9]])
+        mask = fillPolygons((16, 16), [[outer, hole]])
+        self.assertEqual(np.count_nonzero(mask), 100 - 16)
+        self.assertFalse(mask[7, 7])
+        self.assertTrue(mask[2, 2])
+        self.assertFalse(mask[12, 12])
+
+    def testUnion(self):
+        '''tests that overlapping polygons are not cut out of each other'''
+        a = np.array([[0, 0], [6, 0], [6, 6], [0, 6]])
+        b = a + 3
+        mask = fillPolygons((10, 10), [[a], [b]])
+        self.assertEqual(np.count_nonzero(mask), 36 + 36 - 9)
+
+    def testWritePng(self):
+        '''tests the chunks and rows of a 16 bit gray PNG file'''
+        image = np.arange(12, dtype=np.uint16).reshape(3, 4) * 1000
+        writePng('test16.png', image)
+        header, palette, raw = readPng('test16.png')
+        os.remove('test16.png')
+        self.assertEqual(header, (4, 3, 16, 0, 0, 0, 0))
+        rows = np.frombuffer(raw, dtype=np.uint8).reshape(3, 9)
+        self.assertTrue(np.all(rows[:, 0] == 0))
+        self.assertTrue(np.array_equal(
+            rows[:, 1:].copy().view('>u2'), image))
+
+    def testRasterMap(self):
+        '''tests that the map of a local osm file is drawn with a palette'''
+        osmDict = getOsmFile([], '', 'umaine.osm')
+        osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+        roads, models, buildings = osmRoads.getMapDetails()
+        rasterMap = RasterMap(osmRoads.getPointBBox([-68.6712560, 44.8978660,
+                                                     -68.6653980,
+                                                     44.9038770]))
+        rasterMap.add_buildings(buildings)
+        rasterMap.add_roads(roads)
+        rasterMap.save_image('umaine_raster.png')
+        header, palette, raw = readPng('umaine_raster.png')
+        os.remove('umaine_raster.png')
+        height, width = rasterMap.shape
+        self.assertEqual(header[:4], (width, height, 8, 3))
+        self.assertEqual(len(raw), height * (width + 1))
+        colors = set(b['color'] for b in buildings.values()) | {'GroundGray'}
+        self.assertLessEqual(len(palette) // 3, len(colors) + 2)
+        indices = np.frombuffer(raw, dtype=np.uint8).reshape(height, -1)
+        self.assertGreater(len(np.unique(indices[:, 1:])), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for mergeRoads()
+#             Stitches small hand made road networks and the roads of a
+#             local osm file
+##############################################################################
+
+import numpy as np
+import unittest
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.roadGraph import mergeRoads
+
+
+def way(nodes, coords, kind='residential', width=4.0):
+    points = np.array([coords[n] + (0.0,) for n in nodes], dtype=float).T
+    return {'points': points, 'width': width, 'type': kind,
+            'nodes': list(nodes)}
+
+
+class RoadGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.coords = {1: (-50, 0), 2: (0, 0), 3: (50, 0), 4: (0, 40),
+                       5: (-30, -30), 6: (30, -30)}
+
+    def testThroughRoad(self):
+        '''tests that collinear ways are stitched and the stem of a T
+           junction is trimmed to the edge of the through road'''
+        roads = {'a_1': way([1, 2], self.coords),
+                 'a_2': way([2, 3], self.coords),
+                 'stem_3': way([4, 2], self.coords, 'service', 2.0)}
+        merged = mergeRoads(roads)
+        self.assertEqual(sorted(merged), ['a_1', 'stem_3'])
+        self.assertEqual(merged['a_1']['nodes'], [1, 2, 3])
+        self.assertTrue(np.allclose(merged['stem_3']['points'][:2, -1],
+                                    [0, 2]))
+
+    def testJunctionPatch(self):
+        '''tests that a junction without a through road gets a closed patch
+           touching the trimmed road ends'''
+        roads = {'a_1': way([2, 4], self.coords),
+                 'b_2': way([2, 5], self.coords, 'footway', 2.0),
+                 'c_3': way([6, 2], self.coords, 'service', 3.0)}
+        merged = mergeRoads(roads)
+        patch = merged['junction_2']['points']
+        self.assertTrue(np.allclose(patch[:, 0], patch[:, -1]))
+        self.assertEqual(patch.shape[1], 7)
+        for name in roads:
+            points = merged[name]['points'][:2]
+            self.assertGreater(np.min(np.linalg.norm(points, axis=0)), 1.9)
+
+    def testJunctionElevation(self):
+        '''tests that a junction patch lies at the lowest road end it joins
+           when the roads are raised onto a terrain'''
+        roads = {'a_1': way([2, 4], self.coords),
+                 'b_2': way([2, 5], self.coords, 'footway', 2.0),
+                 'c_3': way([6, 2], self.coords, 'service', 3.0)}
+        for road in roads.values():
+            road['points'][2] = 10 + 0.1 * road['points'][0] + \
+                0.05 * road['points'][1]
+        merged = mergeRoads(roads)
+        patch = merged['junction_2']['points']
+        ends = []
+        for name in roads:
+            points = merged[name]['points']
+            nearest = np.argmin(np.linalg.norm(points[:2], axis=0))
+            ends.append(points[2, nearest])
+        self.assertTrue(np.allclose(patch[2], min(ends)))
+        self.assertLess(min(ends), 10)
+
+    def testRing(self):
+        '''tests that a ring of ways is not closed into a filled polygon'''
+        roads = {'a_1': way([1, 2, 4], self.coords),
+                 'a_2': way([4, 1], self.coords)}
+        merged = mergeRoads(roads)
+        self.assertEqual(len(merged), 2)
+        for road in merged.values():
+            self.assertNotEqual(road['nodes'][0], road['nodes'][-1])
+
+    def testOsmFile(self):
+        '''tests that the ways of a local osm file merge into fewer roads'''
+        osmDict = getOsmFile([], '', 'umaine.osm')
+        osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+        roads = osmRoads.getMapDetails()[0]
+        merged = mergeRoads(roads)
+        self.assertLess(len(merged), len(roads))
+        for road in merged.values():
+            if road['type'] != 'junction':
+                self.assertEqual(len(road['nodes']), road['points'].shape[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for WorldServer()
+#             Serves a region loaded from a local osm file on a free port
+#             and requests worlds from it
+##############################################################################
+
+import asyncio
+import concurrent.futures
+import io
+import json
+import socket
+import threading
+import unittest
+import urllib.error
+import urllib.request
+import zipfile
+import lxml.etree as Et
+import numpy as np
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.server import Region, WorldServer
+
+
+class WorldServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.box = [-68.6712560, 44.8978660, -68.6653980, 44.9038770]
+        cls.region = Region('umaine.osm')
+        cls.server = WorldServer(cls.region, threads=4)
+        cls.loop = asyncio.new_event_loop()
+        cls.port = cls.loop.run_until_complete(cls.server.start('127.0.0.1',
+                                                                0))
+        cls.thread = threading.Thread(target=cls.loop.run_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.server.close()
+        cls.loop.close()
+
+    def request(self, path, body=None):
+        '''(status, content type, bytes) of a request to the server'''
+        data = None if body is None else json.dumps(body).encode()
+        try:
+            with urllib.request.urlopen('http://127.0.0.1:%d%s' % (
+                    self.port, path), data) as response:
+                return (response.status, response.headers['Content-Type'],
+                        response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers['Content-Type'], e.read()
+
+    def rawRequest(self, data):
+        '''Status of the answer to the raw bytes of a request'''
+        with socket.create_connection(('127.0.0.1', self.port)) as s:
+            s.sendall(data)
+            s.shutdown(socket.SHUT_WR)
+            answer = b''
+            while True:
+                chunk = s.recv(4096)
+                if not chunk:
+                    break
+                answer += chunk
+        return int(answer.split()[1])
+
+    def testWorld(self):
+        '''tests that a box of the region gives the features of a separate
+           extraction around its own corner'''
+        box = [-68.6700, 44.8990, -68.6670, 44.9020]
+        status, contentType, data = self.request('/world', dict(bbox=box))
+        self.assertEqual((status, contentType), (200, 'application/xml'))
+        world = Et.fromstring(data).find('world')
+        coordinates = world.find('spherical_coordinates')
+        self.assertAlmostEqual(
+            float(coordinates.find('latitude_deg').text), box[1])
+        served = {model.get('name') or model.findtext('name'): model
+                  for model in world if model.tag in ('model', 'include')}
+
+        osmRoads = Osm2Dict(box[0], box[1],
+                            getOsmFile([], '', 'umaine.osm'))
+        roads, models, buildings = osmRoads.getMapDetails()
+        servedBuildings = set(served) & set(buildings)
+        self.assertTrue(servedBuildings)
+        self.assertLess(len(servedBuildings), len(buildings))
+        for name in servedBuildings:
+            point = served[name].find('.//polyline/point').text.split()
+            np.testing.assert_allclose([float(v) for v in point],
+                                       buildings[name]['points'][:2, 0],
+                                       atol=1e-5)
+
+    def testTiles(self):
+        '''tests that tileSize gives a zip of a world and its tiles'''
+        status, contentType, data = self.request(
+            '/world', dict(bbox=self.box, tileSize=200, flags='rb',
+                           clip=True, mergeRoads=True))
+        self.assertEqual((status, contentType), (200, 'application/zip'))
+        names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+        self.assertIn('world.sdf', names)
+        self.assertTrue(any(name.endswith('model.sdf') for name in names))
+
+    def testBadRequests(self):
+        '''tests the answers to invalid requests'''
+        for path, body, status in (
+                ('/world', dict(bbox=[0, 0, 1, 1]), 400),
+                ('/world', dict(bbox=self.box, merge='none'), 400),
+                ('/world', dict(bbox=self.box, size=1), 400),
+                ('/world', None, 405),
+                ('/nowhere', None, 404)):
+            self.assertEqual(self.request(path, body)[0], status)
+
+    def testFraming(self):
+        '''tests that a negative or unmet Content-Length is a client error
+           and not counted as a server failure'''
+        for data in (b'POST /world HTTP/1.1\r\nContent-Length: -1\r\n\r\n',
+                     b'POST /world HTTP/1.1\r\nContent-Length: 100\r\n\r\n'
+                     b'{"bbox": [0'):
+            self.assertEqual(self.rawRequest(data), 400)
+
+    def testConcurrentMetrics(self):
+        '''tests concurrent requests and the latencies they leave'''
+        before = json.loads(self.request('/metrics')[2])['routes'].get(
+            'POST /world', dict(count=0))['count']
+        boxes = [[self.box[0] + k * 1e-4, self.box[1],
+                  self.box[2], self.box[3]] for k in range(8)]
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            statuses = list(executor.map(
+                lambda box: self.request('/world', dict(bbox=box))[0],
+                boxes))
+        self.assertEqual(statuses, [200] * 8)
+        metrics = json.loads(self.request('/metrics')[2])
+        route = metrics['routes']['POST /world']
+        self.assertEqual(route['count'], before + 8)
+        self.assertLessEqual(route['p50'], route['max'])
+        self.assertEqual(metrics['region']['buildings'],
+                         len(self.region.buildings))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for GridIndex() class and bounding box clipping
+##############################################################################
+
+import numpy as np
+import unittest
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.spatialIndex import (GridIndex, clipPolygon, clipPolyline,
+                                     cropFeatures)
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.getOsmFile import getOsmFile
+
+
+class SpatialIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bbox = [0, 0, 10, 10]
+
+    def testGridQuery(self):
+        '''tests that only features intersecting the query are returned'''
+        index = GridIndex(self.bbox, cellSize=2)
+        index.insert('inside', [1, 1, 2, 2])
+        index.insert('outside', [20, 20, 30, 30])
+        index.insert('crossing', [-50, 5, 50, 6])
+        self.assertEqual(index.query([0, 0, 3, 3]), ['inside'])
+        self.assertEqual(index.query(self.bbox), ['inside', 'crossing'])
+        self.assertEqual(index.query([25, 25, 26, 26]), ['outside'])
+
+    def testClipPolygon(self):
+        '''tests Sutherland-Hodgman clipping of a square on the edge'''
+        square = np.array([[5, 5], [15, 5], [15, 15], [5, 15], [5, 5]])
+        ring = clipPolygon(square, self.bbox)
+        self.assertEqual(len(ring), 4)
+        self.assertTrue(np.allclose(np.min(ring, axis=0), [5, 5]))
+        self.assertTrue(np.allclose(np.max(ring, axis=0), [10, 10]))
+        self.assertEqual(len(clipPolygon(square + 20, self.bbox)), 0)
+
+    def testClipPolyline(self):
+        '''tests that a polyline leaving and re-entering gives two pieces'''
+        square = np.array([[5, 5], [15, 5], [15, 15], [5, 15], [5, 5]])
+        line = np.array([[-5, 2], [5, 2], [15, 2], [15, 8], [5, 8]])
+        pieces = clipPolyline(line, self.bbox)
+        self.assertEqual(len(pieces), 2)
+        self.assertTrue(np.allclose(pieces[0], [[0, 2], [5, 2], [10, 2]]))
+        self.assertTrue(np.allclose(pieces[1], [[10, 8], [5, 8]]))
+        self.assertEqual(clipPolyline(line + 100, self.bbox), [])
+        # A z column is interpolated at the cuts
+        raised = np.hstack((line, line[:, :1] + 5))
+        pieces = clipPolyline(raised, self.bbox)
+        self.assertTrue(np.allclose(pieces[0][:, 2], [5, 10, 15]))
+        self.assertTrue(np.allclose(clipPolygon(
+            np.hstack((square, square[:, :1])), self.bbox)[:, 2],
+            clipPolygon(square, self.bbox)[:, 0]))
+
+    def testCropFeatures(self):
+        '''tests that cropping keeps every feature inside the bounding box'''
+        osmDict = getOsmFile([], '', 'umaine.osm')
+        osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+        roads, models, buildings = osmRoads.getMapDetails()
+        bbox = osmRoads.getPointBBox([-68.6712560, 44.8978660,
+                                      -68.6653980, 44.9038770])
+        croppedRoads, croppedModels, croppedBuildings = cropFeatures(
+            bbox, roads, models, buildings)
+        self.assertTrue(len(croppedRoads) > 0)
+        self.assertTrue(len(croppedBuildings) > 0)
+        for feature in (list(croppedRoads.values()) +
+                        list(croppedBuildings.values())):
+            points = feature['points']
+            self.assertTrue(np.all(points[0, :] >= bbox[0] - 1e-6))
+            self.assertTrue(np.all(points[0, :] <= bbox[2] + 1e-6))
+            self.assertTrue(np.all(points[1, :] >= bbox[1] - 1e-6))
+            self.assertTrue(np.all(points[1, :] <= bbox[3] + 1e-6))
+
+
+if __name__ == '__main__':
+    unittest.main()
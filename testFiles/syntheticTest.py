@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for generateOsm()
+#             Generates a small synthetic city and reads it back
+##############################################################################
+
+import filecmp
+import os
+import shutil
+import tempfile
+import unittest
+import lxml.etree as Et
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.synthetic import ORIGIN, generateOsm
+
+
+class SyntheticTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.osmFile = os.path.join(self.directory, 'city.osm')
+        self.counts = generateOsm(self.osmFile, 1.0, seed=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testDeterministic(self):
+        '''tests that a seed always gives the same file'''
+        again = os.path.join(self.directory, 'again.osm')
+        other = os.path.join(self.directory, 'other.osm')
+        generateOsm(again, 1.0, seed=3)
+        generateOsm(other, 1.0, seed=4)
+        self.assertTrue(filecmp.cmp(self.osmFile, again, shallow=False))
+        self.assertFalse(filecmp.cmp(self.osmFile, other, shallow=False))
+
+    def testValidOsm(self):
+        '''tests that ids are unique and every reference resolves'''
+        root = Et.parse(self.osmFile).getroot()
+        ids = dict()
+        for kind in ('node', 'way', 'relation'):
+            elements = root.findall(kind)
+            self.assertEqual(len(elements), self.counts[kind])
+            ids[kind] = set(e.get('id') for e in elements)
+            self.assertEqual(len(ids[kind]), len(elements))
+        for nd in root.iter('nd'):
+            self.assertIn(nd.get('ref'), ids['node'])
+        for member in root.iter('member'):
+            self.assertIn(member.get('ref'), ids[member.get('type')])
+
+    def testFeatureClasses(self):
+        '''tests that Osm2Dict finds every road and model type, buildings
+           and buildings with holes'''
+        osmRoads = Osm2Dict(ORIGIN[0], ORIGIN[1],
+                            getOsmFile([], '', self.osmFile))
+        roads, models, buildings = osmRoads.getMapDetails()
+        self.assertEqual(set(road['type'] for road in roads.values()),
+                         set(osmRoads.highwayType))
+        self.assertEqual(set(model['mainModel'] for model in models.values()),
+                         set(model['modelName']
+                             for model in osmRoads.addModel.values()))
+        self.assertGreater(len(buildings), 100)
+        self.assertTrue(any(building.get('holes')
+                            for building in buildings.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
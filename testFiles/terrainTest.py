@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for DEM and Terrain
+#             Writes the same planar elevations as an SRTM tile, an ESRI
+#             ASCII grid and a GeoTIFF, samples them and builds a world on
+#             the terrain
+##############################################################################
+
+import contextlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import lxml.etree as Et
+import numpy as np
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.cli import main
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.meshExport import STL_DTYPE
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.terrain import DEM, Terrain, openDem
+
+
+def plane(lon, lat):
+    '''Elevations of the test DEMs, exact under bilinear sampling'''
+    return 100 + 2000 * (lon + 69) + 1000 * (lat - 44)
+
+
+def writeTiff(filename, data, lon0, lat0, step, nodata):
+    '''Writes data as a little endian int16 GeoTIFF, pixel is point'''
+    entries = []
+    extra = b''
+    start = 8 + 2 + 12 * 12 + 4
+
+    def add(tag, kind, code, values):
+        nonlocal extra
+        raw = struct.pack('<' + code * len(values), *values)
+        if len(raw) > 4:
+            entries.append((tag, kind, len(values),
+                            struct.pack('<I', start + len(extra))))
+            extra += raw + b'\0' * (len(raw) % 2)
+        else:
+            entries.append((tag, kind, len(values), raw.ljust(4, b'\0')))
+
+    add(256, 3, 'H', [data.shape[1]])
+    add(257, 3, 'H', [data.shape[0]])
+    add(258, 3, 'H', [16])
+    add(259, 3, 'H', [1])
+    add(277, 3, 'H', [1])
+    add(339, 3, 'H', [2])
+    add(33550, 12, 'd', [step, step, 0])
+    add(33922, 12, 'd', [0, 0, 0, lon0, lat0, 0])
+    add(34735, 3, 'H', [1, 1, 0, 2, 1024, 0, 1, 2, 1025, 0, 1, 2])
+    add(42113, 2, 'c', [c.encode() for c in '%d\0' % nodata])
+    strip = start + len(extra)
+    add(273, 4, 'I', [strip])
+    add(279, 4, 'I', [data.size * 2])
+    entries.sort()
+    with open(filename, 'wb') as f:
+        f.write(b'II' + struct.pack('<HI', 42, 8))
+        f.write(struct.pack('<H', len(entries)))
+        for entry in entries:
+            f.write(struct.pack('<HHI4s', *entry))
+        f.write(struct.pack('<I', 0))
+        f.write(extra)
+        f.write(data.astype('<i2').tobytes())
+
+
+class TerrainTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        side = 1201
+        lon, lat = np.meshgrid(np.linspace(-69, -68, side),
+                               np.linspace(45, 44, side))
+        cls.hgt = os.path.join(cls.directory, 'N44W069.hgt')
+        np.round(plane(lon, lat)).astype('>i2').tofile(cls.hgt)
+        # A window around the umaine box in the other two formats
+        rows, cols = slice(110, 130), slice(390, 410)
+        window = np.round(plane(lon[rows, cols], lat[rows, cols]))
+        step = 1.0 / (side - 1)
+        cls.asc = os.path.join(cls.directory, 'window.asc')
+        with open(cls.asc, 'w') as f:
+            f.write('ncols 20\nnrows 20\nxllcenter %r\nyllcenter %r\n'
+                    'cellsize %r\nNODATA_value -9999\n' % (
+                        float(lon[0, 390]), float(lat[129, 0]), step))
+            for row in window:
+                f.write(' '.join('%d' % v for v in row) + '\n')
+        cls.tif = os.path.join(cls.directory, 'window.tif')
+        writeTiff(cls.tif, window, lon[0, 390], lat[110, 0], step, -32768)
+        cls.box = [-68.6712560, 44.8978660, -68.6653980, 44.9038770]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def testFormats(self):
+        '''tests that the three formats give the same bilinear samples'''
+        rng = np.random.default_rng(0)
+        lon = rng.uniform(self.box[0], self.box[2], 100)
+        lat = rng.uniform(self.box[1], self.box[3], 100)
+        for filename in (self.hgt, self.asc, self.tif):
+            dem = openDem(filename)
+            np.testing.assert_allclose(dem.sample(lon, lat), plane(lon, lat),
+                                       atol=0.5, err_msg=filename)
+        self.assertIsInstance(openDem(self.hgt).data, np.memmap)
+        self.assertIsInstance(openDem(self.tif).data, np.memmap)
+        self.assertTrue(np.isnan(openDem(self.asc).sample([-68.0], [44.0])))
+
+    def testNodata(self):
+        '''tests that missing samples are left out and uncovered points
+           fall back to the next DEM, then to the datum'''
+        data = np.array([[0.0, 10.0], [-1.0, 30.0]])
+        dem = DEM(data, 0.0, 1.0, 1.0, 1.0, nodata=-1.0)
+        self.assertAlmostEqual(float(dem.sample([0.5], [0.5])[0]),
+                               (0 + 10 + 30) / 3)
+        self.assertAlmostEqual(float(dem.sample([0.5], [0.0])[0]), 30.0)
+        self.assertTrue(np.isnan(dem.sample([0.0], [0.0])[0]))
+        fallback = DEM(np.full((2, 2), 7.0), 2.0, 1.0, 1.0, 1.0)
+        terrain = Terrain([dem, fallback], datum=5.0)
+        np.testing.assert_allclose(terrain([1.0, 2.5, 9.0], [1.0, 0.5, 9.0]),
+                                   [5.0, 2.0, 0.0])
+
+    def testWorld(self):
+        '''tests that the ground plane is replaced by a heightmap and the
+           features raised to the terrain'''
+        directory = os.path.join(self.directory, 'world', '')
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(['-O', 'umaine.osm', '-B'] + [repr(v) for v in self.box] +
+                 ['--dem', self.tif, self.hgt, '-d', directory])
+        self.assertTrue(os.path.exists(directory + 'terrain.png'))
+        world = Et.parse(directory + 'outFile.sdf').getroot().find('world')
+        datum = float(world.findtext('spherical_coordinates/elevation'))
+        self.assertAlmostEqual(datum, plane(self.box[0], self.box[1]),
+                               delta=1)
+        heightmap = world.find(".//model[@name='terrain']//heightmap")
+        self.assertEqual(heightmap.findtext('uri'), 'file://' +
+                         os.path.abspath(directory + 'terrain.png'))
+        span = float(heightmap.findtext('size').split()[2])
+        self.assertAlmostEqual(
+            span, plane(self.box[2], self.box[3]) - datum, delta=1)
+        terrain = Terrain([openDem(self.hgt)], datum)
+        buildings = Osm2Dict(self.box[0], self.box[1],
+                             getOsmFile([], '', 'umaine.osm'), ['b'],
+                             terrain).getMapDetails()[2]
+        links = {model.get('name'): model.find('link/pose')
+                 for model in world.findall('model')}
+        heights = [(float(links[name].text.split()[2]),
+                    np.min(building['points'][2]))
+                   for name, building in buildings.items()]
+        np.testing.assert_allclose(*zip(*heights), atol=0.5)
+        self.assertGreater(max(height for height, expected in heights), 1)
+
+    def testClip(self):
+        '''tests that features clipped to the box keep their elevation'''
+        directory = os.path.join(self.directory, 'clip', '')
+        box = [-68.6700, 44.8990, -68.6670, 44.9020]
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(['-O', 'umaine.osm', '-B'] + [repr(v) for v in box] +
+                 ['--dem', self.hgt, '--clip', '-d', directory])
+        world = Et.parse(directory + 'outFile.sdf').getroot().find('world')
+        heights = [float(model.find('link/pose').text.split()[2])
+                   for model in world.findall('model')
+                   if model.find('link/visual/geometry/polyline') is not None]
+        self.assertTrue(heights)
+        self.assertGreater(min(heights), 0)
+
+    def testMesh(self):
+        '''tests that --mesh extrudes the features from their lowest node
+           and raises their collision boxes with them'''
+        directory = os.path.join(self.directory, 'mesh', '')
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(['-O', 'umaine.osm', '-B'] + [repr(v) for v in self.box] +
+                 ['--dem', self.hgt, '--mesh', '--buildingCollision', 'obb',
+                  '-d', directory])
+        meshes = os.listdir(directory + 'meshes')
+        self.assertTrue(meshes)
+        for name in meshes:
+            records = np.fromfile(directory + 'meshes/' + name,
+                                  dtype=STL_DTYPE, offset=84)
+            self.assertGreater(records['vertices'][:, :, 2].max(), 1)
+        world = Et.parse(directory + 'outFile.sdf').getroot().find('world')
+        heights = [float(collision.findtext('pose').split()[2])
+                   for model in world.findall('model')
+                   if model.get('name').startswith('buildings')
+                   for collision in model.iter('collision')]
+        self.assertTrue(heights)
+        self.assertGreater(max(heights), 1 + min(heights))
+
+
+if __name__ == '__main__':
+    unittest.main()
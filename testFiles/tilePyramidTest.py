@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for writeTilePyramid()
+#             Renders the XYZ tiles of a local osm file
+##############################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import sys
+sys.path.insert(0, '..')
+
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.osm2dict import Osm2Dict
+from rasterizeTest import readPng
+from gazebo_osm.tilePyramid import (lonLatToTile, tileToLonLat, tileRange,
+                                    tileTransform, writeTilePyramid)
+
+
+class TilePyramidTest(unittest.TestCase):
+
+    def setUp(self):
+        osmDict = getOsmFile([], '', 'umaine.osm')
+        self.osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+        self.box = [-68.6712560, 44.8978660, -68.6653980, 44.9038770]
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testTileMath(self):
+        '''tests the slippy map tile numbers and their inverse'''
+        self.assertEqual(tuple(map(int, lonLatToTile(13.37771, 52.51628, 17))),
+                         (70406, 42987))
+        lon, lat = tileToLonLat(*lonLatToTile(self.box[0], self.box[1], 18),
+                                zoom=18)
+        self.assertAlmostEqual(lon, self.box[0])
+        self.assertAlmostEqual(lat, self.box[1])
+        self.assertEqual(len(list(tileRange(self.box, 0))), 1)
+
+    def testTransform(self):
+        '''tests that the fitted affine map puts a world point on the tile
+           pixel of its lon, lat'''
+        lon, lat = -68.668, 44.901
+        x, y = lonLatToTile(lon, lat, 18)
+        affine, tileBBox = tileTransform(self.osmRoads.getPoints,
+                                         int(x), int(y), 18)
+        point = self.osmRoads.getPoints(np.array([[lon, lat]]))[:2, 0]
+        pixel = np.append(point, 1).dot(affine)
+        self.assertTrue(np.allclose(pixel, [(x % 1) * 256, (y % 1) * 256],
+                                    atol=0.05))
+        self.assertTrue(tileBBox[0] <= point[0] <= tileBBox[2])
+
+    def testWriteTiles(self):
+        '''tests that tiles are written per zoom level and that building
+           footprints land on their tile pixels'''
+        roads, models, buildings = self.osmRoads.getMapDetails()
+        written, skipped = writeTilePyramid(
+            self.directory, self.osmRoads.getPoints, self.box, [16, 17, 18],
+            roads, buildings, jobs=2)
+        tiles = [os.path.join(root, name)
+                 for root, dirs, files in os.walk(self.directory)
+                 for name in files]
+        self.assertEqual(len(tiles), written)
+        self.assertEqual(written + skipped,
+                         sum(len(list(tileRange(self.box, z)))
+                             for z in (16, 17, 18)))
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+        building = max(buildings.values(),
+                       key=lambda b: b['points'].shape[1])
+        inside = np.mean(building['points'][:2, :-1], axis=1)
+        for zoom in (16, 17, 18):
+            for x, y in tileRange(self.box, zoom):
+                affine, tileBBox = tileTransform(self.osmRoads.getPoints,
+                                                 x, y, zoom)
+                column, row = np.floor(np.append(inside, 1).dot(affine))
+                if not (0 <= column < 256 and 0 <= row < 256):
+                    continue
+                filename = os.path.join(self.directory, str(zoom), str(x),
+                                        '%d.png' % y)
+                header, palette, raw = readPng(filename)
+                self.assertEqual(header[:4], (256, 256, 8, 3))
+                self.assertNotEqual(raw[int(row) * 257 + 1 + int(column)], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
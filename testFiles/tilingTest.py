@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+##############################################################################
+#Package: gazebo_osm
+#
+#Description: Unit test for writeTiles()
+#             Splits a world into per-tile include models
+##############################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, '..')
+
+from lxml import etree
+from gazebo_osm.osm2dict import Osm2Dict
+from gazebo_osm.getOsmFile import getOsmFile
+from gazebo_osm.tiling import splitFeatures, writeTiles
+
+
+class TilingTest(unittest.TestCase):
+
+    def setUp(self):
+        osmDict = getOsmFile([], '', 'umaine.osm')
+        self.osmRoads = Osm2Dict(-68.6712560, 44.8978660, osmDict)
+        self.features = self.osmRoads.getMapDetails()
+        self.bbox = self.osmRoads.getPointBBox([-68.6712560, 44.8978660,
+                                                -68.6653980, 44.9038770])
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testSplit(self):
+        '''tests that every building and model lands in exactly one tile'''
+        roads, models, buildings = self.features
+        tiles = splitFeatures(self.bbox, 200, roads, models, buildings)
+        self.assertEqual(len(tiles), 12)
+        self.assertEqual(sum(len(t[3]) for t in tiles.values()),
+                         len(buildings))
+        self.assertEqual(sum(len(t[2]) for t in tiles.values()),
+                         len([m for m in models.values() if len(m['points'])]))
+        self.assertTrue(sum(len(t[1]) for t in tiles.values()) >= len(roads))
+
+    def testRewriteOnlyChanged(self):
+        '''tests that an unchanged world does not rewrite any tile'''
+        worldFile = os.path.join(self.directory, 'world.sdf')
+        tileDirectory = os.path.join(self.directory, 'tiles')
+        args = (worldFile, tileDirectory, self.osmRoads.getLat(),
+                self.osmRoads.getLon(), self.bbox, 200) + self.features
+        written, unchanged = writeTiles(*args, jobs=2)
+        self.assertEqual(unchanged, 0)
+        self.assertEqual(writeTiles(*args, jobs=2), (0, written))
+        world = etree.parse(worldFile).getroot().find('world')
+        uris = [u.text for u in world.findall('include/uri')][1:]
+        self.assertEqual(len(uris), written)
+        for uri in uris:
+            self.assertTrue(uri.startswith('file://' + tileDirectory))
+            self.assertTrue(os.path.exists(
+                os.path.join(uri[len('file://'):], 'model.sdf')))
+            self.assertTrue(os.path.exists(
+                os.path.join(uri[len('file://'):], 'model.config')))
+
+    def testRemoveStale(self):
+        '''tests that tiles of an earlier, finer grid are removed and that
+           model uris name the tiles'''
+        worldFile = os.path.join(self.directory, 'world.sdf')
+        tileDirectory = os.path.join(self.directory, 'tiles')
+        args = (worldFile, tileDirectory, self.osmRoads.getLat(),
+                self.osmRoads.getLon(), self.bbox)
+        writeTiles(*args + (200,) + self.features, jobs=2)
+        os.makedirs(os.path.join(tileDirectory, 'notes'))
+        written, unchanged = writeTiles(*args + (400,) + self.features,
+                                        jobs=2, tileUris='model')
+        uris = [u.text for u in etree.parse(worldFile).getroot().findall(
+            'world/include/uri')][1:]
+        self.assertEqual(sorted(os.listdir(tileDirectory)),
+                         sorted([uri[len('model://'):] for uri in uris] +
+                                ['notes']))
+        self.assertEqual(len(uris), written + unchanged)
+
+
+if __name__ == '__main__':
+    unittest.main()